@@ -0,0 +1,115 @@
+import math
+import numpy as np
+from pysat.card import CardEnc, EncType
+
+# Các mã hóa at-most-one có sẵn trong PySAT
+PYSAT_AMO_ENCODINGS = {
+    'pairwise': EncType.pairwise,
+    'seqcounter': EncType.seqcounter,
+    'ladder': EncType.ladder,
+    'bitwise': EncType.bitwise,
+    'totalizer': EncType.totalizer,
+    'mtotalizer': EncType.mtotalizer,
+    'kmtotalizer': EncType.kmtotalizer,
+    'sortnetwrk': EncType.sortnetwrk,
+    'cardnetwrk': EncType.cardnetwrk,
+}
+
+AMO_ENCODINGS = list(PYSAT_AMO_ENCODINGS) + ['commander', 'product']
+
+COMMANDER_GROUP_SIZE = 3
+PAIRWISE_THRESHOLD = 6  # Dưới ngưỡng này commander/product dùng mã hóa từng cặp
+ARRAY_AMO_ENCODINGS = ('pairwise', 'seqcounter')  # Các mã hóa sinh trực tiếp thành mảng (atmost_one_array)
+
+
+def check_amo_encoding(encoding):
+    """ Raise a ValueError for an unknown at-most-one encoding name. """
+    if encoding not in AMO_ENCODINGS:
+        raise ValueError(f"Invalid AMO encoding '{encoding}'. Use one of: {', '.join(AMO_ENCODINGS)}.")
+
+
+def atmost_one(lits, vpool, encoding='seqcounter'):
+    """
+    Encodes "at most one of lits is true" into CNF.
+
+    Args:
+        lits (list): Literals of the constraint.
+        vpool (IDPool): Pool for the auxiliary variables.
+        encoding (str): One of AMO_ENCODINGS.
+
+    Returns:
+        list: The clauses of the encoding.
+    """
+    check_amo_encoding(encoding)
+    if len(lits) <= 1:
+        return []
+    if encoding == 'commander':
+        return _commander(lits, vpool)
+    if encoding == 'product':
+        return _product(lits, vpool)
+    return CardEnc.atmost(lits=lits, bound=1, vpool=vpool, encoding=PYSAT_AMO_ENCODINGS[encoding]).clauses
+
+
+def atmost_one_array(lits, vpool, encoding='seqcounter'):
+    """
+    atmost_one for the encodings of ARRAY_AMO_ENCODINGS, built with numpy as an (m, 2) array of
+    binary clauses for a clause_buffer.ClauseBuffer. The clauses and auxiliary variables are the
+    same as PySAT's; the other encodings fall back to atmost_one and return a list.
+    """
+    check_amo_encoding(encoding)
+    if encoding not in ARRAY_AMO_ENCODINGS:
+        return atmost_one(np.asarray(lits).tolist(), vpool, encoding)
+    lits = np.asarray(lits, dtype=np.int32)
+    if len(lits) <= 1:
+        return np.empty((0, 2), dtype=np.int32)
+    if encoding == 'pairwise' or len(lits) == 2:
+        a, b = np.triu_indices(len(lits), 1)
+        return np.stack([-lits[a], -lits[b]], axis=1)
+    # Bộ đếm tuần tự (Sinz), cùng thứ tự mệnh đề như PySAT: s_i đúng nếu một trong x_1..x_i đúng
+    s = np.arange(vpool.top + 1, vpool.top + len(lits), dtype=np.int32)
+    vpool.top += len(lits) - 1
+    middle = np.stack([np.stack([-s[:-1], s[1:]], axis=1),
+                       np.stack([-lits[1:-1], -s[:-1]], axis=1),
+                       np.stack([-lits[1:-1], s[1:]], axis=1)], axis=1).reshape(-1, 2)
+    return np.concatenate([[[-lits[0], s[0]]], middle, [[-lits[-1], -s[-1]]]]).astype(np.int32)
+
+
+def _pairwise(lits):
+    return [[-lits[a], -lits[b]] for a in range(len(lits)) for b in range(a + 1, len(lits))]
+
+
+def _commander(lits, vpool):
+    """
+    Commander encoding (Klieber & Kwon): split lits into groups of COMMANDER_GROUP_SIZE, allow at
+    most one true literal per group, let every literal imply its group's commander and recurse on
+    the commanders.
+    """
+    if len(lits) <= PAIRWISE_THRESHOLD:
+        return _pairwise(lits)
+    clauses = []
+    commanders = []
+    for start in range(0, len(lits), COMMANDER_GROUP_SIZE):
+        group = lits[start:start + COMMANDER_GROUP_SIZE]
+        commander = vpool.id()
+        commanders.append(commander)
+        clauses += _pairwise(group)
+        clauses += [[-lit, commander] for lit in group]
+    return clauses + _commander(commanders, vpool)
+
+
+def _product(lits, vpool):
+    """
+    Product encoding (Chen): place lits on a p x q grid, let every literal imply its row and
+    column variable and recurse on the rows and on the columns.
+    """
+    if len(lits) <= PAIRWISE_THRESHOLD:
+        return _pairwise(lits)
+    p = math.ceil(math.sqrt(len(lits)))
+    q = math.ceil(len(lits) / p)
+    rows = [vpool.id() for _ in range(p)]
+    cols = [vpool.id() for _ in range(q)]
+    clauses = []
+    for position, lit in enumerate(lits):
+        clauses.append([-lit, rows[position // q]])
+        clauses.append([-lit, cols[position % q]])
+    return clauses + _product(rows, vpool) + _product(cols, vpool)
@@ -0,0 +1,216 @@
+import os
+import subprocess
+import numpy as np
+import pandas as pd
+from runner import DEFAULT_JOBS, DONE, make_jobs, run_job, run_jobs
+from result_store import ResultStore, DEFAULT_STORE
+from instance_io import instance_size
+from skeleton import clear_skeleton_cache
+
+SUITE_DIRECTORIES = ('data/fully/', 'data/max/')
+# cache: 'cold' nếu khung mệnh đề cứng được mã hóa lại, 'warm' nếu lấy từ bộ nhớ đệm (xem measure_job)
+GROUP_COLUMNS = ['dataset', 'filename', 'num_students', 'solver', 'encoding_type', 'cache']
+# Cột kích thước công thức của các bộ giải (lấy giá trị của lần chạy đầu tiên)
+SIZE_COLUMNS = ('variables', 'clauses', 'atmost_constraints', 'hard_clauses', 'soft_clauses')
+MIN_FIT_TIME = 1e-3  # Thời gian nhỏ hơn ngưỡng này chủ yếu là nhiễu, không dùng để ước lượng số mũ
+
+
+def code_version():
+    """ Short hash of the checked-out commit, used to label the runs of a suite ('local' outside git). """
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'local'
+
+
+def measure_job(job):
+    """
+    Runs a runner job `warmup` times without recording it (imports, allocator), then `repetitions`
+    times with the in-process skeleton cache cleared before each one, so every measured run
+    encodes its hard clauses from scratch (cache 'cold'). One more run right after the last one
+    reuses the cached skeleton and is recorded with cache 'warm'.
+
+    Returns:
+        dict: The job row with the result row of every repetition under 'runs'.
+    """
+    for _ in range(job['warmup']):
+        run_job(job)
+    runs = []
+    for _ in range(job['repetitions']):
+        clear_skeleton_cache()
+        runs.append(dict(run_job(job), cache='cold'))
+    runs.append(dict(run_job(job), cache='warm'))
+    return dict(runs[-1], runs=runs)
+
+
+def _instance_files(data_directory):
+    """ Sĩ số của các file .txt trong thư mục, sắp xếp theo sĩ số. """
+    sizes = {}
+    for filename in os.listdir(data_directory):
+        if filename.endswith(".txt"):
+            filepath = os.path.join(data_directory, filename)
+            sizes[filepath] = instance_size(filepath)
+    return {filepath: sizes[filepath] for filepath in sorted(sizes, key=lambda filepath: (sizes[filepath], filepath))}
+
+
+def run_suite(data_directories=SUITE_DIRECTORIES, solvers=DEFAULT_JOBS, warmup=1, repetitions=5, timeout=600,
+              memory_limit=None, max_workers=1, label=None, store_file=DEFAULT_STORE):
+    """
+    Runs the scaling benchmark: every solver on every instance, after warmup runs, `repetitions`
+    times with a cold skeleton cache and once with a warm one (see measure_job). Every run is
+    appended to the result store, labelled with the code version, so suites of different commits
+    can be compared.
+
+    Args:
+        data_directories (tuple): Directories of instances, e.g. data/fully, data/max and a directory
+            of generated larger classes; the directory name is stored as the dataset.
+        solvers (tuple): (solver, encoding_type) pairs, see runner.JOB_SOLVERS.
+        warmup (int): Unrecorded runs before the measured ones, in the same process.
+        repetitions (int): Measured cold runs per instance and solver.
+        timeout (float): Wall-clock limit in seconds of the warmup and repetitions of one
+            instance and solver together; a job that hits it is stored as TIMEOUT.
+        memory_limit (float): Memory limit of every job in MiB.
+        max_workers (int): Jobs running at the same time. Keep 1 for timings that are comparable.
+        label (str): Label of the suite (default: the short commit hash).
+        store_file (str): Path to the SQLite result store.
+
+    Returns:
+        pd.DataFrame: The stored rows of this suite (see load_suite).
+    """
+    if repetitions < 1:
+        raise ValueError("repetitions must be at least 1.")
+    label = label or code_version()
+    store = ResultStore(store_file)
+    jobs = []
+    for data_directory in data_directories:
+        dataset = os.path.basename(os.path.normpath(data_directory))
+        sizes = _instance_files(data_directory)
+        for job in make_jobs(list(sizes), solvers):
+            job.update(dataset=dataset, num_students=sizes[job['filepath']], warmup=warmup, repetitions=repetitions)
+            jobs.append(job)
+
+    for job, row in run_jobs(jobs, max_workers=max_workers, timeout=timeout, memory_limit=memory_limit,
+                             target=measure_job):
+        print(job['dataset'], row['filename'], job['solver'], job['encoding_type'], row['status'])
+        runs = row.pop('runs', None) or [row]  # Job hết thời gian/lỗi được lưu thành một dòng
+        for repetition, run in enumerate(runs):
+            run = dict(run, dataset=job['dataset'], num_students=job['num_students'], repetition=repetition,
+                       wall_time=row['wall_time'], status=row['status'])
+            store.append(run, job['solver'], encoding_type=job['encoding_type'], params={'suite': label},
+                         filepath=job['filepath'])
+    return load_suite(label, store_file)
+
+
+def load_suite(label=None, store_file=DEFAULT_STORE):
+    """ The stored rows of a suite (default: the suite of the checked-out commit) as a DataFrame. """
+    return ResultStore(store_file).to_dataframe(params={'suite': label or code_version()})
+
+
+def summarize(rows):
+    """
+    Statistics per dataset, instance, solver, encoding and cache state ('cold' or 'warm') over the
+    repetitions of a suite.
+
+    Returns:
+        pd.DataFrame: Median, 95th percentile and standard deviation of every phase time
+            (time_<phase>), of solve_time and of total_time; the formula size; the largest peak
+            memory of every phase; and the statuses of the runs.
+    """
+    rows = rows.copy()
+    if 'cache' not in rows:
+        rows['cache'] = None  # Bộ benchmark cũ chưa tách khung lạnh/nóng
+    done = rows['status'] == DONE
+    time_columns = [column for column in rows if column.startswith('time_') or column in ('solve_time', 'total_time')]
+    memory_columns = [column for column in rows if column.startswith(('peak_rss_', 'peak_traced_'))]
+    size_columns = [column for column in SIZE_COLUMNS if column in rows]
+    rows.loc[~done, time_columns] = np.nan  # Lần chạy hết thời gian không có thời gian đo được
+
+    aggregations = {}
+    for column in time_columns:
+        aggregations[f'{column}_median'] = (column, 'median')
+        aggregations[f'{column}_p95'] = (column, lambda values: values.quantile(0.95))
+        aggregations[f'{column}_std'] = (column, 'std')
+    for column in size_columns:
+        aggregations[column] = (column, 'first')
+    for column in memory_columns:
+        aggregations[column] = (column, 'max')
+    aggregations['repetitions'] = ('status', lambda statuses: int((statuses == DONE).sum()))
+    aggregations['status'] = ('status', lambda statuses: ','.join(sorted(set(statuses))))
+    return (rows.groupby(GROUP_COLUMNS, dropna=False).agg(**aggregations).reset_index()
+            .sort_values(['dataset', 'solver', 'encoding_type', 'cache', 'num_students']))
+
+
+def fit_scaling(summary, column='total_time_median', min_time=MIN_FIT_TIME):
+    """
+    Fits time ~ c * n^k per dataset, solver, encoding and cache state by least squares on
+    log(time) against log(num_students), using the instances whose time is at least `min_time`.
+
+    Returns:
+        pd.DataFrame: The exponent k, the coefficient c, the R^2 of the fit and the number of points.
+    """
+    fits = []
+    for (dataset, solver, encoding_type, cache), group in summary.groupby(['dataset', 'solver', 'encoding_type',
+                                                                          'cache'], dropna=False):
+        group = group[group[column] >= min_time]
+        fit = {'dataset': dataset, 'solver': solver, 'encoding_type': encoding_type, 'cache': cache,
+               'column': column, 'exponent': None, 'coefficient': None, 'r2': None, 'points': len(group)}
+        if group['num_students'].nunique() >= 3:
+            x, y = np.log(group['num_students'].to_numpy(float)), np.log(group[column].to_numpy(float))
+            slope, intercept = np.polyfit(x, y, 1)
+            residual = y - (slope * x + intercept)
+            total = ((y - y.mean()) ** 2).sum()
+            fit.update(exponent=slope, coefficient=np.exp(intercept),
+                       r2=1 - (residual ** 2).sum() / total if total > 0 else 1.0)
+        fits.append(fit)
+    return pd.DataFrame(fits)
+
+
+def comparison_table(summary, dataset, column='total_time_median', cache='cold'):
+    """ One row per instance size and one time_<encoding>_<solver> column per solver, as in visual.py. """
+    summary = summary[(summary['dataset'] == dataset) & (summary['cache'].isna() | (summary['cache'] == cache))]
+    names = summary.apply(lambda row: 'time_' + '_'.join(part for part in (row['encoding_type'], row['solver'])
+                                                         if isinstance(part, str)), axis=1)
+    return (summary.assign(name=names).pivot_table(index='num_students', columns='name', values=column)
+            .reset_index())
+
+
+def plot_scaling(summary, dataset, output_path=None, column='total_time_median'):
+    """
+    Plots `column` against the class size for every solver of a dataset straight from the
+    summary, in the style of solver_time_comparison_*.png. Needs matplotlib.
+
+    Returns:
+        str: The path of the saved figure.
+    """
+    from visual import plot_comparison  # matplotlib chỉ cần khi vẽ biểu đồ
+    output_path = output_path or f"results/suite_{dataset}.png"
+    return plot_comparison(comparison_table(summary, dataset, column), output_path)
+
+
+def export_suite(summary, fits, output_file="results/suite.xlsx"):
+    """ Writes the summary and the scaling fits to two sheets of an Excel file. """
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        summary.to_excel(writer, sheet_name='summary', index=False)
+        fits.to_excel(writer, sheet_name='scaling', index=False)
+    print(f"Results have been exported to {output_file}")
+
+
+if __name__ == "__main__":
+    # Chạy bộ benchmark tuần tự trên data/fully và data/max (thêm thư mục dữ liệu sinh ra cho lớp lớn hơn)
+    rows = run_suite(SUITE_DIRECTORIES, warmup=1, repetitions=5, timeout=600)
+    summary = summarize(rows)
+    fits = fit_scaling(summary)
+    print(fits)
+    export_suite(summary, fits)
+
+    # Biểu đồ thời gian theo sĩ số, vẽ trực tiếp từ kết quả đã lưu
+    for dataset in summary['dataset'].unique():
+        try:
+            print(plot_scaling(summary, dataset))
+        except ImportError:
+            print("matplotlib is not installed, skipping the plots")
+            break
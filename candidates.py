@@ -0,0 +1,73 @@
+import numpy as np
+
+
+def candidate_ranks(weights, perfect_only=False):
+    """
+    Selects the tables that can score and therefore need a variable in the pruned encoding.
+
+    Args:
+        weights (TableWeights): Pair and triple weights of the class.
+        perfect_only (bool): Keep only mutual pairs (wij == 2) and mutual triangles (wijk == 3).
+            Otherwise every table with a non-zero weight is kept.
+
+    Returns:
+        tuple: (pair_ranks, triple_ranks) as sorted arrays of combinatorial ranks.
+    """
+    if perfect_only:
+        pair_mask, triple_mask = weights.wij == 2, weights.wijk == 3
+    else:
+        pair_mask, triple_mask = weights.wij > 0, weights.wijk > 0
+    return np.sort(weights.pair_ranks()[pair_mask]), np.sort(weights.triple_ranks()[triple_mask])
+
+
+def num_two_seat_students(num_students):
+    """ Number of students that must sit at two-seat tables. """
+    return int(num_students * 4 / 7)
+
+
+def filler_is_feasible(num_students):
+    """
+    Checks whether students left out of every candidate table can always be seated.
+
+    Students outside the candidate tables are seated at zero-weight filler tables: those with
+    y = 1 at two-seat tables and the others at three-seat tables. Since the candidate tables
+    already hold an even number of y = 1 students and a multiple of three y = 0 students, this
+    only depends on the class size.
+    """
+    num_tables_2 = num_two_seat_students(num_students)
+    return num_tables_2 % 2 == 0 and (num_students - num_tables_2) % 3 == 0
+
+
+def seat_free_students(free_in_pairs, free_in_triples):
+    """
+    Seats the students that are not covered by a chosen candidate table.
+
+    Args:
+        free_in_pairs (list): Free students with y = 1 (even count).
+        free_in_triples (list): Free students with y = 0 (count divisible by 3).
+
+    Returns:
+        list: Filler tables of 2 and 3 students.
+    """
+    tables = [list(free_in_pairs[p:p + 2]) for p in range(0, len(free_in_pairs), 2)]
+    tables += [list(free_in_triples[t:t + 3]) for t in range(0, len(free_in_triples), 3)]
+    return tables
+
+
+def seat_uncovered_students(index, true_vars, tables):
+    """
+    Seats the students outside every chosen candidate table of a pruned model.
+
+    Args:
+        index (VariableIndex): Variable index of the pruned encoding.
+        true_vars (np.ndarray): Variable ids set to true in the model, y variables included.
+        tables (list): The candidate tables chosen by the model.
+
+    Returns:
+        list: Filler tables of 2 and 3 students.
+    """
+    seated = np.zeros(index.num_students + 1, dtype=bool)
+    seated[[student for table in tables for student in table]] = True
+    in_pair = np.isin(index.y_vars(), true_vars)
+    free = np.flatnonzero(~seated[1:])
+    return seat_free_students((free[in_pair[free]] + 1).tolist(), (free[~in_pair[free]] + 1).tolist())
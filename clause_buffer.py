@@ -0,0 +1,119 @@
+import itertools
+import numpy as np
+
+CHUNK_CLAUSES = 1 << 16  # Số mệnh đề được chuyển thành list Python mỗi lần khi nạp vào bộ giải hoặc ghi ra file
+
+
+class ClauseBuffer:
+    """
+    Hard clauses stored as one flat int32 array of literals and an int64 array of clause offsets,
+    filled by bulk operations instead of one Python list per clause.
+
+    It stands in for WCNF.hard and CNFPlus.clauses: PySAT solvers and RC2 only iterate over the
+    hard clauses, and iteration hands them over CHUNK_CLAUSES at a time, so only one chunk exists
+    as Python lists at any moment. blocks() feeds dimacs.write_formula directly.
+    """
+
+    def __init__(self, capacity=1 << 16):
+        self.lits = np.empty(capacity, dtype=np.int32)
+        self.offsets = np.zeros(capacity // 2 + 1, dtype=np.int64)  # Mệnh đề c gồm lits[offsets[c]:offsets[c + 1]]
+        self.num_lits = 0
+        self.num_clauses = 0
+        self.nv = 0  # Biến lớn nhất đã xuất hiện
+
+    @classmethod
+    def of(cls, clauses):
+        """ The buffer itself, or a new buffer holding a list of clauses (e.g. a skeleton pickled as lists). """
+        if isinstance(clauses, ClauseBuffer):
+            return clauses
+        buffer = cls()
+        buffer.extend(clauses)
+        return buffer
+
+    def __len__(self):
+        return self.num_clauses
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk
+
+    def _reserve(self, num_lits, num_clauses):
+        """ Tăng gấp đôi dung lượng của mảng khi cần, như list của Python. """
+        if self.num_lits + num_lits > len(self.lits):
+            lits = np.empty(max(2 * len(self.lits), self.num_lits + num_lits), dtype=np.int32)
+            lits[:self.num_lits] = self.lits[:self.num_lits]
+            self.lits = lits
+        if self.num_clauses + num_clauses + 1 > len(self.offsets):
+            offsets = np.empty(max(2 * len(self.offsets), self.num_clauses + num_clauses + 1), dtype=np.int64)
+            offsets[:self.num_clauses + 1] = self.offsets[:self.num_clauses + 1]
+            self.offsets = offsets
+
+    def _add(self, flat, lengths):
+        """ Thêm các mệnh đề cho bởi mảng literal liền nhau và độ dài của từng mệnh đề. """
+        self._reserve(len(flat), len(lengths))
+        self.lits[self.num_lits:self.num_lits + len(flat)] = flat
+        ends = self.offsets[self.num_clauses] + np.cumsum(lengths)
+        self.offsets[self.num_clauses + 1:self.num_clauses + 1 + len(lengths)] = ends
+        self.num_lits += len(flat)
+        self.num_clauses += len(lengths)
+        if len(flat):
+            self.nv = max(self.nv, int(np.abs(flat).max()))
+
+    def append(self, clause):
+        """ Appends one clause (list or array of literals). """
+        flat = np.asarray(clause, dtype=np.int32).ravel()
+        self._add(flat, np.array([len(flat)], dtype=np.int64))
+
+    def extend(self, clauses):
+        """
+        Appends clauses given as an (m, k) array of clauses of k literals, or as a list of
+        literal lists of any lengths (e.g. the clauses of a PySAT encoding).
+        """
+        if isinstance(clauses, np.ndarray):
+            if clauses.ndim == 1:
+                clauses = clauses[:, None]  # Mảng 1 chiều: các mệnh đề đơn vị
+            self._add(clauses.ravel(), np.full(len(clauses), clauses.shape[1], dtype=np.int64))
+            return
+        lengths = np.fromiter(map(len, clauses), dtype=np.int64, count=len(clauses))
+        flat = np.fromiter(itertools.chain.from_iterable(clauses), dtype=np.int32, count=int(lengths.sum()))
+        self._add(flat, lengths)
+
+    def clause(self, c):
+        """ Literals of clause c as a list. """
+        return self.lits[self.offsets[c]:self.offsets[c + 1]].tolist()
+
+    def chunks(self, size=CHUNK_CLAUSES, arrays=False):
+        """
+        Yields the clauses `size` at a time as lists of literal lists, ready for a solver's
+        append_formula. With arrays=True a chunk whose clauses all have the same length is
+        yielded as an (m, k) int32 array instead.
+        """
+        for lo in range(0, self.num_clauses, size):
+            hi = min(lo + size, self.num_clauses)
+            start = self.offsets[lo]
+            flat = self.lits[start:self.offsets[hi]]
+            lengths = np.diff(self.offsets[lo:hi + 1])
+            if len(lengths) and (lengths == lengths[0]).all() and lengths[0] > 0:
+                chunk = flat.reshape(-1, int(lengths[0]))
+                yield chunk if arrays else chunk.tolist()
+                continue
+            flat, bounds = flat.tolist(), (self.offsets[lo:hi + 1] - start).tolist()
+            yield [flat[a:b] for a, b in zip(bounds, bounds[1:])]
+
+    def feed(self, solver):
+        """ Adds every clause to a PySAT solver, one append_formula call per chunk. """
+        for chunk in self.chunks():
+            solver.append_formula(chunk)
+
+    def blocks(self):
+        """ The clauses as hard blocks for dimacs.write_formula, e.g. write_formula(out, buffer.blocks, 'cnf'). """
+        for chunk in self.chunks(arrays=True):
+            yield 'h', chunk
+
+    def copy(self):
+        """ Copy trimmed to the clauses it holds (used for the skeleton cache). """
+        buffer = ClauseBuffer(capacity=0)
+        buffer.lits = self.lits[:self.num_lits].copy()
+        buffer.offsets = self.offsets[:self.num_clauses + 1].copy()
+        buffer.num_lits, buffer.num_clauses, buffer.nv = self.num_lits, self.num_clauses, self.nv
+        return buffer
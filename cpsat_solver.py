@@ -1,209 +1,297 @@
+import os
 import time
+import numpy as np
 from ortools.sat.python import cp_model
+from weights import calculate_weights
+from indexing import VariableIndex
+from skeleton import HardSkeleton, get_skeleton, store_skeleton
+from candidates import candidate_ranks, filler_is_feasible
+from heuristic import heuristic_seating, seating_vars
+from profiling import PhaseTimer
+from decoding import decode_values
+from instance_io import read_data
+
+NUM_CORES = os.cpu_count() or 1
+# Cấu hình giải: tham số của CpSolver; 'hint' gợi ý cho mô hình lời giải của heuristic (tham lam + tìm kiếm cục bộ)
+SOLVE_PROFILES = {
+    'default': {},  # CpSolver với tham số mặc định
+    'parallel': {'num_workers': NUM_CORES, 'hint': True, 'repair_hint': True, 'symmetry_level': 4,
+                 'linearization_level': 2},
+    'time_limited': {'num_workers': NUM_CORES, 'max_time_in_seconds': 60.0, 'hint': True, 'repair_hint': True,
+                     'symmetry_level': 4},
+    'single': {'num_workers': 1, 'hint': True, 'symmetry_level': 4},
+}
+
+
+class _IncumbentCallback(cp_model.CpSolverSolutionCallback):
+    """ Gọi `on_solution(tables, total_weight, elapsed)` cho mỗi lời giải cải thiện của CP-SAT. """
+
+    def __init__(self, solver, on_solution):
+        super().__init__()
+        self.solver = solver  # TeamCompositionCPSATSolver đang giải
+        self.on_solution = on_solution
+
+    def on_solution_callback(self):
+        total_weight = self.solver.weight_of_objective(self.ObjectiveValue())
+        elapsed = self.WallTime()
+        self.solver.incumbents.append((elapsed, total_weight))
+        if self.on_solution is not None:
+            tables = self.solver.decode_values(self.response_proto.solution)
+            if self.on_solution(tables, total_weight, elapsed):
+                self.StopSearch()
+
 
 class TeamCompositionCPSATSolver:
-    def __init__(self, num_students, preferences, encoding_type='max'):
+    def __init__(self, num_students, preferences, encoding_type='max', prune=False, use_skeleton_cache=True,
+                 profile='default', time_limit=None, num_workers=None, trace_memory=False):
         self.num_students = num_students
         self.preferences = preferences
         self.encoding_type = encoding_type  # 'max' or 'min'
+        self.prune = prune  # Chỉ tạo biến cho các bàn có trọng số khác 0
+        if profile not in SOLVE_PROFILES:
+            raise ValueError(f"Invalid profile '{profile}'. Use one of: {', '.join(SOLVE_PROFILES)}.")
+        self.profile = profile
+        self.parameters = dict(SOLVE_PROFILES[profile])  # Tham số của CpSolver theo cấu hình
+        self.use_hint = self.parameters.pop('hint', False)
+        if time_limit is not None:
+            self.parameters['max_time_in_seconds'] = float(time_limit)
+        if num_workers is not None:
+            self.parameters['num_workers'] = num_workers
+        self.hint_weight = None  # Tổng trọng số của lời giải gợi ý
+        self.status = None  # Trạng thái CP-SAT (OPTIMAL, FEASIBLE, ...)
+        self.weights = None
         self.model = cp_model.CpModel()
-        self.xij_vars = {}
-        self.xijk_vars = {}
-        self.y_vars = {}
+        self.index = None  # Ánh xạ bàn (i, j) / (i, j, k) và y_i sang ID biến
+        self.bool_vars = []  # Biến Boolean có ID v nằm ở vị trí v - 1 (trùng với chỉ số proto)
         self.hard_count = 0
         self.soft_count = 0
         self.variable_count = 0  # Đếm tổng số biến
         self.total_weight = 0  # Lưu tổng trọng số
         self.solve_time = 0  # Lưu thời gian chạy
         self.assigned_tables = []  # Lưu danh sách các bàn đã sắp xếp
-        self._initialize_variables()
+        self.incumbents = []  # (thời gian, tổng trọng số) của từng lời giải cải thiện
+        self.timer = PhaseTimer(trace_memory)  # Thời gian và bộ nhớ của từng pha
+        # Khung ràng buộc cứng chỉ phụ thuộc vào sĩ số nên được dùng lại giữa các lần giải
+        self.use_skeleton_cache = use_skeleton_cache and not prune
+        self.skeleton = None
+        with self.timer.phase('init'):
+            if self.use_skeleton_cache:
+                self.skeleton = get_skeleton('cpsat', num_students, None)
+            self._initialize_variables()
 
     def _initialize_variables(self):
         """ Khởi tạo các biến Boolean cho mô hình. """
-        for i in range(1, self.num_students + 1):
-            for j in range(i + 1, self.num_students + 1):
-                self.xij_vars[(i, j)] = self.model.NewBoolVar(f'xij_{i}_{j}')
-                self.variable_count += 1  # Tăng biến đếm số lượng biến
-            for j in range(i + 1, self.num_students + 1):
-                for k in range(j + 1, self.num_students + 1):
-                    self.xijk_vars[(i, j, k)] = self.model.NewBoolVar(f'xijk_{i}_{j}_{k}')
-                    self.variable_count += 1  # Tăng biến đếm số lượng biến
-            self.y_vars[i] = self.model.NewBoolVar(f'y_{i}')
-            self.variable_count += 1  # Tăng biến đếm số lượng biến
+        if self.prune:
+            self._initialize_candidate_variables()
+            return
+        if self.skeleton is not None:
+            self._load_skeleton()
+            return
+        self.index = VariableIndex(self.num_students)
+        self._create_bool_vars()
+
+    def _initialize_candidate_variables(self):
+        """
+        Chỉ khởi tạo biến cho các bàn có trọng số khác 0. Học sinh không thuộc bàn ứng viên
+        nào được chọn sẽ ngồi ở các bàn phụ có trọng số 0.
+        """
+        self.weights = self.calculate_weights()
+        pair_ranks, triple_ranks = candidate_ranks(self.weights)
+        self.index = VariableIndex(self.num_students, pair_ranks, triple_ranks)
+        self._create_bool_vars()
+
+    def _create_bool_vars(self):
+        """ Tạo các biến Boolean theo đúng thứ tự ID của self.index. """
+        names = ['xij_%d_%d' % tuple(table) for table in self.index.pair_tables().tolist()]
+        names += ['xijk_%d_%d_%d' % tuple(table) for table in self.index.triple_tables().tolist()]
+        names += [f'y_{i}' for i in range(1, self.num_students + 1)]
+        self.bool_vars = [self.model.NewBoolVar(name) for name in names]
+        self.variable_count += len(self.bool_vars)  # Tăng biến đếm số lượng biến
+
+    def _load_skeleton(self):
+        """ Sao chép mô hình ràng buộc cứng đã lưu cho cùng sĩ số và lấy lại các biến theo chỉ số. """
+        self.model = self.skeleton.formula.Clone()
+        self.index = self.skeleton.index
+        get_var = self.model.GetBoolVarFromProtoIndex
+        self.bool_vars = [get_var(position) for position in range(self.index.top)]
+        self.variable_count = len(self.bool_vars)
+
+    def _vars(self, var_ids):
+        """ Biến Boolean ứng với các ID biến. """
+        return [self.bool_vars[v - 1] for v in var_ids.tolist()]
 
     def add_hard_clauses(self):
         """ Thêm các ràng buộc cứng vào mô hình. """
+        if self.skeleton is not None:
+            # Các ràng buộc đã có sẵn trong mô hình được sao chép từ khung
+            self.hard_count += self.num_students + self.skeleton.num_valid_table_clauses + 1
+            return
         self._add_single_assignment_clauses()
         self._add_valid_table_clauses()
         self._add_cardinality_constraint()
+        if self.use_skeleton_cache:
+            self.skeleton = HardSkeleton('cpsat', self.num_students, None, self.index,
+                                         self.model.Clone(), self.index.top, 1)
+            store_skeleton(self.skeleton)
 
     def _add_single_assignment_clauses(self):
         """ Thêm ràng buộc đảm bảo mỗi sinh viên được phân vào đúng một bàn. """
         for i in range(1, self.num_students + 1):
             clause = self._get_single_assignment_clause(i)
-            self.model.Add(sum(clause) == 1)
+            if self.prune:
+                self.model.AddAtMostOne(clause)
+            else:
+                self.model.AddExactlyOne(clause)
             self.hard_count += 1
 
     def _get_single_assignment_clause(self, i):
         """ Tạo mệnh đề cho việc phân bàn của sinh viên i. """
-        clause = []
-        if i == 1:
-            clause = [self.xij_vars[(i, j)] for j in range(2, self.num_students + 1)]
-            clause += [self.xijk_vars[(i, j, k)] for j in range(2, self.num_students) for k in range(j + 1, self.num_students + 1)]
-        elif 2 <= i <= self.num_students - 1:
-            clause = [self.xij_vars[(j, i)] for j in range(1, i)] + [self.xij_vars[(i, j)] for j in range(i + 1, self.num_students + 1)]
-            clause += [self.xijk_vars[(j, k, i)] for k in range(2, i) for j in range(1, k)]
-            clause += [self.xijk_vars[(j, i, k)] for j in range(1, i) for k in range(i + 1, self.num_students + 1)]
-            clause += [self.xijk_vars[(i, j, k)] for j in range(i + 1, self.num_students) for k in range(j + 1, self.num_students + 1)]
-        else:  # i == num_students
-            clause = [self.xij_vars[(j, i)] for j in range(1, self.num_students)]
-            clause += [self.xijk_vars[(j, k, i)] for j in range(1, self.num_students - 1) for k in range(j + 1, self.num_students)]
-        return clause
+        return self._vars(self.index.student_vars(i))
 
     def _add_valid_table_clauses(self):
         """ Thêm ràng buộc đảm bảo các phân bàn hợp lệ. """
-        for (i, j) in self.xij_vars:
-            self.model.AddImplication(self.xij_vars[(i, j)], self.y_vars[i])
-            self.model.AddImplication(self.xij_vars[(i, j)], self.y_vars[j])
+        y_vars = self.bool_vars[self.index.y_start - 1:]
+        for var, (i, j) in zip(self._vars(self.index.pair_vars()), self.index.pair_tables().tolist()):
+            self.model.AddImplication(var, y_vars[i - 1])
+            self.model.AddImplication(var, y_vars[j - 1])
             self.hard_count += 2
 
-        for (i, j, k) in self.xijk_vars:
-            self.model.AddImplication(self.xijk_vars[(i, j, k)], self.y_vars[i].Not())
-            self.model.AddImplication(self.xijk_vars[(i, j, k)], self.y_vars[j].Not())
-            self.model.AddImplication(self.xijk_vars[(i, j, k)], self.y_vars[k].Not())
+        for var, (i, j, k) in zip(self._vars(self.index.triple_vars()), self.index.triple_tables().tolist()):
+            self.model.AddImplication(var, y_vars[i - 1].Not())
+            self.model.AddImplication(var, y_vars[j - 1].Not())
+            self.model.AddImplication(var, y_vars[k - 1].Not())
             self.hard_count += 3
 
     def _add_cardinality_constraint(self):
         """ Thêm ràng buộc cho số lượng bàn. """
         num_tables_2 = int(self.num_students * 4 / 7)
-        self.model.Add(sum(self.y_vars.values()) == num_tables_2)
+        y_vars = self._vars(self.index.y_vars())
+        self.model.Add(sum(y_vars) == num_tables_2)
         self.hard_count += 1
+        if self.prune and not filler_is_feasible(self.num_students):
+            # Không thể xếp các học sinh còn lại vào bàn 2 và bàn 3 như mô hình đầy đủ
+            self.model.AddBoolAnd([y_vars[0], y_vars[0].Not()])
+            self.hard_count += 1
 
     def calculate_weights(self):
         """ Tính toán trọng số dựa trên sở thích của sinh viên. """
-        out_degrees = {i: 0 for i in range(1, self.num_students + 1)}
-        for i, friends in self.preferences.items():
-            out_degrees[i] = len(friends)
-
-        wij = {}
-        wijk = {}
+        return calculate_weights(self.num_students, self.preferences)
 
-        for i in range(1, self.num_students + 1):
-            for j in range(i + 1, self.num_students + 1):
-                subgraph_out_degrees = {
-                    v: sum(1 for neighbor in self.preferences.get(v, []) if neighbor in {i, j})
-                    for v in [i, j]
-                }
-                wi = subgraph_out_degrees[i]
-                wj = subgraph_out_degrees[j]
-                wij[(i, j)] = 2 * wi * wj
-            for j in range(i + 1, self.num_students + 1):
-                for k in range(j + 1, self.num_students + 1):
-                    subgraph_out_degrees = {
-                        v: sum(1 for neighbor in self.preferences.get(v, []) if neighbor in {i, j, k})
-                        for v in [i, j, k]
-                    }
-                    wi = subgraph_out_degrees[i]
-                    wj = subgraph_out_degrees[j]
-                    wk = subgraph_out_degrees[k]
-                    wijk[(i, j, k)] = 3 * wi * wj * wk / 8
-        return wij, wijk
-
-    def add_soft_clauses(self, wij, wijk):
+    def add_soft_clauses(self, weights):
         """ Thêm ràng buộc mềm vào mô hình dựa trên loại mã hóa đã chọn. """
         if self.encoding_type == 'min':
-            self._add_soft_clauses_minimizing(wij, wijk)
+            self._add_soft_clauses_minimizing(weights)
         elif self.encoding_type == 'max':
-            self._add_soft_clauses_maximizing(wij, wijk)
+            self._add_soft_clauses_maximizing(weights)
         else:
             raise ValueError("Invalid encoding type. Use 'min' for minimizing or 'max' for maximizing.")
 
-    def _add_soft_clauses_minimizing(self, wij, wijk):
+    def _add_soft_clauses_minimizing(self, weights):
         """ Thêm ràng buộc mềm cho việc tối thiểu hóa. """
-        objective_terms = []
-
-        for (i, j), weight in wij.items():
-            if weight < 2:
-                # Mục tiêu là giảm thiểu số lượng biến được chọn có trọng số thấp
-                objective_terms.append((2 - weight) * self.xij_vars[(i, j)])
-                self.soft_count += 1
-
-        for (i, j, k), weight in wijk.items():
-            if weight < 3:
-                # Mục tiêu là giảm thiểu số lượng biến được chọn có trọng số thấp
-                objective_terms.append((3 - weight) * self.xijk_vars[(i, j, k)])
-                self.soft_count += 1
-
+        # Mục tiêu là giảm thiểu số lượng biến được chọn có trọng số thấp
+        pair_weights, triple_weights = weights.weights_by_var(self.index)
+        var_ids = np.concatenate([self.index.pair_vars(), self.index.triple_vars()])
+        coefficients = np.concatenate([2 - pair_weights, 3 - triple_weights]).astype(np.float64)
+        self.soft_count += int((coefficients > 0).sum())
+        offset = 0
+
+        if self.prune:
+            # Học sinh ngồi bàn phụ (trọng số 0) bị phạt 1, giống như ở mô hình đầy đủ:
+            # sum_i (1 - sum các bàn chứa i) = n - sum_bàn |bàn| * x_bàn
+            sizes = np.concatenate([np.full(self.index.num_pair_vars, 2), np.full(self.index.num_triple_vars, 3)])
+            coefficients -= sizes
+            offset = self.num_students
+            self.soft_count += self.num_students
+
+        keep = coefficients != 0
         # Thêm vào hàm mục tiêu để tối thiểu hóa tổng các điều khoản
-        self.model.Minimize(sum(objective_terms))
+        self.model.Minimize(cp_model.LinearExpr.WeightedSum(self._vars(var_ids[keep]), coefficients[keep].tolist()) + offset)
 
-    def _add_soft_clauses_maximizing(self, wij, wijk):
+    def _add_soft_clauses_maximizing(self, weights):
         """ Thêm ràng buộc mềm cho việc tối đa hóa. """
-        objective_terms = []
-        for (i, j), weight in wij.items():
-            if weight > 0:
-                objective_terms.append(self.xij_vars[(i, j)] * weight)
-                self.soft_count += 1
-
-        for (i, j, k), weight in wijk.items():
-            if weight > 0:
-                objective_terms.append(self.xijk_vars[(i, j, k)] * weight)
-                self.soft_count += 1
-
-        self.model.Maximize(sum(objective_terms))
-
-    def solve(self):
-        """ Giải quyết mô hình bằng bộ giải CP-SAT và lưu thời gian chạy. """
-        self.add_hard_clauses()
-        wij, wijk = self.calculate_weights()
-        self.add_soft_clauses(wij, wijk)
-
-        solver = cp_model.CpSolver()
-        start_time = time.time()
-        status = solver.Solve(self.model)
-        self.solve_time = time.time() - start_time
-
-        # Lấy tổng trọng số được tối ưu hóa từ solver
-        self.total_weight = solver.ObjectiveValue()
-        if(self.encoding_type == 'min'):
-            self.total_weight = self.num_students - self.total_weight
-
-        # self.assigned_tables = []
-        # if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
-        #     for (i, j), var in self.xij_vars.items():
-        #         if solver.Value(var):
-        #             self.assigned_tables.append(sorted([i, j]))
-        #     for (i, j, k), var in self.xijk_vars.items():
-        #         if solver.Value(var):
-        #             self.assigned_tables.append(sorted([i, j, k]))
-        #
-        # self.total_weight = self.extract_solution_and_calculate_weights(self.assigned_tables)
+        pair_weights, triple_weights = weights.weights_by_var(self.index)
+        var_ids = np.concatenate([self.index.pair_vars(), self.index.triple_vars()])
+        coefficients = np.concatenate([pair_weights, triple_weights]).astype(np.float64)
+        keep = coefficients > 0
+        self.soft_count += int(keep.sum())
+        self.model.Maximize(cp_model.LinearExpr.WeightedSum(self._vars(var_ids[keep]), coefficients[keep].tolist()))
+
+    def solve(self, on_solution=None):
+        """
+        Giải quyết mô hình bằng bộ giải CP-SAT và lưu thời gian chạy.
+
+        Args:
+            on_solution (callable): Optional callback on_solution(tables, total_weight, elapsed), called
+                for every improving seating. Returning True stops the search with the current best.
+        """
+        with self.timer.phase('hard_clauses'):
+            self.add_hard_clauses()
+        with self.timer.phase('weights'):
+            weights = self.weights if self.weights is not None else self.calculate_weights()
+        with self.timer.phase('soft_clauses'):
+            self.add_soft_clauses(weights)
+
+        if self.use_hint:
+            with self.timer.phase('hint'):
+                self._add_hint(weights)
+
+        with self.timer.phase('solver_build'):
+            solver = cp_model.CpSolver()
+            for name, value in self.parameters.items():
+                setattr(solver.parameters, name, value)
+            callback = None
+            if on_solution is not None:
+                self.incumbents = []
+                callback = _IncumbentCallback(self, on_solution)
+        with self.timer.phase('solve'):
+            start_time = time.time()
+            status = solver.Solve(self.model, callback)
+            self.solve_time = time.time() - start_time
+        self.status = solver.StatusName(status)
+
+        with self.timer.phase('extract'):
+            # Lấy tổng trọng số được tối ưu hóa từ solver
+            self.total_weight = self.weight_of_objective(solver.ObjectiveValue())
+
+            # Giải mã cả lời giải bằng mảng giá trị của response thay vì gọi BooleanValue cho từng biến
+            self.assigned_tables = []
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                self.assigned_tables = self.decode_values(solver.ResponseProto().solution)
+
+    def _add_hint(self, weights):
+        """ Gợi ý cho CP-SAT lời giải của heuristic (tất cả biến bàn và biến y). """
+        seating = heuristic_seating(self.num_students, self.preferences)
+        if seating is None:
+            return
+        self.hint_weight = weights.total_weight(seating)
+        chosen = seating_vars(self.index, seating)
+        for var, value in zip(self.bool_vars, chosen[1:].tolist()):
+            self.model.AddHint(var, value)
+
+    def weight_of_objective(self, objective):
+        """ Chuyển giá trị hàm mục tiêu của CP-SAT thành tổng trọng số TCPC. """
+        if self.encoding_type == 'min':
+            return self.num_students - objective
+        return objective
+
+    def decode_values(self, values):
+        """ Giải mã các bàn từ giá trị của các biến theo chỉ số proto (response.solution). """
+        return decode_values(self.index, values)
 
     def extract_solution_and_calculate_weights(self, assigned_tables):
         """ Tính toán tổng trọng số được thỏa mãn dựa trên các bàn đã phân. """
-        wij, wijk = self.calculate_weights()
-        total_weight = 0
-
-        for table in assigned_tables:
-            if len(table) == 2:
-                i, j = table
-                if (i, j) in wij:
-                    total_weight += wij[(i, j)]
-            elif len(table) == 3:
-                i, j, k = table
-                if (i, j, k) in wijk:
-                    total_weight += wijk[(i, j, k)]
-
-        return total_weight
+        return self.calculate_weights().total_weight(assigned_tables)
 
     def get_stats(self):
-        """ Trả về các thống kê như số biến, số mệnh đề, trọng số và thời gian giải. """
+        """ Trả về các thống kê như số biến, số mệnh đề, trọng số, thời gian giải và thời gian/bộ nhớ từng pha. """
         return {
             'hard_clauses': self.hard_count,
             'soft_clauses': self.soft_count,
-            'variables': self.variable_count,
+            'variables': self.index.num_variables,
             'total_weight': self.total_weight,
             'solve_time': self.solve_time,
+            'status': self.status,
+            **self.timer.stats(),  # time_<pha>, peak_rss_<pha> và total_time
         }
 
     def print_assigned_tables(self):
@@ -213,20 +301,6 @@ class TeamCompositionCPSATSolver:
             print(table)
 
 
-def read_data(filename):
-    """ Đọc sở thích của sinh viên từ file. """
-    with open(filename, 'r') as file:
-        lines = file.readlines()
-
-    num_students = int(lines[0].strip())
-    preferences = {}
-    for line in lines[1:]:
-        parts = list(map(int, line.strip().split()))
-        preferences[parts[0]] = parts[1:]
-
-    return num_students, preferences
-
-
 if __name__ == "__main__":
     input_data = 'data/max/max_70.txt'
     num_students, preferences = read_data(input_data)
@@ -0,0 +1,46 @@
+import numpy as np
+from candidates import seat_uncovered_students
+
+
+def true_vars_of_model(model):
+    """ Variable ids set to true in a model given as signed literals (PySAT/RC2). """
+    model = np.asarray(model if model is not None else [], dtype=np.int64)
+    return model[model > 0]
+
+
+def true_vars_of_values(values, top):
+    """
+    Variable ids set to true in a list of values indexed by variable id minus one, e.g. the
+    `solution` field of a CP-SAT response (proto index = variable id - 1). Values past `top`
+    belong to auxiliary variables and are ignored.
+    """
+    values = np.asarray(values, dtype=np.int64)[:top]
+    return np.flatnonzero(values) + 1
+
+
+def decode_seating(index, true_vars):
+    """
+    Seating selected by the true variables, in O(model size) array operations.
+
+    Args:
+        index (VariableIndex): Variable index of the encoding.
+        true_vars (np.ndarray): Variable ids set to true, y and auxiliary variables included.
+
+    Returns:
+        list: The selected tables as sorted student lists; with a pruned index the students outside
+            every chosen candidate table are added at filler tables, so every student is seated.
+    """
+    tables = index.decode(true_vars)
+    if index.pruned:
+        tables += seat_uncovered_students(index, true_vars, tables)
+    return tables
+
+
+def decode_model(index, model):
+    """ Seating of a model given as signed literals (see decode_seating). """
+    return decode_seating(index, true_vars_of_model(model))
+
+
+def decode_values(index, values):
+    """ Seating of a CP-SAT solution given by variable values in proto order (see decode_seating). """
+    return decode_seating(index, true_vars_of_values(values, index.top))
@@ -0,0 +1,223 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from ortools.sat.python import cp_model
+from weights import build_adjacency, calculate_weights
+from heuristic import table_counts
+
+
+def preference_components(adj, perfect_only=False):
+    """
+    Splits a class into groups of students that can never score together with anyone outside.
+
+    A table only scores if each of its students likes someone at it, so its students are
+    connected in the undirected preference graph (in the mutual graph if only perfect tables
+    count). Students who list themselves can score with each other without any edge, so they
+    are put in the same group.
+
+    Returns:
+        list: Sorted arrays of student ids, one per component.
+    """
+    num_students = adj.shape[0] - 1
+    graph = adj & adj.T if perfect_only else adj | adj.T
+    graph = graph.copy()
+    self_loops = np.flatnonzero(np.diag(adj)[1:]) + 1
+    if len(self_loops) > 1:
+        graph[np.ix_(self_loops, self_loops)] = True
+
+    labels = np.full(num_students + 1, -1, dtype=np.int64)
+    components = []
+    for start in range(1, num_students + 1):
+        if labels[start] >= 0:
+            continue
+        labels[start] = len(components)
+        stack, members = [start], [start]
+        while stack:
+            neighbors = np.flatnonzero(graph[stack.pop()] & (labels < 0))
+            neighbors = neighbors[neighbors > 0]
+            labels[neighbors] = len(components)
+            stack += neighbors.tolist()
+            members += neighbors.tolist()
+        components.append(np.sort(np.array(members, dtype=np.int64)))
+    return components
+
+
+def solve_component(num_students, preferences, max_pairs, max_triples, perfect_only=False, exact_counts=True):
+    """
+    Solves one component for every feasible number of scoring pair and triple tables.
+
+    Args:
+        num_students (int): Size of the component, students numbered from 1.
+        preferences (dict): Preferences restricted to the component.
+        max_pairs (int): Upper bound on the pair tables (the class-wide number of pair tables).
+        max_triples (int): Upper bound on the triple tables.
+        perfect_only (bool): Only count mutual pairs (wij == 2) and mutual triangles (wijk == 3).
+        exact_counts (bool): Solve once per (pairs, triples) count. Otherwise solve a single model
+            bounded by max_pairs and max_triples, which is enough when the class is one component.
+
+    Returns:
+        dict: Maps (pairs, triples) to (weight, tables) for the best seating that uses exactly that
+            many candidate tables; students outside them are left free.
+    """
+    weights = calculate_weights(num_students, preferences)
+    tables = weights.pairs.tolist() + weights.triples.tolist()
+    table_weights = np.concatenate([weights.wij, weights.wijk]).astype(np.float64)
+    if perfect_only:
+        keep = np.concatenate([weights.wij == 2, weights.wijk == 3])
+        tables = [table for table, k in zip(tables, keep.tolist()) if k]
+        table_weights = table_weights[keep]
+    results = {(0, 0): (0, [])}
+    if not tables:
+        return results
+
+    model = cp_model.CpModel()
+    table_vars = [model.NewBoolVar(f'table_{t}') for t in range(len(tables))]
+    student_tables = [[] for _ in range(num_students + 1)]
+    for var, table in zip(table_vars, tables):
+        for student in table:
+            student_tables[student].append(var)
+    for student_vars in student_tables[1:]:
+        model.AddAtMostOne(student_vars)
+    pair_count = sum(var for var, table in zip(table_vars, tables) if len(table) == 2)
+    triple_count = sum(var for var, table in zip(table_vars, tables) if len(table) == 3)
+    model.Maximize(cp_model.LinearExpr.WeightedSum(table_vars, table_weights.tolist()))
+
+    def solve_counted(pairs, triples, exact):
+        counted = model.Clone()  # Biến của bản sao có cùng chỉ số nên dùng lại được các biểu thức
+        if exact:
+            counted.Add(pair_count == pairs)
+            counted.Add(triple_count == triples)
+        else:
+            counted.Add(pair_count <= pairs)
+            counted.Add(triple_count <= triples)
+        solver = cp_model.CpSolver()
+        if exact_counts:
+            solver.parameters.num_workers = 1  # Các thành phần đã được giải song song
+        if solver.Solve(counted) == cp_model.OPTIMAL:
+            chosen = [table for var, table in zip(table_vars, tables) if solver.BooleanValue(var)]
+            key = (sum(len(table) == 2 for table in chosen), sum(len(table) == 3 for table in chosen))
+            results[key] = (solver.ObjectiveValue(), chosen)
+
+    if not exact_counts:
+        solve_counted(max_pairs, max_triples, exact=False)
+        return results
+    num_pair_tables = len(weights.wij) if not perfect_only else int((weights.wij == 2).sum())
+    num_triple_tables = len(tables) - num_pair_tables
+    for pairs in range(min(max_pairs, num_students // 2, num_pair_tables) + 1):
+        for triples in range(min(max_triples, (num_students - 2 * pairs) // 3, num_triple_tables) + 1):
+            if pairs or triples:
+                solve_counted(pairs, triples, exact=True)
+    return results
+
+
+def merge_components(component_results, num_pairs, num_triples):
+    """
+    Knapsack-style DP choosing one (pairs, triples) entry per component so that the class uses at
+    most `num_pairs` pair tables and `num_triples` triple tables inside components. The remaining
+    tables are filled with free students, so the global two-seat count is always met.
+
+    Returns:
+        tuple: (weight, choices) with the chosen (pairs, triples) key of every component, or
+            (None, None) if no combination fits.
+    """
+    layers = [{(0, 0): (0, None, None)}]
+    for results in component_results:
+        layer = {}
+        for (used_pairs, used_triples), (weight, _, _) in layers[-1].items():
+            for (pairs, triples), (component_weight, _) in results.items():
+                state = (used_pairs + pairs, used_triples + triples)
+                if state[0] > num_pairs or state[1] > num_triples:
+                    continue
+                if state not in layer or weight + component_weight > layer[state][0]:
+                    layer[state] = (weight + component_weight, (used_pairs, used_triples), (pairs, triples))
+        layers.append(layer)
+
+    if not layers[-1]:
+        return None, None
+    state = max(layers[-1], key=lambda key: layers[-1][key][0])
+    weight = layers[-1][state][0]
+    choices = []
+    for layer in reversed(layers[1:]):
+        _, state, choice = layer[state]
+        choices.append(choice)
+    return weight, choices[::-1]
+
+
+class TeamCompositionDecompositionSolver:
+    """
+    Solves every preference component separately and merges the results with a DP over the
+    global table counts.
+
+    Each component is solved (in a process pool) for every feasible number of pair and triple
+    tables; students outside the chosen tables are seated at zero-weight filler tables, which may
+    mix components. The result is exact for the total weight (or, with perfect_only, the weight of
+    the perfect tables), but it only pays off when the class splits into many small components.
+    """
+
+    def __init__(self, num_students, preferences, perfect_only=False, max_workers=None):
+        self.num_students = num_students
+        self.preferences = preferences
+        self.perfect_only = perfect_only  # Chỉ tính các bàn thỏa mãn hoàn toàn (như RC2 'max')
+        self.max_workers = max_workers  # Số tiến trình giải các thành phần (mặc định: số lõi)
+        self.components = []  # Danh sách học sinh của từng thành phần
+        self.total_weight = 0  # Lưu tổng trọng số
+        self.solve_time = 0  # Lưu thời gian chạy
+        self.assigned_tables = []  # Lưu danh sách các bàn đã sắp xếp
+        self.component_solves = 0  # Số bộ (số cặp, số bộ ba) đã giải được trên các thành phần
+
+    def solve(self):
+        """ Giải từng thành phần song song rồi ghép kết quả bằng quy hoạch động. """
+        start_time = time.time()
+        adj = build_adjacency(self.num_students, self.preferences)
+        self.components = preference_components(adj, self.perfect_only)
+        counts = table_counts(self.num_students)
+        if counts is None:
+            self.assigned_tables, self.total_weight = [], None
+            self.solve_time = time.time() - start_time
+            return
+        num_pairs, num_triples = counts
+
+        # Một thành phần duy nhất chỉ cần một lời giải với số bàn bị chặn trên
+        exact_counts = len(self.components) > 1
+        tasks = [self._component_instance(members) + (num_pairs, num_triples, self.perfect_only, exact_counts)
+                 for members in self.components]
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            component_results = list(executor.map(solve_component, *zip(*tasks)))
+        self.component_solves = sum(len(results) for results in component_results)
+
+        weight, choices = merge_components(component_results, num_pairs, num_triples)
+        tables = []
+        for members, results, choice in zip(self.components, component_results, choices):
+            tables += [members[np.asarray(table) - 1].tolist() for table in results[choice][1]]
+        used_pairs = sum(len(table) == 2 for table in tables)
+        seated = np.zeros(self.num_students + 1, dtype=bool)
+        seated[[student for table in tables for student in table]] = True
+        free = (np.flatnonzero(~seated[1:]) + 1).tolist()
+        filler_pairs = 2 * (num_pairs - used_pairs)  # Số học sinh ngồi bàn 2 phụ
+        tables += [free[p:p + 2] for p in range(0, filler_pairs, 2)]
+        tables += [free[t:t + 3] for t in range(filler_pairs, len(free), 3)]
+        self.assigned_tables, self.total_weight = tables, weight
+        self.solve_time = time.time() - start_time
+
+    def _component_instance(self, members):
+        """ Renumbers the students of a component from 1 and keeps the preferences inside it. """
+        local = {int(student): position + 1 for position, student in enumerate(members.tolist())}
+        preferences = {local[student]: [local[friend] for friend in self.preferences.get(student, []) if friend in local]
+                       for student in local}
+        return len(members), preferences
+
+    def get_stats(self):
+        """ Trả về số thành phần, kích thước thành phần lớn nhất, trọng số và thời gian chạy. """
+        return {
+            'components': len(self.components),
+            'largest_component': max((len(members) for members in self.components), default=0),
+            'component_solves': self.component_solves,
+            'total_weight': self.total_weight,
+            'solve_time': self.solve_time,
+        }
+
+    def print_assigned_tables(self):
+        """ In ra danh sách các bàn đã được sắp xếp """
+        print("Assigned tables:")
+        for table in self.assigned_tables:
+            print(table)
@@ -0,0 +1,393 @@
+import os
+import time
+import tempfile
+import threading
+import subprocess
+import numpy as np
+from pysat.formula import IDPool
+from pysat.card import CardEnc, EncType
+from amo import atmost_one, check_amo_encoding
+from indexing import VariableIndex, unrank_pair, unrank_triple
+from candidates import candidate_ranks, filler_is_feasible, num_two_seat_students
+from weights import calculate_weights
+from decoding import decode_seating
+from profiling import PhaseTimer
+
+# Định dạng đầu ra: DIMACS CNF, WCNF mới (MaxSAT Evaluation 2022+, không có header) và WCNF cũ (p wcnf ... top)
+FORMATS = ('cnf', 'wcnf', 'wcnf-old')
+ENCODINGS = ('sat', 'min', 'max')  # sat: chỉ bàn thỏa mãn hoàn toàn (như sat_solver.py); min/max như rc2_solver_tcpc.py
+BLOCK_SIZE = 1 << 16  # Số biến bàn được mã hóa và ghi mỗi lần
+WEIGHT_SCALE = 8  # wijk là bội của 3/8, nên trọng số mềm của mã hóa 'min' được nhân với 8 để thành số nguyên
+INPUT_PLACEHOLDER = '{input}'  # Trong lệnh của bộ giải ngoài: thay bằng đường dẫn file công thức
+
+# Trạng thái của bộ giải ngoài, theo dòng "s ..." của đầu ra
+STATUSES = {
+    'OPTIMUM FOUND': 'OPTIMAL',
+    'SATISFIABLE': 'FEASIBLE',
+    'UNSATISFIABLE': 'UNSAT',
+    'UNKNOWN': 'UNKNOWN',
+}
+
+
+def _var_blocks(num_vars, start, ranks):
+    """ Chia các biến bàn thành khối: (ID biến, hạng của bàn) của từng khối. """
+    for lo in range(0, num_vars, BLOCK_SIZE):
+        hi = min(lo + BLOCK_SIZE, num_vars)
+        yield start + np.arange(lo, hi, dtype=np.int64), np.arange(lo, hi, dtype=np.int64) if ranks is None else ranks[lo:hi]
+
+
+def _sorted_weights(ranks, weights):
+    """ Hạng và trọng số của các bàn có trọng số khác 0, sắp theo hạng để tra bằng np.searchsorted. """
+    order = np.argsort(ranks, kind='stable')
+    return ranks[order], weights[order].astype(np.float64)
+
+
+def _weights_of_ranks(ranks, sorted_ranks, sorted_weights):
+    """ Trọng số của các bàn có hạng `ranks` (0 nếu bàn không có trong danh sách thưa). """
+    w = np.zeros(len(ranks), dtype=np.float64)
+    if len(sorted_ranks):
+        pos = np.minimum(np.searchsorted(sorted_ranks, ranks), len(sorted_ranks) - 1)
+        found = sorted_ranks[pos] == ranks
+        w[found] = sorted_weights[pos[found]]
+    return w
+
+
+def tcpc_clause_blocks(index, weights, encoding_type='min', amo_encoding='seqcounter'):
+    """
+    Generates the TCPC encoding block by block, as the in-process solvers build it, without ever
+    holding the whole formula: the exactly-one constraint of every student, the valid-table and
+    table-count constraints, then the soft clauses ('min'/'max') or the units forbidding the
+    tables that are not fully satisfied ('sat').
+
+    Args:
+        index (VariableIndex): Table variables, full or pruned (see candidates.candidate_ranks).
+        weights (TableWeights): Weights of the class.
+        encoding_type (str): 'sat', 'min' or 'max'.
+        amo_encoding (str): At-most-one encoding of the exactly-one constraints, see amo.py.
+
+    Yields:
+        tuple: ('h', clauses) or ('s', clauses, weights) where clauses is a list of literal lists or
+            an (m, k) int array of clauses of k literals. Soft weights are integers; those of 'min'
+            are scaled by WEIGHT_SCALE.
+    """
+    if encoding_type not in ENCODINGS:
+        raise ValueError(f"Invalid encoding type '{encoding_type}'. Use one of: {', '.join(ENCODINGS)}.")
+    check_amo_encoding(amo_encoding)
+    vpool = IDPool(start_from=index.top + 1)
+    # Mô hình rút gọn xếp học sinh còn lại vào bàn phụ, nên chỉ cần "nhiều nhất một bàn"
+    # (riêng 'sat' rút gọn vẫn cần đủ bàn, như sat_solver.py)
+    exactly_one = not index.pruned or encoding_type == 'sat'
+
+    for i in range(1, index.num_students + 1):
+        lits = index.student_vars(i).tolist()
+        yield 'h', atmost_one(lits, vpool, amo_encoding)
+        if exactly_one:
+            yield 'h', [lits]
+
+    for var_ids, ranks in _var_blocks(index.num_pair_vars, index.pair_start, index.pair_ranks):
+        i, j = unrank_pair(ranks)
+        yield 'h', np.stack([-var_ids, index.y_start - 1 + i, -var_ids, index.y_start - 1 + j], axis=1).reshape(-1, 2)
+    for var_ids, ranks in _var_blocks(index.num_triple_vars, index.triple_start, index.triple_ranks):
+        i, j, k = unrank_triple(ranks)
+        yield 'h', np.stack([-var_ids, -(index.y_start - 1 + i), -var_ids, -(index.y_start - 1 + j),
+                             -var_ids, -(index.y_start - 1 + k)], axis=1).reshape(-1, 2)
+
+    y_vars = index.y_vars().tolist()
+    yield 'h', CardEnc.equals(lits=y_vars, bound=num_two_seat_students(index.num_students), vpool=vpool,
+                              encoding=EncType.seqcounter).clauses
+    if index.pruned and encoding_type != 'sat' and not filler_is_feasible(index.num_students):
+        yield 'h', [[y_vars[0]], [-y_vars[0]]]
+
+    # Trọng số của từng khối được tra trong danh sách thưa (sắp theo hạng), không tạo mảng trọng số cho mọi biến
+    for num_vars, start, var_ranks, sparse, full_weight in [
+            (index.num_pair_vars, index.pair_start, index.pair_ranks,
+             _sorted_weights(weights.pair_ranks(), weights.wij), 2),
+            (index.num_triple_vars, index.triple_start, index.triple_ranks,
+             _sorted_weights(weights.triple_ranks(), weights.wijk), 3)]:
+        for ids, ranks in _var_blocks(num_vars, start, var_ranks):
+            w = _weights_of_ranks(ranks, *sparse)
+            if encoding_type == 'sat':
+                yield 'h', (-ids[w != full_weight])[:, None]
+            elif encoding_type == 'min':
+                keep = w < full_weight
+                yield 's', (-ids[keep])[:, None], np.rint((full_weight - w[keep]) * WEIGHT_SCALE).astype(np.int64)
+            else:
+                keep = w == full_weight
+                yield 's', ids[keep][:, None], np.full(int(keep.sum()), full_weight, dtype=np.int64)
+
+    if index.pruned and encoding_type == 'min':
+        # Học sinh ngồi bàn phụ (trọng số 0) bị phạt 1, như rc2_solver_tcpc.py
+        for i in range(1, index.num_students + 1):
+            lits = index.student_vars(i).tolist()
+            if lits:
+                yield 's', [lits], [WEIGHT_SCALE]
+
+
+def _format_clauses(clauses, prefix='', weights=None):
+    """ DIMACS lines of a block of clauses, each preceded by `prefix` or by its own weight. """
+    if isinstance(clauses, np.ndarray):
+        if not len(clauses):
+            return ''
+        if weights is not None:
+            clauses, prefix = np.column_stack([weights, clauses]), '%d '
+        # Định dạng cả khối bằng một phép % thay vì từng mệnh đề
+        line = prefix.replace('%', '%%') if weights is None else prefix
+        line += ' '.join(['%d'] * (clauses.shape[1] - (weights is not None))) + ' 0\n'
+        return (line * len(clauses)) % tuple(clauses.ravel().tolist())
+    if weights is not None:
+        return ''.join(f"{weight} {' '.join(map(str, clause))} 0\n" for clause, weight in zip(clauses, weights))
+    return ''.join(f"{prefix}{' '.join(map(str, clause))} 0\n" for clause in clauses)
+
+
+def count_blocks(blocks):
+    """
+    Returns:
+        dict: 'variables' (largest variable), 'hard_clauses', 'soft_clauses' and 'soft_weight'
+            (sum of the soft weights) of a stream of clause blocks.
+    """
+    stats = {'variables': 0, 'hard_clauses': 0, 'soft_clauses': 0, 'soft_weight': 0}
+    for block in blocks:
+        clauses = block[1]
+        if isinstance(clauses, np.ndarray):
+            top = int(np.abs(clauses).max(initial=0))
+        else:
+            top = max((abs(lit) for clause in clauses for lit in clause), default=0)
+        stats['variables'] = max(stats['variables'], top)
+        if block[0] == 'h':
+            stats['hard_clauses'] += len(clauses)
+        else:
+            stats['soft_clauses'] += len(clauses)
+            stats['soft_weight'] += int(np.sum(block[2]))
+    return stats
+
+
+def write_formula(out, make_blocks, fmt='wcnf'):
+    """
+    Writes a formula to a text stream (file, pipe) block by block.
+
+    The new WCNF format has no header and is written in one pass. For 'cnf' and 'wcnf-old' the
+    header (and the top weight of the hard clauses) must come first, so the blocks are generated
+    twice: once to count them, once to write them. Either way only one block is in memory at a time.
+
+    Args:
+        out (file): Writable text stream, or a path.
+        make_blocks (callable): Returns a new iterator over the clause blocks (see tcpc_clause_blocks).
+        fmt (str): One of FORMATS.
+
+    Returns:
+        dict: The counts of count_blocks (without 'variables' for the new WCNF format).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid format '{fmt}'. Use one of: {', '.join(FORMATS)}.")
+    if isinstance(out, str):
+        with open(out, 'w') as file:
+            return write_formula(file, make_blocks, fmt)
+
+    stats, hard_prefix = {'hard_clauses': 0, 'soft_clauses': 0, 'soft_weight': 0}, 'h '
+    if fmt != 'wcnf':
+        stats = count_blocks(make_blocks())
+        if fmt == 'cnf':
+            if stats['soft_clauses']:
+                raise ValueError("A CNF file cannot hold soft clauses; use a WCNF format.")
+            out.write(f"p cnf {stats['variables']} {stats['hard_clauses']}\n")
+            hard_prefix = ''
+        else:
+            top = stats['soft_weight'] + 1
+            out.write(f"p wcnf {stats['variables']} {stats['hard_clauses'] + stats['soft_clauses']} {top}\n")
+            hard_prefix = f"{top} "
+
+    for block in make_blocks():
+        if block[0] == 'h':
+            out.write(_format_clauses(block[1], hard_prefix))
+            if fmt == 'wcnf':
+                stats['hard_clauses'] += len(block[1])
+        else:
+            out.write(_format_clauses(block[1], weights=block[2]))
+            if fmt == 'wcnf':
+                stats['soft_clauses'] += len(block[1])
+                stats['soft_weight'] += int(np.sum(block[2]))
+    return stats
+
+
+def parse_solver_output(lines):
+    """
+    Reads the answer of a SAT or MaxSAT solver in the competition format: "s <status>",
+    "o <cost>" for every improving solution and the model on "v" lines, either as literals or,
+    in the MaxSAT Evaluation 2020+ format, as a single string of 0/1 values.
+
+    Returns:
+        tuple: (status, cost, true_vars) — one of the STATUSES values (None without "s" line),
+            the last reported cost (None if none) and the variable ids set to true.
+    """
+    status, cost, values = None, None, []
+    for line in lines:
+        if line.startswith('s '):
+            status = STATUSES.get(line[2:].strip(), line[2:].strip())
+        elif line.startswith('o '):
+            cost = int(line.split()[1])
+        elif line.startswith('v '):
+            values += line.split()[1:]
+    if len(values) == 1 and len(values[0]) > 1 and set(values[0]) <= {'0', '1'}:
+        true_vars = np.flatnonzero(np.frombuffer(values[0].encode(), dtype=np.uint8) == ord('1')) + 1
+    else:
+        lits = np.array(values, dtype=np.int64)
+        true_vars = lits[lits > 0]
+    return status, cost, true_vars
+
+
+def run_external(command, make_blocks, fmt='wcnf', time_limit=None, tmp_dir=None):
+    """
+    Runs a solver binary on a formula streamed to it.
+
+    The formula goes through the solver's standard input, unless an argument of the command is
+    INPUT_PLACEHOLDER: it is then written to a temporary file whose path replaces the placeholder.
+    When time_limit runs out the solver gets SIGTERM (MaxSAT solvers then print their best
+    model) and is killed if it does not stop within a few seconds.
+
+    Args:
+        command (list): The solver command, e.g. ['open-wbo'] or ['kissat', '-q', '{input}'].
+        make_blocks (callable): Returns a new iterator over the clause blocks.
+        fmt (str): One of FORMATS.
+        time_limit (float): Wall-clock limit in seconds, writing included (None for no limit).
+        tmp_dir (str): Directory of the temporary formula file.
+
+    Returns:
+        dict: 'status', 'cost' and 'true_vars' (see parse_solver_output), the formula counts,
+            'write_time', 'solve_time', 'timed_out' and the solver's 'returncode'.
+    """
+    start_time = time.time()
+    path = None
+    if INPUT_PLACEHOLDER in command:
+        with tempfile.NamedTemporaryFile('w', suffix=f".{fmt.split('-')[0]}", dir=tmp_dir, delete=False) as file:
+            path = file.name
+            counts = write_formula(file, make_blocks, fmt)
+        command = [path if arg == INPUT_PLACEHOLDER else arg for arg in command]
+    try:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE if path is None else subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        lines = []
+        # Đọc đầu ra song song để bộ giải không bị chặn khi pipe stdout đầy
+        reader = threading.Thread(target=lambda: lines.extend(process.stdout), daemon=True)
+        reader.start()
+        if path is None:
+            try:
+                counts = write_formula(process.stdin, make_blocks, fmt)
+                process.stdin.close()
+            except BrokenPipeError:  # Bộ giải dừng trước khi đọc hết công thức
+                counts = {}
+        write_time = time.time() - start_time
+
+        timed_out = False
+        try:
+            remaining = None if time_limit is None else max(time_limit - write_time, 0)
+            process.wait(timeout=remaining)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        reader.join()
+    finally:
+        if path is not None:
+            os.remove(path)
+
+    status, cost, true_vars = parse_solver_output(lines)
+    if status is None and timed_out:
+        status = 'TIMEOUT'
+    return dict(counts, status=status, cost=cost, true_vars=true_vars, write_time=write_time,
+                solve_time=time.time() - start_time - write_time, timed_out=timed_out,
+                returncode=process.returncode)
+
+
+class TeamCompositionExternalSolver:
+    """
+    Solves TCPC with an external SAT or MaxSAT solver binary. The formula is streamed to the
+    solver (see run_external), so its size is not limited by the memory of the Python process.
+    """
+
+    def __init__(self, num_students, preferences, command, encoding_type='min', prune=False,
+                 amo_encoding='seqcounter', fmt=None, time_limit=None, trace_memory=False):
+        if encoding_type not in ENCODINGS:
+            raise ValueError(f"Invalid encoding type '{encoding_type}'. Use one of: {', '.join(ENCODINGS)}.")
+        self.num_students = num_students
+        self.preferences = preferences
+        self.command = list(command)
+        self.encoding_type = encoding_type  # 'sat', 'min' hoặc 'max'
+        self.prune = prune
+        self.amo_encoding = amo_encoding
+        self.fmt = fmt or ('cnf' if encoding_type == 'sat' else 'wcnf')
+        self.time_limit = time_limit
+        self.weights = None
+        self.index = None
+        self.result = {}  # Kết quả của run_external
+        self.status = None
+        self.total_weight = 0  # Lưu tổng trọng số
+        self.solve_time = 0  # Lưu thời gian chạy (ghi công thức và giải)
+        self.assigned_tables = []  # Lưu danh sách các bàn đã sắp xếp
+        self.timer = PhaseTimer(trace_memory)  # Thời gian và bộ nhớ của từng pha
+
+    def solve(self):
+        """ Ghi công thức vào bộ giải ngoài, chờ kết quả rồi giải mã lời giải. """
+        with self.timer.phase('weights'):
+            self.weights = calculate_weights(self.num_students, self.preferences)
+        with self.timer.phase('init'):
+            if self.prune:
+                pair_ranks, triple_ranks = candidate_ranks(self.weights, perfect_only=self.encoding_type != 'min')
+                self.index = VariableIndex(self.num_students, pair_ranks, triple_ranks)
+            else:
+                self.index = VariableIndex(self.num_students)
+        with self.timer.phase('solve'):
+            self.result = run_external(
+                self.command, lambda: tcpc_clause_blocks(self.index, self.weights, self.encoding_type, self.amo_encoding),
+                self.fmt, self.time_limit)
+            self.solve_time = self.result['write_time'] + self.result['solve_time']
+        self.status = self.result['status']
+
+        with self.timer.phase('extract'):
+            self.assigned_tables = []
+            if self.status in ('OPTIMAL', 'FEASIBLE') and len(self.result['true_vars']):
+                self.assigned_tables = decode_seating(self.index, self.result['true_vars'])
+            self.total_weight = self.weight_of_seating(self.assigned_tables)
+
+    def weight_of_seating(self, tables):
+        """ Tổng wij/wijk ('min'), hoặc số học sinh ở bàn thỏa mãn hoàn toàn ('max', 'sat'), như RC2. """
+        if self.encoding_type == 'min':
+            return self.weights.total_weight(tables)
+        pair_weights, triple_weights = dict(self.weights.pair_items()), dict(self.weights.triple_items())
+        return sum(len(table) for table in tables
+                   if (pair_weights if len(table) == 2 else triple_weights).get(tuple(sorted(table)), 0) == len(table))
+
+    def get_stats(self):
+        """ Trả về kích thước công thức, trạng thái, trọng số, thời gian ghi/giải và thời gian/bộ nhớ từng pha. """
+        return {
+            'variables': self.result.get('variables', self.index.num_variables if self.index else None),
+            'hard_clauses': self.result.get('hard_clauses'),
+            'soft_clauses': self.result.get('soft_clauses'),
+            'total_weight': self.total_weight,
+            'solve_time': self.solve_time,
+            'write_time': self.result.get('write_time'),
+            'status': self.status,
+            'timed_out': self.result.get('timed_out'),
+            **self.timer.stats(),  # time_<pha>, peak_rss_<pha> và total_time
+        }
+
+    def print_assigned_tables(self):
+        """ In ra danh sách các bàn đã được sắp xếp """
+        print("Assigned tables:")
+        for table in self.assigned_tables:
+            print(table)
+
+
+if __name__ == "__main__":
+    from instance_io import read_data
+
+    num_students, preferences = read_data('data/fully/fully_14.txt')
+    # Bộ giải MaxSAT bất kỳ đọc WCNF, ở đây là RC2 của PySAT chạy như chương trình ngoài
+    solver = TeamCompositionExternalSolver(num_students, preferences, ['rc2.py', '--vnew', INPUT_PLACEHOLDER],
+                                           encoding_type='min', time_limit=600)
+    solver.solve()
+    print(solver.get_stats())
+    solver.print_assigned_tables()
@@ -1,28 +1,43 @@
 import os
-import pandas as pd
-from openpyxl import load_workbook
+import time
 from rc2_solver_tcpc import TeamCompositionSolver, read_data
-from cpsat_solver import TeamCompositionCPSATSolver
+from cpsat_solver import TeamCompositionCPSATSolver, SOLVE_PROFILES
 from sat_solver import TeamCompositionSATSolver
+from amo import AMO_ENCODINGS
+from result_store import ResultStore, DEFAULT_STORE, instance_hash
+from profiling import phase_columns
 
+PAIRWISE_MAX_STUDENTS = 21  # Mã hóa từng cặp có O(n^4) mệnh đề cho mỗi học sinh, chỉ dùng cho lớp nhỏ
 
-def run_and_export(data_directory, output_file="results.xlsx", num_runs=2):
+
+def run_and_export(data_directory, output_file="results.xlsx", num_runs=2, store_file=DEFAULT_STORE):
     """
     Runs the solver on all .txt files in the specified directory multiple times and averages the results.
 
+    Every result is appended to the result store as soon as it is ready; the Excel file is written
+    once at the end from the rows of this directory.
+
     Args:
         data_directory (str): Path to the directory containing the input files.
+        store_file (str): Path to the SQLite result store.
 
     Returns:
         list: A list of dictionaries containing the results for each file.
     """
+    store = ResultStore(store_file)
+    params = {'num_runs': num_runs}
+    hashes, results = [], []
     for filename in os.listdir(data_directory):
         if filename.endswith(".txt"):
             filepath = os.path.join(data_directory, filename)
             print("Running on", filename)
             result = run_on_file(filepath, num_runs=num_runs)
             print("Done results for", filename)
-            export_to_excel([result], output_file)
+            store.append(result, 'sat,rc2,cpsat', params=params, filepath=filepath)
+            hashes.append(instance_hash(filepath))
+            results.append(result)
+    store.export_excel(output_file, solver='sat,rc2,cpsat', params=params, instance_hashes=hashes, latest=True)
+    return results
 
 
 def run_on_file(filepath, num_runs=2):
@@ -42,11 +57,13 @@ def run_on_file(filepath, num_runs=2):
     ### SAT Solver ###
     total_time_sat, solution_found = 0, False
     sat_stats = None
+    sat_runs = []  # Thống kê của từng lần chạy (thời gian/bộ nhớ từng pha)
 
     for _ in range(num_runs):
         sat_solver = TeamCompositionSATSolver(num_students, preferences)
         sat_solver.solve()
         sat_stats = sat_solver.get_stats()
+        sat_runs.append(sat_stats)
         total_time_sat += sat_stats['solve_time']
         solution_found = sat_stats['solution_found']  # Keep track of solution existence
     avg_time_sat = total_time_sat / num_runs
@@ -55,11 +72,13 @@ def run_on_file(filepath, num_runs=2):
     # RC2 Solver with minimizing encoding
     total_time_rc2_min, total_weight_rc2_min = 0, 0
     rc2_stats_min = None  # Khởi tạo rc2_stats_min để lưu kết quả cuối cùng
+    rc2_runs_min = []
 
     for _ in range(num_runs):
         rc2_solver_min = TeamCompositionSolver(num_students, preferences, encoding_type='min')
         rc2_solver_min.solve()
         rc2_stats_min = rc2_solver_min.get_stats()  # Lấy kết quả sau mỗi lần chạy
+        rc2_runs_min.append(rc2_stats_min)
         total_time_rc2_min += rc2_stats_min['solve_time']
         total_weight_rc2_min += rc2_stats_min['total_weight']
     avg_time_rc2_min = total_time_rc2_min / num_runs
@@ -69,11 +88,13 @@ def run_on_file(filepath, num_runs=2):
     # CP-SAT Solver with maximizing encoding
     total_time_cpsat_max, total_weight_cpsat_max = 0, 0
     cpsat_stats_max = None  # Khởi tạo cpsat_stats_max để lưu kết quả cuối cùng
+    cpsat_runs_max = []
 
     for _ in range(num_runs):
         cpsat_solver_max = TeamCompositionCPSATSolver(num_students, preferences, encoding_type='max')
         cpsat_solver_max.solve()
         cpsat_stats_max = cpsat_solver_max.get_stats()  # Lấy kết quả sau mỗi lần chạy
+        cpsat_runs_max.append(cpsat_stats_max)
         total_time_cpsat_max += cpsat_stats_max['solve_time']
         total_weight_cpsat_max += cpsat_stats_max['total_weight']
     avg_time_cpsat_max = total_time_cpsat_max / num_runs
@@ -83,11 +104,13 @@ def run_on_file(filepath, num_runs=2):
     # CP-SAT Solver with minimizing encoding
     total_time_cpsat_min, total_weight_cpsat_min = 0, 0
     cpsat_stats_min = None  # Khởi tạo cpsat_stats_min để lưu kết quả cuối cùng
+    cpsat_runs_min = []
 
     for _ in range(num_runs):
         cpsat_solver_min = TeamCompositionCPSATSolver(num_students, preferences, encoding_type='min')
         cpsat_solver_min.solve()
         cpsat_stats_min = cpsat_solver_min.get_stats()  # Lấy kết quả sau mỗi lần chạy
+        cpsat_runs_min.append(cpsat_stats_min)
         total_time_cpsat_min += cpsat_stats_min['solve_time']
         total_weight_cpsat_min += cpsat_stats_min['total_weight']
     avg_time_cpsat_min = total_time_cpsat_min / num_runs
@@ -118,34 +141,138 @@ def run_on_file(filepath, num_runs=2):
         'total_weight_max_cpsat': avg_weight_cpsat_max,
         'total_weight_min_cpsat': avg_weight_cpsat_min,
     }
+    # Thời gian từng pha (mã hóa, giải, giải mã) và bộ nhớ, ví dụ time_hard_clauses_min_rc2
+    result.update(phase_columns(sat_runs, 'sat'))
+    result.update(phase_columns(rc2_runs_min, 'min_rc2'))
+    result.update(phase_columns(cpsat_runs_max, 'max_cpsat'))
+    result.update(phase_columns(cpsat_runs_min, 'min_cpsat'))
     print(result)
     return result
 
 
+def benchmark_encodings(data_directory, output_file="results/encodings.xlsx", encodings=AMO_ENCODINGS, num_runs=1,
+                        store_file=DEFAULT_STORE):
+    """
+    Runs the SAT solver and the RC2 solver (minimizing) with every AMO encoding on all .txt files in the directory.
+
+    Args:
+        data_directory (str): Path to the directory containing the input files.
+        output_file (str): Path to the output Excel file.
+        encodings (list): AMO encodings to compare (see amo.AMO_ENCODINGS).
+        num_runs (int): Number of times to run each solver to average the times.
+        store_file (str): Path to the SQLite result store.
+    """
+    store = ResultStore(store_file)
+    params = {'num_runs': num_runs}
+    hashes = []
+    for filename in os.listdir(data_directory):
+        if filename.endswith(".txt"):
+            filepath = os.path.join(data_directory, filename)
+            print("Benchmarking encodings on", filename)
+            for encoding in encodings:
+                if encoding != 'pairwise' or read_data(filepath)[0] <= PAIRWISE_MAX_STUDENTS:
+                    result = run_encoding_benchmark(filepath, encoding, num_runs)
+                    store.append(result, 'sat,rc2', encoding_type=encoding, params=params, filepath=filepath)
+            hashes.append(instance_hash(filepath))
+    store.export_excel(output_file, solver='sat,rc2', params=params, instance_hashes=hashes, latest=True)
+
+
+def run_encoding_benchmark(filepath, encoding, num_runs=1):
+    """
+    Measures formula size, build time and solve time of one AMO encoding for the SAT and RC2 (minimizing) solvers.
+
+    The skeleton cache is disabled so that every run pays for encoding the hard clauses.
+
+    Returns:
+        dict: One result row for the file and encoding.
+    """
+    num_students, preferences = read_data(filepath)
+    result = {'filename': os.path.basename(filepath), 'num_students': num_students, 'amo_encoding': encoding}
+
+    for name, make_solver in [
+        ('sat', lambda: TeamCompositionSATSolver(num_students, preferences, use_skeleton_cache=False,
+                                                 amo_encoding=encoding)),
+        ('min_rc2', lambda: TeamCompositionSolver(num_students, preferences, encoding_type='min',
+                                                  use_skeleton_cache=False, amo_encoding=encoding)),
+    ]:
+        total_build_time, total_solve_time = 0, 0
+        for _ in range(num_runs):
+            start_time = time.time()
+            solver = make_solver()
+            solver.solve()
+            stats = solver.get_stats()
+            total_solve_time += stats['solve_time']
+            total_build_time += time.time() - start_time - stats['solve_time']
+
+        num_clauses = len(solver.formula.clauses) if name == 'sat' else len(solver.formula.hard) + len(solver.formula.soft)
+        result[f'formula_variables_{name}'] = solver.formula.nv
+        result[f'formula_clauses_{name}'] = num_clauses
+        result[f'build_time_{name}'] = total_build_time / num_runs
+        result[f'time_{name}'] = total_solve_time / num_runs
+        if name == 'sat':
+            result['solution_found'] = 'SAT' if stats['solution_found'] else 'UNSAT'
+        else:
+            result['total_weight_min_rc2'] = stats['total_weight']
+    print(result)
+    return result
+
 
-def export_to_excel(results, output_file):
+def benchmark_profiles(data_directories=('data/fully/', 'data/max/'), output_file="results/profiles.xlsx",
+                       profiles=SOLVE_PROFILES, encoding_type='max', num_runs=1, store_file=DEFAULT_STORE):
     """
-    Exports results to an Excel file. If the file already exists, it appends the new data.
+    Runs the CP-SAT solver with every solve profile on all .txt files in the given directories.
 
     Args:
-        results (list): A list of dictionaries containing solver results.
+        data_directories (tuple): Directories containing the input files.
         output_file (str): Path to the output Excel file.
+        profiles (list): Names of the profiles to compare (see cpsat_solver.SOLVE_PROFILES).
+        encoding_type (str): 'max' or 'min'.
+        num_runs (int): Number of times to run each profile to average the time and total weight.
+        store_file (str): Path to the SQLite result store.
     """
-    df = pd.DataFrame(results)
+    store = ResultStore(store_file)
+    hashes = []
+    for data_directory in data_directories:
+        for filename in os.listdir(data_directory):
+            if filename.endswith(".txt"):
+                filepath = os.path.join(data_directory, filename)
+                print("Benchmarking CP-SAT profiles on", filename)
+                for profile in profiles:
+                    result = run_profile_benchmark(filepath, profile, encoding_type, num_runs)
+                    store.append(result, 'cpsat', encoding_type=encoding_type,
+                                 params={'profile': profile, 'num_runs': num_runs}, filepath=filepath)
+                hashes.append(instance_hash(filepath))
+    store.export_excel(output_file, solver='cpsat', encoding_type=encoding_type, instance_hashes=hashes, latest=True)
 
-    if os.path.exists(output_file):
-        # Append data to an existing file
-        with pd.ExcelWriter(output_file, mode='a', engine='openpyxl', if_sheet_exists='overlay') as writer:
-            book = load_workbook(output_file)
-            sheet = book.active
-            start_row = sheet.max_row  # Append data at the first available empty row
-            df.to_excel(writer, index=False, startrow=start_row, header=False)
-    else:
-        # Create a new Excel file
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False)
 
-    print(f"Results have been appended to {output_file}")
+def run_profile_benchmark(filepath, profile, encoding_type='max', num_runs=1):
+    """
+    Measures solve time and objective of one CP-SAT solve profile on a file.
+
+    Returns:
+        dict: One result row for the file and profile.
+    """
+    num_students, preferences = read_data(filepath)
+    total_time, total_weight = 0, 0
+    for _ in range(num_runs):
+        solver = TeamCompositionCPSATSolver(num_students, preferences, encoding_type=encoding_type, profile=profile)
+        solver.solve()
+        stats = solver.get_stats()
+        total_time += stats['solve_time']
+        total_weight += stats['total_weight']
+
+    result = {
+        'filename': os.path.basename(filepath),
+        'num_students': num_students,
+        'profile': profile,
+        'encoding_type': encoding_type,
+        'time_cpsat': total_time / num_runs,
+        'total_weight_cpsat': total_weight / num_runs,
+        'status_cpsat': stats['status'],  # OPTIMAL hoặc FEASIBLE nếu hết thời gian
+        'hint_weight': solver.hint_weight,  # Trọng số của lời giải gợi ý (nếu có)
+    }
+    print(result)
+    return result
 
 
 if __name__ == "__main__":
@@ -167,3 +294,9 @@ if __name__ == "__main__":
     data_directory = 'data/temp/'
     output_file = 'results/temp.xlsx'
     run_and_export(data_directory, output_file, 1)
+
+    # # So sánh các mã hóa at-most-one
+    # benchmark_encodings('data/fully/', 'results/encodings_fully.xlsx')
+
+    # # So sánh các cấu hình giải của CP-SAT trên data/fully và data/max
+    # benchmark_profiles(('data/fully/', 'data/max/'), 'results/profiles.xlsx')
@@ -1,36 +1,50 @@
 import os
-import pandas as pd
-from openpyxl import load_workbook
 from rc2_solver_timeout import TeamCompositionSolver, read_data
+from result_store import ResultStore, DEFAULT_STORE, instance_hash
+from profiling import phase_columns
 
 
-
-def run_and_export(data_directory, output_file="results.xlsx", num_runs=2):
+def run_and_export(data_directory, output_file="results.xlsx", num_runs=2, timeout=450, store_file=DEFAULT_STORE):
     """
     Runs the solver on all .txt files in the specified directory multiple times and averages the results.
 
+    Every result is appended to the result store as soon as it is ready; the Excel file is written
+    once at the end from the rows of this directory.
+
     Args:
         data_directory (str): Path to the directory containing the input files.
+        timeout (float): Wall-clock limit in seconds for each RC2 run.
+        store_file (str): Path to the SQLite result store.
 
     Returns:
         list: A list of dictionaries containing the results for each file.
     """
+    store = ResultStore(store_file)
+    params = {'num_runs': num_runs, 'timeout': timeout}
+    hashes, results = [], []
     for filename in os.listdir(data_directory):
         if filename.endswith(".txt"):
             filepath = os.path.join(data_directory, filename)
             print("Running on", filename)
-            result = run_on_file(filepath, num_runs=num_runs)
+            result = run_on_file(filepath, num_runs=num_runs, timeout=timeout)
             print("Done results for", filename)
-            export_to_excel([result], output_file)
+            store.append(result, 'rc2_timeout', encoding_type='max', params=params, filepath=filepath)
+            hashes.append(instance_hash(filepath))
+            results.append(result)
+    store.export_excel(output_file, solver='rc2_timeout', params=params, instance_hashes=hashes, latest=True)
+    return results
 
 
-def run_on_file(filepath, num_runs=1):
+def run_on_file(filepath, num_runs=1, timeout=450):
     """
     Processes a single file and runs the RC2 solver multiple times with maximizing encoding to average the time and total weight.
 
     Args:
         filepath (str): Path to the input file.
         num_runs (int): Number of times to run the solver to average the time and total weight.
+        timeout (float): Wall-clock limit in seconds for each run. Runs that hit it report the best
+            weight found so far and status FEASIBLE, or no weight and status TIMEOUT. A run whose
+            solver fails reports no weight and status ERROR instead of stopping the export.
 
     Returns:
         dict: A dictionary containing averaged results from the RC2 solver, including the filename.
@@ -39,19 +53,25 @@ def run_on_file(filepath, num_runs=1):
     num_students, preferences = read_data(filepath)
 
     # RC2 Solver with maximizing encoding
-    total_time_rc2_max, total_weight_rc2_max = 0, 0
+    total_time_rc2_max, total_weight_rc2_max, weighted_runs = 0, 0, 0
     rc2_stats_max = None  # Khởi tạo rc2_stats_max để lưu kết quả cuối cùng
+    statuses = []  # Trạng thái của từng lần chạy
+    rc2_runs_max = []  # Thống kê của từng lần chạy (thời gian/bộ nhớ từng pha)
 
     for _ in range(num_runs):
         rc2_solver_max = TeamCompositionSolver(num_students, preferences, encoding_type='max')
-        rc2_solver_max.solve()
+        rc2_solver_max.solve(timeout)
         rc2_stats_max = rc2_solver_max.get_stats()  # Lấy kết quả sau mỗi lần chạy
+        rc2_runs_max.append(rc2_stats_max)
         total_time_rc2_max += rc2_stats_max['solve_time']
-        total_weight_rc2_max += rc2_stats_max['total_weight']
+        statuses.append(rc2_stats_max['status'])
+        if rc2_stats_max['total_weight'] is not None:  # Không có lời giải khi TIMEOUT hoặc ERROR
+            total_weight_rc2_max += rc2_stats_max['total_weight']
+            weighted_runs += 1
 
     # Tính thời gian và trọng số trung bình sau num_runs lần chạy
     avg_time_rc2_max = total_time_rc2_max / num_runs
-    avg_weight_rc2_max = total_weight_rc2_max / num_runs
+    avg_weight_rc2_max = total_weight_rc2_max / weighted_runs if weighted_runs else None
     print("RC2 Solver (maximizing) done")
 
     # Extracting the filename from filepath
@@ -65,39 +85,14 @@ def run_on_file(filepath, num_runs=1):
         'variables_rc2': rc2_stats_max['variables'],
         'soft_count_max_rc2': rc2_stats_max['soft_clauses'],
         'time_max_rc2': avg_time_rc2_max,
-        'total_weight_max_rc2': avg_weight_rc2_max
+        'total_weight_max_rc2': avg_weight_rc2_max,
+        'status_max_rc2': ','.join(sorted(set(statuses))),
+        **phase_columns(rc2_runs_max, 'max_rc2'),  # Thời gian và bộ nhớ từng pha
     }
 
     return result
 
 
-
-
-def export_to_excel(results, output_file):
-    """
-    Exports results to an Excel file. If the file already exists, it appends the new data.
-
-    Args:
-        results (list): A list of dictionaries containing solver results.
-        output_file (str): Path to the output Excel file.
-    """
-    df = pd.DataFrame(results)
-
-    if os.path.exists(output_file):
-        # Append data to an existing file
-        with pd.ExcelWriter(output_file, mode='a', engine='openpyxl', if_sheet_exists='overlay') as writer:
-            book = load_workbook(output_file)
-            sheet = book.active
-            start_row = sheet.max_row  # Append data at the first available empty row
-            df.to_excel(writer, index=False, startrow=start_row, header=False)
-    else:
-        # Create a new Excel file
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False)
-
-    print(f"Results have been appended to {output_file}")
-
-
 if __name__ == "__main__":
     # # Specify the directory containing input files and the output Excel file
     # data_directory = 'data/fully/'
@@ -48,9 +48,8 @@ def generate_fully_satisfied_random_data(num_students):
                                         :random.randint(0, len(remaining_students))]  # Add random classmates
 
     # Format the data as required
-    formatted_data = f"{num_students}\n"
-    for student in students:
-        formatted_data += f"{student} " + " ".join(map(str, preferences[student])) + "\n"
+    formatted_data = f"{num_students}\n" + "".join(
+        f"{student} " + " ".join(map(str, preferences[student])) + "\n" for student in students)
 
     return formatted_data
 
@@ -77,7 +76,8 @@ def save_data_to_file(num_students, data, directory="data/fully"):
     print(f"Fully satisfied random data for {num_students} students saved to {filename}")
 
 
-# Generate and save fully satisfied random data for multiples of 7 students (from 7 to 126)
-for num_students in range(7, 127, 7):
-    formatted_data = generate_fully_satisfied_random_data(num_students)
-    save_data_to_file(num_students, formatted_data)
+if __name__ == "__main__":
+    # Generate and save fully satisfied random data for multiples of 7 students (from 7 to 126)
+    for num_students in range(7, 127, 7):
+        formatted_data = generate_fully_satisfied_random_data(num_students)
+        save_data_to_file(num_students, formatted_data)
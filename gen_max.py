@@ -27,9 +27,8 @@ def generate_simulated_data(num_students):
         preferences[student] = preferred_classmates
 
     # Format the data as required
-    formatted_data = f"{num_students}\n"
-    for student in students:
-        formatted_data += f"{student} " + " ".join(map(str, preferences[student])) + "\n"
+    formatted_data = f"{num_students}\n" + "".join(
+        f"{student} " + " ".join(map(str, preferences[student])) + "\n" for student in students)
 
     return formatted_data
 
@@ -48,7 +47,8 @@ def save_data_to_file(num_students, data):
     print(f"Data for {num_students} students saved to {filename}")
 
 
-# Generate and save data for multiples of 7 students (from 7 to 126)
-for num_students in range(7, 127, 7):
-    formatted_data = generate_simulated_data(num_students)
-    save_data_to_file(num_students, formatted_data)
+if __name__ == "__main__":
+    # Generate and save data for multiples of 7 students (from 7 to 126)
+    for num_students in range(7, 127, 7):
+        formatted_data = generate_simulated_data(num_students)
+        save_data_to_file(num_students, formatted_data)
@@ -0,0 +1,264 @@
+import os
+import numpy as np
+from instance_io import BINARY_EXTENSION, TEXT_EXTENSION, packed_digest, save_packed, save_reference
+
+# Các họ dữ liệu:
+# fully: có lời giải thỏa mãn hoàn toàn được cài sẵn (như gen_fully.py); max: trường hợp chung (như gen_max.py)
+# noise: cách xếp cài sẵn nhưng mỗi lựa chọn bạn cùng bàn bị bỏ với xác suất `noise`
+# community: học sinh chia thành các nhóm, yêu thích dày trong nhóm và thưa giữa các nhóm
+# sparse: đồ thị ngẫu nhiên thưa, trung bình SPARSE_DEGREE lựa chọn mỗi học sinh
+KINDS = ('fully', 'max', 'noise', 'community', 'sparse')
+PLANTED_KINDS = ('fully', 'noise')  # Các họ ghi cách xếp cài sẵn vào file tham chiếu
+BLOCK_ROWS = 256  # Số hàng của ma trận yêu thích được sinh mỗi lần; cố định để kết quả chỉ phụ thuộc vào seed
+SPARSE_DEGREE = 3
+
+
+def _check_arguments(num_students, kind, density, noise, community_size, outside_density):
+    if kind not in KINDS:
+        raise ValueError(f"Invalid kind '{kind}'. Use one of: {', '.join(KINDS)}.")
+    if num_students < 7 or num_students % 7 != 0:
+        raise ValueError("Number of students must be a positive multiple of 7.")
+    for name, value in (('density', density), ('noise', noise), ('outside_density', outside_density)):
+        if value is not None and not 0 <= value <= 1:
+            raise ValueError(f"{name} must be between 0 and 1.")
+    if community_size < 2:
+        raise ValueError("community_size must be at least 2.")
+
+
+def planted_tables(num_students, rng):
+    """
+    Random seating of a fully-satisfied class: the shuffled students are split into groups of 7,
+    each seated at two tables of 2 and one table of 3.
+
+    Returns:
+        np.ndarray: (num_students + 1,) table id of every student (-1 for the unused id 0).
+    """
+    position = np.arange(num_students)
+    table_ids = 3 * (position // 7) + (position % 7 >= 2) + (position % 7 >= 4)
+    table_of = np.full(num_students + 1, -1, dtype=np.int64)
+    table_of[rng.permutation(num_students) + 1] = table_ids
+    return table_of
+
+
+def _groups(num_students, kind, community_size, seed):
+    """ Nhóm của từng học sinh (bàn cài sẵn hoặc cộng đồng) và seed của từng khối hàng. """
+    starts = range(1, num_students + 1, BLOCK_ROWS)
+    group_sequence, *block_sequences = np.random.SeedSequence(seed).spawn(1 + len(starts))
+    rng = np.random.default_rng(group_sequence)
+    group_of = None
+    if kind in PLANTED_KINDS:
+        group_of = planted_tables(num_students, rng)
+    elif kind == 'community':
+        group_of = np.full(num_students + 1, -1, dtype=np.int64)
+        group_of[rng.permutation(num_students) + 1] = np.arange(num_students) // community_size
+    return group_of, zip(starts, block_sequences)
+
+
+def row_blocks(num_students, kind='max', density=None, seed=None, noise=0.1, community_size=70,
+               outside_density=0.0):
+    """
+    Generates the preference matrix of a class BLOCK_ROWS rows at a time, so classes of tens of
+    thousands of students never hold the whole matrix in memory.
+
+    Every student prefers each classmate independently with their own probability: drawn uniformly
+    from [0, 1] for every student when density is None, as the subset sizes of gen_fully.py and
+    gen_max.py are uniform, or `density` for all students. On top of that, per kind:
+    'fully' — every student also prefers their table mates in a random planted seating, so the class
+    is fully satisfied; 'noise' — as 'fully', but each of these choices is dropped with probability
+    `noise`; 'community' — the probability only applies inside random communities of
+    `community_size` students and `outside_density` applies between them; 'sparse' — density
+    defaults to SPARSE_DEGREE / (num_students - 1). With 'max', 'community' and 'sparse' every
+    student prefers at least one classmate.
+
+    Args:
+        num_students (int): Number of students (multiple of 7).
+        kind (str): One of KINDS.
+        density (float): Probability that a student prefers a given classmate (None: per-student random).
+        seed (int): Seed; the same seed gives the same class.
+        noise (float): Probability of dropping a planted choice ('noise').
+        community_size (int): Students per community ('community').
+        outside_density (float): Probability of a choice between communities ('community').
+
+    Yields:
+        tuple: (start, block) where block is the bool (rows, num_students + 1) slice of the matrix
+            for students start, start + 1, ... (see weights.build_adjacency).
+    """
+    _check_arguments(num_students, kind, density, noise, community_size, outside_density)
+    if kind == 'sparse' and density is None:
+        density = min(1.0, SPARSE_DEGREE / (num_students - 1))
+    group_of, blocks = _groups(num_students, kind, community_size, seed)
+
+    for start, sequence in blocks:
+        rng = np.random.default_rng(sequence)
+        stop = min(start + BLOCK_ROWS, num_students + 1)
+        rows, students = np.arange(stop - start), np.arange(start, stop)
+        probability = rng.random(len(rows)) if density is None else np.full(len(rows), density)
+        draws = rng.random((len(rows), num_students + 1), dtype=np.float32)
+        same_group = None if group_of is None else group_of[students, None] == group_of[None, :]
+        if kind == 'community':
+            block = draws < np.where(same_group, probability[:, None], outside_density)
+        else:
+            block = draws < probability[:, None]
+        if kind == 'fully':
+            block |= same_group
+        elif kind == 'noise':
+            block |= same_group & (rng.random(block.shape, dtype=np.float32) >= noise)
+        block[:, 0] = False
+        block[rows, students] = False  # Không ai tự chọn chính mình
+
+        if kind not in PLANTED_KINDS:
+            lonely = np.flatnonzero(~block.any(axis=1))
+            friends = rng.integers(1, num_students, size=len(lonely))
+            block[lonely, friends + (friends >= students[lonely])] = True
+        yield start, block
+
+
+def planted_seating(num_students, seed=None):
+    """
+    The planted seating of a 'fully' or 'noise' class generated with this seed.
+
+    Returns:
+        tuple: (tables, table_of) — the tables as sorted student lists and the table id of every student.
+    """
+    table_of, _ = _groups(num_students, 'fully', None, seed)
+    students = np.argsort(table_of[1:], kind='stable') + 1
+    bounds = np.flatnonzero(np.diff(table_of[students])) + 1
+    return [table.tolist() for table in np.split(students, bounds)], table_of
+
+
+class _PlantedWeight:
+    """ Đếm bậc ra của mỗi học sinh trong bàn cài sẵn khi các khối hàng đi qua, để tính trọng số của cách xếp. """
+
+    def __init__(self, num_students, seed):
+        self.tables, self.table_of = planted_seating(num_students, seed)
+        self.degree = np.zeros(num_students + 1, dtype=np.int64)
+
+    def track(self, blocks):
+        for start, block in blocks:
+            students = np.arange(start, start + len(block))
+            mates = self.table_of[students, None] == self.table_of[None, :]
+            self.degree[students] = (block & mates).sum(axis=1)
+            yield start, block
+
+    def weights(self):
+        """ (total_weight, perfect_weight) of the planted seating, as in verifier.verify_seating. """
+        total, perfect = 0.0, 0
+        for table in self.tables:
+            product = np.prod(self.degree[table])
+            weight = 2 * product if len(table) == 2 else 3 * product / 8
+            total += weight
+            perfect += len(table) if weight == len(table) else 0
+        return float(total), int(perfect)
+
+
+def generate_adjacency(num_students, kind='max', density=None, seed=None, **options):
+    """ The whole preference matrix of a generated class (see row_blocks), for classes that fit in memory. """
+    adj = np.zeros((num_students + 1, num_students + 1), dtype=bool)
+    for start, block in row_blocks(num_students, kind, density, seed, **options):
+        adj[start:start + len(block)] = block
+    return adj
+
+
+def write_text(filename, num_students, blocks):
+    """ Writes row blocks to a .txt instance block by block, in the format of data/. """
+    labels = np.array([str(student).encode() for student in range(num_students + 1)], dtype=object)
+    with open(filename, 'wb') as file:
+        file.write(f"{num_students}\n".encode())
+        for start, block in blocks:
+            lines = [b" ".join([labels[start + row]] + labels[np.flatnonzero(friends)].tolist())
+                     for row, friends in enumerate(block)]
+            file.write(b"\n".join(lines) + b"\n")
+
+
+def pack_blocks(num_students, blocks):
+    """ Packs row blocks into the matrix of the binary format (1/8 byte per matrix entry in memory). """
+    packed = np.zeros((num_students + 1, (num_students + 8) // 8), dtype=np.uint8)
+    for start, block in blocks:
+        packed[start:start + len(block)] = np.packbits(block, axis=1)
+    return packed
+
+
+def _hashed(num_students, blocks, digest):
+    """ Cập nhật mã băm của ma trận nén (instance_io.packed_hash) khi các khối hàng đi qua. """
+    digest.update(bytes((num_students + 8) // 8))  # Hàng 0 không dùng
+    for start, block in blocks:
+        digest.update(np.packbits(block, axis=1).tobytes())
+        yield start, block
+
+
+def generate_instance(filename, num_students, kind='max', density=None, seed=None, **options):
+    """
+    Generates a class and streams it to a file, in the binary format if the name ends with .npz
+    and as text otherwise. For the planted kinds the planted seating is written to the reference
+    sidecar (see instance_io.save_reference) for both objectives; it is the proven optimum of a
+    'fully' class and a lower bound for a 'noise' class.
+
+    Args:
+        filename (str): Output path (.txt or .npz).
+        num_students (int): Number of students (multiple of 7).
+        kind (str): One of KINDS.
+        density (float): Probability that a student prefers a given classmate (None: per-student random).
+        seed (int): Seed of the generation (None: fresh entropy, recorded in the reference sidecar).
+        **options: noise, community_size and outside_density, see row_blocks.
+
+    Returns:
+        str: The path of the written file.
+    """
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if seed is None:
+        # Lấy entropy một lần để ma trận và bàn cài sẵn trong file tham chiếu đến từ cùng một seed
+        seed = np.random.SeedSequence().entropy
+    blocks = row_blocks(num_students, kind, density, seed, **options)
+    planted = _PlantedWeight(num_students, seed) if kind in PLANTED_KINDS else None
+    if planted is not None:
+        blocks = planted.track(blocks)
+
+    digest = packed_digest(num_students)
+    if filename.endswith(BINARY_EXTENSION):
+        save_packed(filename, pack_blocks(num_students, _hashed(num_students, blocks, digest)))
+    else:
+        write_text(filename, num_students, _hashed(num_students, blocks, digest))
+
+    if planted is not None:
+        generator = dict(kind=kind, num_students=num_students, density=density, seed=seed, **options)
+        for objective, weight in zip(('total', 'perfect'), planted.weights()):
+            save_reference(filename, digest.hexdigest(), objective, planted.tables, weight,
+                           optimal=kind == 'fully', source='planted', generator=generator)
+    return filename
+
+
+def generate_corpus(sizes, kind='max', directory=None, density=None, seed=0, extension=TEXT_EXTENSION, **options):
+    """
+    Generates one class per size, named <kind>_<n><extension> as in data/.
+
+    Args:
+        sizes (iterable): Numbers of students.
+        kind (str): One of KINDS.
+        directory (str): Output directory (default: data/<kind>).
+        density (float): Probability that a student prefers a given classmate (None: per-student random).
+        seed (int): Base seed; the class of size n is generated from (seed, n), so adding sizes
+            does not change the other classes.
+        extension (str): '.txt' or '.npz'.
+        **options: noise, community_size and outside_density, see row_blocks.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    directory = directory or os.path.join('data', kind)
+    return [generate_instance(os.path.join(directory, f"{kind}_{num_students}{extension}"), num_students, kind,
+                              density, None if seed is None else [seed, num_students], **options)
+            for num_students in sizes]
+
+
+if __name__ == "__main__":
+    # Lớp lớn cho thử nghiệm theo sĩ số, ghi ở định dạng nhị phân
+    for kind in ('fully', 'max'):
+        for filepath in generate_corpus([700, 1400, 2800, 5600, 11200, 22400], kind, directory=f"data/large_{kind}",
+                                        density=0.01, seed=0, extension=BINARY_EXTENSION):
+            print(filepath)
+
+    # # Bộ dữ liệu đo chất lượng theo thời gian (xem quality.py)
+    # for kind in ('fully', 'noise', 'community', 'sparse'):
+    #     generate_corpus(range(70, 351, 70), kind, directory=f"data/quality_{kind}", density=0.05, seed=0)
@@ -0,0 +1,278 @@
+import time
+import numpy as np
+from candidates import num_two_seat_students
+from weights import build_adjacency
+
+
+def table_counts(num_students):
+    """
+    Number of two-seat and three-seat tables of a class.
+
+    Returns:
+        tuple or None: (num_pair_tables, num_triple_tables), or None if the students cannot be split
+            into tables that way (the SAT/MaxSAT models are then unsatisfiable as well).
+    """
+    num_tables_2 = num_two_seat_students(num_students)
+    if num_tables_2 % 2 or (num_students - num_tables_2) % 3:
+        return None
+    return num_tables_2 // 2, (num_students - num_tables_2) // 3
+
+
+def greedy_seating(adj):
+    """
+    Builds a feasible seating quickly by packing mutual triangles, mutual pairs, then triples in
+    which everyone likes a tablemate.
+
+    Students with the fewest mutual friends are served first. Only rows of the preference matrix
+    are scanned, so no pair or triple is enumerated and large classes stay cheap. Students left
+    over fill the remaining tables in order.
+
+    Args:
+        adj (np.ndarray): Preference matrix from weights.build_adjacency.
+
+    Returns:
+        list or None: Tables as sorted student lists, or None if the class cannot be seated.
+    """
+    num_students = adj.shape[0] - 1
+    counts = table_counts(num_students)
+    if counts is None:
+        return None
+    pairs_left, triples_left = counts
+
+    mutual = adj & adj.T
+    np.fill_diagonal(mutual, False)
+    mutual[0, :] = mutual[:, 0] = False
+    free = np.ones(num_students + 1, dtype=bool)
+    free[0] = False
+    order = np.argsort(mutual.sum(axis=1)[1:], kind='stable') + 1
+    seating = []
+
+    for i in order.tolist():  # Tam giác bạn bè hai chiều
+        if not triples_left:
+            break
+        if not free[i]:
+            continue
+        friends = np.flatnonzero(mutual[i] & free)
+        for j in friends.tolist():
+            common = np.flatnonzero(mutual[j, friends] & free[friends])
+            if len(common):
+                table = sorted([i, j, int(friends[common[0]])])
+                free[table] = False
+                seating.append(table)
+                triples_left -= 1
+                break
+
+    for i in order.tolist():  # Cặp bạn bè hai chiều
+        if not pairs_left:
+            break
+        if not free[i]:
+            continue
+        friends = np.flatnonzero(mutual[i] & free)
+        if len(friends):
+            table = sorted([i, int(friends[0])])
+            free[table] = False
+            seating.append(table)
+            pairs_left -= 1
+
+    for i in order.tolist():  # Bộ ba mà mỗi người đều thích ít nhất một người cùng bàn
+        if not triples_left:
+            break
+        if not free[i]:
+            continue
+        for j in np.flatnonzero(adj[i] & free).tolist():
+            if j == i:
+                continue
+            others = free & (adj[:, i] | adj[:, j])  # k thích i hoặc j
+            if not adj[j, i]:
+                others &= adj[j]  # j phải thích k
+            others[[i, j]] = False
+            if others.any():
+                table = sorted([i, j, int(np.argmax(others))])
+                free[table] = False
+                seating.append(table)
+                triples_left -= 1
+                break
+
+    # Xếp các học sinh còn lại vào các bàn còn trống
+    rest = np.flatnonzero(free).tolist()
+    seating += [rest[2 * p:2 * p + 2] for p in range(pairs_left)]
+    rest = rest[2 * pairs_left:]
+    seating += [rest[3 * t:3 * t + 3] for t in range(triples_left)]
+    return seating
+
+
+class _TableScorer:
+    """ Weight of a single table (wij or wijk) read straight from the preference matrix. """
+
+    def __init__(self, adj):
+        self.rows = [bytes(row) for row in adj.astype(np.uint8)]  # rows[i][j] == 1 nếu i thích j
+
+    def weight(self, table):
+        rows = self.rows
+        if len(table) == 2:
+            i, j = table
+            return 2 * (rows[i][i] + rows[i][j]) * (rows[j][j] + rows[j][i])
+        i, j, k = table
+        w_i = rows[i][i] + rows[i][j] + rows[i][k]
+        w_j = rows[j][j] + rows[j][i] + rows[j][k]
+        w_k = rows[k][k] + rows[k][i] + rows[k][j]
+        return 3 * w_i * w_j * w_k / 8
+
+
+def seating_weight(adj, seating):
+    """ Total weight of a seating, computed from the preference matrix. """
+    scorer = _TableScorer(adj)
+    return sum(scorer.weight(table) for table in seating)
+
+
+def improve_seating(adj, seating, max_passes=50, max_neighbors=10, deadline=None, seed=0):
+    """
+    Improves a seating by local search: a student is swapped with a tablemate of one of the
+    classmates they like or who like them, and the swap is kept if the weight of the two tables
+    increases. Table sizes never change, so the two-seat quota is preserved.
+
+    Args:
+        adj (np.ndarray): Preference matrix from weights.build_adjacency.
+        seating (list): Feasible seating to start from.
+        max_passes (int): Maximum number of passes over the students.
+        max_neighbors (int): Classmates sampled per student and pass (all of them if fewer).
+        deadline (float): Optional time.time() value after which the search stops.
+        seed (int): Seed of the neighbour sampling.
+
+    Returns:
+        tuple: (seating, moves, passes) with the improved seating as sorted student lists.
+    """
+    rng = np.random.default_rng(seed)
+    scorer = _TableScorer(adj)
+    num_students = adj.shape[0] - 1
+    tables = [list(table) for table in seating]
+    table_of = np.zeros(num_students + 1, dtype=np.int64)
+    for position, table in enumerate(tables):
+        table_of[table] = position
+    weight = [scorer.weight(table) for table in tables]
+    full_weight = {2: 2, 3: 3}
+    und = adj | adj.T
+    np.fill_diagonal(und, False)
+
+    moves, passes = 0, 0
+    while passes < max_passes and (deadline is None or time.time() < deadline):
+        passes += 1
+        improved = False
+        for a in rng.permutation(np.arange(1, num_students + 1)).tolist():
+            t_a = int(table_of[a])
+            if weight[t_a] == full_weight[len(tables[t_a])]:
+                continue  # Bàn đã thỏa mãn hoàn toàn
+            neighbors = np.flatnonzero(und[a])
+            if len(neighbors) > max_neighbors:
+                neighbors = rng.choice(neighbors, max_neighbors, replace=False)
+            for b in neighbors.tolist():
+                t_b = int(table_of[b])
+                if t_b == t_a:
+                    continue
+                best = None
+                for c in tables[t_b]:
+                    if c == b:
+                        continue
+                    new_a = [c if s == a else s for s in tables[t_a]]
+                    new_b = [a if s == c else s for s in tables[t_b]]
+                    w_a, w_b = scorer.weight(new_a), scorer.weight(new_b)
+                    gain = w_a + w_b - weight[t_a] - weight[t_b]
+                    if gain > 1e-9 and (best is None or gain > best[0]):
+                        best = (gain, c, new_a, new_b, w_a, w_b)
+                if best is not None:
+                    _, c, new_a, new_b, w_a, w_b = best
+                    tables[t_a], tables[t_b] = new_a, new_b
+                    weight[t_a], weight[t_b] = w_a, w_b
+                    table_of[a], table_of[c] = t_b, t_a
+                    moves += 1
+                    improved = True
+                    break
+        if not improved:
+            break
+    return [sorted(table) for table in tables], moves, passes
+
+
+def heuristic_seating(num_students, preferences, max_passes=50, deadline=None, seed=0):
+    """
+    Greedy seating improved by local search, e.g. as a warm start for the exact solvers.
+
+    Returns:
+        list or None: Tables as sorted student lists, or None if the class cannot be seated.
+    """
+    adj = build_adjacency(num_students, preferences)
+    seating = greedy_seating(adj)
+    if seating is None:
+        return None
+    return improve_seating(adj, seating, max_passes=max_passes, deadline=deadline, seed=seed)[0]
+
+
+def seating_vars(index, seating):
+    """
+    Marks the variables of a VariableIndex that a seating sets to true.
+
+    Returns:
+        np.ndarray: Bool array of size index.top + 1 (entry v for variable id v) covering the chosen
+            table variables and the y variables of students at two-seat tables. Filler tables of a
+            pruned index have no variable and are skipped.
+    """
+    chosen = np.zeros(index.top + 1, dtype=bool)
+    for table in seating:
+        var = index.pair_var(*table) if len(table) == 2 else index.triple_var(*table)
+        if var >= 0:
+            chosen[var] = True
+        if len(table) == 2:
+            chosen[[index.y_var(i) for i in table]] = True
+    return chosen
+
+
+class TeamCompositionHeuristicSolver:
+    """
+    Greedy + local-search solver with the interface of the exact solvers.
+
+    No optimality is proven, but classes of thousands of students are seated in seconds since
+    neither pairs nor triples are enumerated.
+    """
+
+    def __init__(self, num_students, preferences, max_passes=50, time_limit=None, seed=0):
+        self.num_students = num_students
+        self.preferences = preferences
+        self.max_passes = max_passes  # Số lượt tìm kiếm cục bộ tối đa
+        self.time_limit = time_limit  # Giới hạn thời gian (giây) của tìm kiếm cục bộ
+        self.seed = seed
+        self.initial_weight = None  # Tổng trọng số của lời giải tham lam
+        self.total_weight = 0  # Lưu tổng trọng số
+        self.solve_time = 0  # Lưu thời gian chạy
+        self.assigned_tables = []  # Lưu danh sách các bàn đã sắp xếp
+        self.moves = 0  # Số lần hoán đổi đã thực hiện
+        self.passes = 0  # Số lượt tìm kiếm cục bộ đã chạy
+
+    def solve(self):
+        """ Xếp chỗ tham lam rồi cải thiện bằng tìm kiếm cục bộ. """
+        start_time = time.time()
+        adj = build_adjacency(self.num_students, self.preferences)
+        seating = greedy_seating(adj)
+        if seating is None:
+            self.assigned_tables, self.total_weight = [], None
+        else:
+            self.initial_weight = seating_weight(adj, seating)
+            deadline = None if self.time_limit is None else start_time + self.time_limit
+            self.assigned_tables, self.moves, self.passes = improve_seating(
+                adj, seating, max_passes=self.max_passes, deadline=deadline, seed=self.seed)
+            self.total_weight = seating_weight(adj, self.assigned_tables)
+        self.solve_time = time.time() - start_time
+
+    def get_stats(self):
+        """ Trả về trọng số ban đầu và cuối cùng, số lần hoán đổi và thời gian chạy. """
+        return {
+            'initial_weight': self.initial_weight,
+            'total_weight': self.total_weight,
+            'moves': self.moves,
+            'passes': self.passes,
+            'solve_time': self.solve_time,
+        }
+
+    def print_assigned_tables(self):
+        """ In ra danh sách các bàn đã được sắp xếp """
+        print("Assigned tables:")
+        for table in self.assigned_tables:
+            print(table)
@@ -0,0 +1,179 @@
+import numpy as np
+
+
+def num_pairs(num_students):
+    return num_students * (num_students - 1) // 2
+
+
+def num_triples(num_students):
+    return num_students * (num_students - 1) * (num_students - 2) // 6
+
+
+def pair_rank(i, j):
+    """ Rank of the pair i < j (students numbered from 1) in the combinatorial number system. """
+    return (j - 1) * (j - 2) // 2 + (i - 1)
+
+
+def triple_rank(i, j, k):
+    """ Rank of the triple i < j < k (students numbered from 1) in the combinatorial number system. """
+    return (k - 1) * (k - 2) * (k - 3) // 6 + (j - 1) * (j - 2) // 2 + (i - 1)
+
+
+def unrank_pair(rank):
+    """
+    Inverse of pair_rank, for a single rank or an array of ranks.
+
+    Returns:
+        tuple: (i, j) with i < j, as ints or int64 arrays.
+    """
+    r = np.asarray(rank, dtype=np.int64)
+    b = np.floor((1 + np.sqrt(1 + 8 * r.astype(np.float64))) / 2).astype(np.int64)
+    # Sửa sai số làm tròn của căn bậc hai
+    b -= b * (b - 1) // 2 > r
+    b += (b + 1) * b // 2 <= r
+    a = r - b * (b - 1) // 2
+    if np.ndim(rank) == 0:
+        return int(a) + 1, int(b) + 1
+    return a + 1, b + 1
+
+
+def unrank_triple(rank):
+    """
+    Inverse of triple_rank, for a single rank or an array of ranks.
+
+    Returns:
+        tuple: (i, j, k) with i < j < k, as ints or int64 arrays.
+    """
+    r = np.asarray(rank, dtype=np.int64)
+    c = np.floor(np.cbrt(6 * r.astype(np.float64))).astype(np.int64) + 1
+    for _ in range(2):  # Sửa sai số làm tròn của căn bậc ba
+        c -= c * (c - 1) * (c - 2) // 6 > r
+        c += (c + 1) * c * (c - 1) // 6 <= r
+    i, j = unrank_pair(r - c * (c - 1) * (c - 2) // 6)
+    if np.ndim(rank) == 0:
+        return i, j, int(c) + 1
+    return i, j, c + 1
+
+
+class VariableIndex:
+    """
+    Maps tables and y variables to contiguous variable ids without storing one entry per table.
+
+    Variable ids are laid out as [pairs | triples | y], starting at `start`. With no candidate
+    ranks every pair and triple gets a variable, in rank order, and ids are computed in closed
+    form. Given sorted candidate ranks (the pruned encoding), only those tables get a variable and
+    ids are found by binary search.
+    """
+
+    def __init__(self, num_students, pair_ranks=None, triple_ranks=None, start=1):
+        self.num_students = num_students
+        self.pair_ranks = None if pair_ranks is None else np.asarray(pair_ranks, dtype=np.int64)
+        self.triple_ranks = None if triple_ranks is None else np.asarray(triple_ranks, dtype=np.int64)
+        self.num_pair_vars = num_pairs(num_students) if pair_ranks is None else len(self.pair_ranks)
+        self.num_triple_vars = num_triples(num_students) if triple_ranks is None else len(self.triple_ranks)
+        self.pair_start = start
+        self.triple_start = self.pair_start + self.num_pair_vars
+        self.y_start = self.triple_start + self.num_triple_vars
+        self.top = self.y_start + num_students - 1  # ID lớn nhất đã dùng
+        self._student_tables = None
+
+    @property
+    def pruned(self):
+        return self.pair_ranks is not None
+
+    @property
+    def num_variables(self):
+        return self.num_pair_vars + self.num_triple_vars + self.num_students
+
+    def pair_var(self, i, j):
+        """ Variable id of the pair table {i, j}, i < j. """
+        return self.pair_vars_of_ranks(pair_rank(i, j))
+
+    def triple_var(self, i, j, k):
+        """ Variable id of the triple table {i, j, k}, i < j < k. """
+        return self.triple_vars_of_ranks(triple_rank(i, j, k))
+
+    def y_var(self, i):
+        """ Variable id of y_i (student i sits at a two-seat table). """
+        return self.y_start + i - 1
+
+    def pair_vars_of_ranks(self, ranks):
+        """ Variable ids of the pairs with the given ranks, -1 for pairs without a variable. """
+        return self._vars_of_ranks(ranks, self.pair_ranks, self.pair_start)
+
+    def triple_vars_of_ranks(self, ranks):
+        """ Variable ids of the triples with the given ranks, -1 for triples without a variable. """
+        return self._vars_of_ranks(ranks, self.triple_ranks, self.triple_start)
+
+    @staticmethod
+    def _vars_of_ranks(ranks, candidate_ranks, start):
+        if candidate_ranks is None:
+            return ranks + start
+        r = np.asarray(ranks, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(candidate_ranks, r), max(len(candidate_ranks) - 1, 0))
+        found = candidate_ranks[pos] == r if len(candidate_ranks) else np.zeros(r.shape, dtype=bool)
+        var_ids = np.where(found, pos + start, -1)
+        return int(var_ids) if np.ndim(ranks) == 0 else var_ids
+
+    def pair_vars(self):
+        """ All pair variable ids, in variable order. """
+        return np.arange(self.pair_start, self.triple_start, dtype=np.int64)
+
+    def triple_vars(self):
+        """ All triple variable ids, in variable order. """
+        return np.arange(self.triple_start, self.y_start, dtype=np.int64)
+
+    def y_vars(self):
+        """ All y variable ids, y_1 first. """
+        return np.arange(self.y_start, self.top + 1, dtype=np.int64)
+
+    def pair_tables(self):
+        """ (num_pair_vars, 2) array of the students of every pair variable, in variable order. """
+        ranks = np.arange(self.num_pair_vars, dtype=np.int64) if self.pair_ranks is None else self.pair_ranks
+        return np.stack(unrank_pair(ranks), axis=1) if len(ranks) else np.empty((0, 2), dtype=np.int64)
+
+    def triple_tables(self):
+        """ (num_triple_vars, 3) array of the students of every triple variable, in variable order. """
+        ranks = np.arange(self.num_triple_vars, dtype=np.int64) if self.triple_ranks is None else self.triple_ranks
+        return np.stack(unrank_triple(ranks), axis=1) if len(ranks) else np.empty((0, 3), dtype=np.int64)
+
+    def student_vars(self, i):
+        """ Variable ids of every table containing student i (pairs first, then triples). """
+        if self.pruned:
+            if self._student_tables is None:
+                self._student_tables = self._group_by_student()
+            offsets, var_ids = self._student_tables
+            return var_ids[offsets[i]:offsets[i + 1]]
+
+        others = np.concatenate([np.arange(1, i), np.arange(i + 1, self.num_students + 1)]).astype(np.int64)
+        pair_ids = self.pair_var(np.minimum(others, i), np.maximum(others, i))
+        u, v = np.triu_indices(len(others), k=1)
+        triples = np.sort(np.stack([np.full(len(u), i), others[u], others[v]], axis=1), axis=1)
+        triple_ids = self.triple_var(triples[:, 0], triples[:, 1], triples[:, 2])
+        return np.concatenate([pair_ids, triple_ids])
+
+    def _group_by_student(self):
+        """ CSR listing (offsets, var ids) of the tables containing each student. """
+        pairs, triples = self.pair_tables(), self.triple_tables()
+        students = np.concatenate([pairs.ravel(), triples.ravel()])
+        var_ids = np.concatenate([np.repeat(self.pair_vars(), 2), np.repeat(self.triple_vars(), 3)])
+        order = np.argsort(students, kind='stable')
+        counts = np.bincount(students, minlength=self.num_students + 1)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        return offsets, var_ids[order]
+
+    def decode(self, var_ids):
+        """
+        Turns variable ids (e.g. the positive literals of a model) into the tables they select.
+
+        Returns:
+            list: The selected tables as sorted student lists; y and auxiliary variables are ignored.
+        """
+        v = np.asarray(var_ids, dtype=np.int64)
+        pair_pos = v[(v >= self.pair_start) & (v < self.triple_start)] - self.pair_start
+        triple_pos = v[(v >= self.triple_start) & (v < self.y_start)] - self.triple_start
+        if self.pair_ranks is not None:
+            pair_pos, triple_pos = self.pair_ranks[pair_pos], self.triple_ranks[triple_pos]
+        tables = np.stack(unrank_pair(pair_pos), axis=1).tolist() if len(pair_pos) else []
+        tables += np.stack(unrank_triple(triple_pos), axis=1).tolist() if len(triple_pos) else []
+        return tables
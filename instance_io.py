@@ -0,0 +1,259 @@
+import os
+import json
+import zipfile
+import hashlib
+import numpy as np
+
+FORMAT_VERSION = 1
+TEXT_EXTENSION = '.txt'
+BINARY_EXTENSION = '.npz'
+INSTANCE_EXTENSIONS = (TEXT_EXTENSION, BINARY_EXTENSION)
+REFERENCE_EXTENSION = '.json'  # File đi kèm chứa lời giải tham chiếu (cài sẵn hoặc tối ưu đã chứng minh)
+
+
+def read_text(filename):
+    """
+    Đọc sở thích của sinh viên từ file .txt: dòng đầu là sĩ số, mỗi dòng sau là một sinh viên
+    theo sau là các bạn mà sinh viên đó muốn ngồi cùng.
+    """
+    with open(filename, 'r') as file:
+        lines = file.read().splitlines()
+
+    num_students = int(lines[0].strip())
+    preferences = {}
+    for line in lines[1:]:
+        parts = list(map(int, line.split()))
+        if parts:
+            preferences[parts[0]] = parts[1:]
+    return num_students, preferences
+
+
+def adjacency_hash(adj):
+    """
+    SHA-1 of a preference matrix, independent of the file it was read from (the order of the
+    lines and of the friends in a .txt file does not change it).
+    """
+    return packed_hash(np.packbits(adj, axis=1))
+
+
+def packed_hash(packed):
+    """ adjacency_hash of a matrix already packed with np.packbits(adj, axis=1). """
+    digest = packed_digest(packed.shape[0] - 1)
+    digest.update(np.ascontiguousarray(packed).tobytes())
+    return digest.hexdigest()
+
+
+def packed_digest(num_students):
+    """ SHA-1 object of packed_hash before the rows are added, for matrices hashed row block by row block. """
+    return hashlib.sha1(str(num_students).encode())
+
+
+def save_instance(filename, adj):
+    """
+    Writes a class in the binary format: an uncompressed .npz with a header (format version and
+    number of students), the hash of the instance and the preference matrix packed eight students
+    per byte. Members are stored without compression so they can be memory-mapped (see load_adjacency).
+
+    Args:
+        filename (str): Path of the .npz file.
+        adj (np.ndarray): (n + 1, n + 1) bool preference matrix, see weights.build_adjacency.
+    """
+    adj = np.asarray(adj, dtype=bool)
+    if adj.ndim != 2 or adj.shape[0] != adj.shape[1]:
+        raise ValueError(f"The preference matrix must be square, got shape {adj.shape}.")
+    save_packed(filename, np.packbits(adj, axis=1))
+
+
+def save_packed(filename, packed):
+    """ save_instance of a matrix already packed with np.packbits(adj, axis=1), e.g. row block by row block. """
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filename, 'wb') as file:  # np.savez tự thêm đuôi .npz nếu truyền tên file
+        np.savez(file,
+                 header=np.array([FORMAT_VERSION, packed.shape[0] - 1], dtype=np.int64),
+                 instance_hash=np.array(packed_hash(packed)),
+                 packed=packed)
+
+
+def _member_memmap(filename, name):
+    """ Memory-maps the array `name` of an uncompressed .npz file without reading it. """
+    with zipfile.ZipFile(filename) as archive:
+        info = archive.getinfo(name + '.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+    with open(filename, 'rb') as file:
+        # Local header của zip: 30 byte cố định, rồi tên file và trường extra
+        file.seek(info.header_offset + 26)
+        name_length, extra_length = np.frombuffer(file.read(4), dtype='<u2')
+        file.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+        version = np.lib.format.read_magic(file)
+        read_array_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                             else np.lib.format.read_array_header_2_0)
+        shape, fortran_order, dtype = read_array_header(file)
+        offset = file.tell()
+    if dtype.hasobject:
+        return None
+    return np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape,
+                     order='F' if fortran_order else 'C')
+
+
+def read_header(filename):
+    """
+    Returns:
+        tuple: (num_students, instance_hash) of a binary instance, read without loading the matrix.
+    """
+    with np.load(filename) as data:
+        version, num_students = data['header'].tolist()
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported instance format version {version} in {filename}.")
+        return num_students, str(data['instance_hash'])
+
+
+def load_adjacency(filename, mmap=True):
+    """
+    Loads the preference matrix of a class, from a binary (.npz) or a text (.txt) instance.
+
+    Args:
+        filename (str): Path of the instance.
+        mmap (bool): Memory-map the packed matrix of a binary instance instead of reading it,
+            so only the pages touched by the unpacking are read from disk.
+
+    Returns:
+        np.ndarray: (n + 1, n + 1) bool matrix where adj[i, j] is True if i prefers j, ready for
+            weights.pair_weights / weights.triple_weights.
+    """
+    if not filename.endswith(BINARY_EXTENSION):
+        from weights import build_adjacency
+        return build_adjacency(*read_text(filename))
+    num_students, _ = read_header(filename)
+    packed = _member_memmap(filename, 'packed') if mmap else None
+    if packed is None:
+        with np.load(filename) as data:
+            packed = data['packed']
+    return np.unpackbits(packed, axis=1, count=num_students + 1).view(bool)
+
+
+def preferences_of_adjacency(adj):
+    """ Ngược lại với weights.build_adjacency: dict sinh viên -> danh sách bạn, cho các bộ giải. """
+    rows, cols = np.nonzero(adj[1:, 1:])
+    splits = np.searchsorted(rows, np.arange(1, adj.shape[0] - 1))
+    return {i + 1: friends.tolist() for i, friends in enumerate(np.split(cols + 1, splits))}
+
+
+def read_data(filename):
+    """
+    Reads a class from a text or binary instance.
+
+    Returns:
+        tuple: (num_students, preferences) where preferences maps each student to their friends.
+    """
+    if filename.endswith(BINARY_EXTENSION):
+        adj = load_adjacency(filename)
+        return adj.shape[0] - 1, preferences_of_adjacency(adj)
+    return read_text(filename)
+
+
+def instance_size(filename):
+    """ Sĩ số của một instance, chỉ đọc dòng đầu (.txt) hoặc header (.npz). """
+    if filename.endswith(BINARY_EXTENSION):
+        return read_header(filename)[0]
+    with open(filename) as file:
+        return int(file.readline())
+
+
+def reference_path(filename):
+    """ Path of the reference sidecar of an instance: the instance path with a .json extension. """
+    return os.path.splitext(filename)[0] + REFERENCE_EXTENSION
+
+
+def save_reference(filename, instance_hash, objective, tables, weight, optimal, source, **info):
+    """
+    Records a reference seating of an instance for one objective in its sidecar file, keeping the
+    references of the other objective. A reference replaces an existing one only if it is proven
+    optimal or has a larger weight.
+
+    Args:
+        filename (str): Path of the instance.
+        instance_hash (str): adjacency_hash of the instance, checked when the reference is loaded.
+        objective (str): 'total' or 'perfect', see verifier.OBJECTIVES.
+        tables (list): The reference seating.
+        weight (float): Its weight under the objective.
+        optimal (bool): True if the weight is the proven optimum (planted fully satisfied seating,
+            or a solver that finished), False if it is only a lower bound.
+        source (str): Where the seating comes from, e.g. 'planted' or 'cpsat'.
+        **info: Extra fields stored at the top of the sidecar, e.g. the generator parameters.
+    """
+    path = reference_path(filename)
+    sidecar = {'instance_hash': instance_hash, 'references': {}}
+    if os.path.exists(path):
+        with open(path) as file:
+            sidecar = json.load(file)
+        if sidecar['instance_hash'] != instance_hash:  # Instance đã được sinh lại: bỏ tham chiếu cũ
+            sidecar = {'instance_hash': instance_hash, 'references': {}}
+    sidecar.update(info)
+    current = sidecar['references'].get(objective)
+    if current is None or optimal or (not current['optimal'] and weight > current['weight']):
+        sidecar['references'][objective] = {
+            'weight': weight,
+            'optimal': bool(optimal),
+            'source': source,
+            'tables': [[int(student) for student in table] for table in tables],
+        }
+    with open(path, 'w') as file:
+        json.dump(sidecar, file)
+
+
+def load_reference(filename, objective, adj=None):
+    """
+    Reads the reference of an instance for one objective.
+
+    Args:
+        filename (str): Path of the instance.
+        objective (str): 'total' or 'perfect'.
+        adj (np.ndarray): Preference matrix of the instance; if given, the sidecar must belong to it.
+
+    Returns:
+        dict or None: 'weight', 'optimal', 'source' and 'tables', or None without a reference.
+    """
+    path = reference_path(filename)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        sidecar = json.load(file)
+    if adj is not None and sidecar['instance_hash'] != adjacency_hash(adj):
+        raise ValueError(f"The reference {path} does not belong to {filename}.")
+    return sidecar['references'].get(objective)
+
+
+def convert_corpus(data_directory='data/', output_directory=None, overwrite=False):
+    """
+    Converts every .txt instance under a directory to the binary format.
+
+    Args:
+        data_directory (str): Root of the text instances, e.g. data/.
+        output_directory (str): Root of the binary instances, with the same sub-directories
+            (default: next to the text files).
+        overwrite (bool): Rewrite binary instances that already exist.
+
+    Returns:
+        list: Paths of the written .npz files.
+    """
+    written = []
+    for root, _, filenames in os.walk(data_directory):
+        for filename in sorted(filenames):
+            if not filename.endswith(TEXT_EXTENSION):
+                continue
+            target_root = root if output_directory is None else os.path.join(
+                output_directory, os.path.relpath(root, data_directory))
+            target = os.path.join(target_root, filename[:-len(TEXT_EXTENSION)] + BINARY_EXTENSION)
+            if os.path.exists(target) and not overwrite:
+                continue
+            save_instance(target, load_adjacency(os.path.join(root, filename)))
+            written.append(target)
+    return written
+
+
+if __name__ == "__main__":
+    for filepath in convert_corpus('data/'):
+        print(filepath)
@@ -0,0 +1,434 @@
+import time
+import numpy as np
+from ortools.sat.python import cp_model
+from weights import build_adjacency, pair_weights
+from heuristic import table_counts, heuristic_seating
+from verifier import OBJECTIVES, table_weights
+from dimacs import WEIGHT_SCALE
+from profiling import PhaseTimer
+from instance_io import read_data
+
+MAX_ROUNDS = 20  # Số vòng sinh thêm bộ ba trước khi đưa cả pool vào mô hình
+
+
+def candidate_tables(weights, objective='total'):
+    """
+    Lists every table that can score, as columns of the set-partitioning model, from weights that
+    are already computed (e.g. shared by portfolio.py).
+
+    Args:
+        weights (TableWeights): Pair and triple weights of the class.
+        objective (str): 'perfect' keeps mutual pairs (wij == 2) and mutual triangles (wijk == 3)
+            worth their size; 'total' keeps every table with a non-zero weight, worth its weight.
+
+    Returns:
+        tuple: (pairs, pair_values, triples, triple_values) with the values as integers (the 'total'
+            weights are scaled by WEIGHT_SCALE).
+    """
+    pair_values = table_values(weights.wij, 2, objective)
+    triple_values = table_values(weights.wijk, 3, objective)
+    return (weights.pairs[pair_values > 0], pair_values[pair_values > 0],
+            weights.triples[triple_values > 0], triple_values[triple_values > 0])
+
+
+def table_values(table_weights, size, objective='total'):
+    """ Giá trị nguyên của các bàn theo hàm mục tiêu: trọng số * WEIGHT_SCALE, hoặc sĩ số nếu bàn thỏa mãn hoàn toàn. """
+    if objective == 'perfect':
+        return np.where(table_weights == size, size, 0).astype(np.int64)
+    return np.rint(np.asarray(table_weights) * WEIGHT_SCALE).astype(np.int64)
+
+
+def mutual_triangles(adj):
+    """
+    Triangles of the mutual preference graph, found from the mutual friends of every student, so
+    the work grows with the number of mutual relationships.
+
+    Returns:
+        np.ndarray: (t, 3) int64 array of sorted triples.
+    """
+    mutual = adj & adj.T
+    np.fill_diagonal(mutual, False)
+    mutual[0, :] = mutual[:, 0] = False
+    triangles = []
+    for i in np.flatnonzero(mutual.any(axis=1)).tolist():
+        friends = np.flatnonzero(mutual[i, i + 1:]) + i + 1
+        if len(friends) < 2:
+            continue
+        j, k = np.nonzero(np.triu(mutual[np.ix_(friends, friends)], k=1))
+        if len(j):
+            triangles.append(np.stack([np.full(len(j), i), friends[j], friends[k]], axis=1))
+    if not triangles:
+        return np.empty((0, 3), dtype=np.int64)
+    return np.concatenate(triangles).astype(np.int64)
+
+
+def triples_around(adj, students):
+    """
+    Triples containing one of `students` that are connected in the undirected preference graph
+    (any triple if someone lists themselves), which covers every triple that can score: such a
+    triple holds a neighbour j of the student and a third member adjacent to the student or to j.
+
+    Returns:
+        np.ndarray: (t, 3) int64 array of sorted triples, possibly with duplicates.
+    """
+    und = adj | adj.T
+    np.fill_diagonal(und, False)
+    und[0, :] = und[:, 0] = False
+    everyone = np.arange(1, adj.shape[0])
+    has_self_loops = bool(np.diag(adj).any())
+    triples = []
+    for s in students:
+        if has_self_loops:
+            cand = everyone[everyone != s]
+            j, k = np.triu_indices(len(cand), k=1)
+            j, k = cand[j], cand[k]
+        else:
+            friends = np.flatnonzero(und[s])
+            # Hàng của mỗi bạn j: các học sinh kề với s hoặc với j
+            near = und[friends] | und[s]
+            near[:, s] = False
+            near[np.arange(len(friends)), friends] = False
+            rows, k = np.nonzero(near)
+            j = friends[rows]
+        if len(j):
+            triples.append(np.stack([np.full(len(j), s), j, k], axis=1))
+    if not triples:
+        return np.empty((0, 3), dtype=np.int64)
+    return np.sort(np.concatenate(triples), axis=1).astype(np.int64)
+
+
+class TeamCompositionPartitionSolver:
+    """
+    Set-partitioning model over candidate tables, solved with CP-SAT.
+
+    Only tables that can score are columns: the scoring pairs and the triples of a pool that grows
+    lazily. Every student is covered by exactly one column or marked free (AddExactlyOne), and
+    free students fill zero-weight filler tables whose numbers follow from the table counts, so a
+    restricted model is always feasible.
+
+    The pool starts with the mutual triangles and the scoring triples of the heuristic seating,
+    all of them in the first model. After each solve, the students whose share of the seating's
+    weight (weight of their table divided by its size) is below what a table could give them are
+    explored: the scoring triples around them (see triples_around) join the pool, once per
+    student. A pool triple enters the model if its value exceeds the shares of its students, and
+    the model is solved again from the seating. The search stops early only when the seating
+    reaches upper_bound. The share test is just a stand-in for LP duals, so when no triple
+    qualifies (or after max_rounds), the remaining students are explored and the whole pool enters
+    the model for a last solve. The model and the enumerated triples therefore stay small when the
+    seating reaches the bound early, and reach every scoring triple only when it does not. Without
+    a time limit the result is always OPTIMAL.
+    """
+
+    def __init__(self, num_students, preferences, objective='total', time_limit=None, num_workers=None,
+                 batch_size=None, max_rounds=MAX_ROUNDS, trace_memory=False):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Invalid objective '{objective}'. Use one of: {', '.join(OBJECTIVES)}.")
+        self.num_students = num_students
+        self.preferences = preferences
+        self.objective = objective  # 'total' (như CP-SAT) hoặc 'perfect' (như RC2 'max')
+        self.time_limit = time_limit  # Giới hạn thời gian (giây) của tất cả các lần giải
+        self.num_workers = num_workers
+        self.batch_size = batch_size or max(1, num_students // 3)  # Số bộ ba được thêm tối đa mỗi vòng
+        self.max_rounds = max_rounds
+        self.scale = WEIGHT_SCALE if objective == 'total' else 1  # Hệ số nguyên của hàm mục tiêu
+        self.adj = None
+        self.weights = None  # TableWeights, có thể được gán sẵn (khi đó mọi bộ ba ứng viên đã được liệt kê)
+        self.pairs = self.pair_values = None  # Cột bàn 2 (tất cả cặp ứng viên)
+        self.triples = self.triple_values = None  # Các bộ ba ứng viên đã sinh (pool)
+        self.in_model = None  # Bộ ba nào của pool đã là cột của mô hình
+        self.explored = None  # Học sinh đã được sinh hết các bộ ba ứng viên chứa mình
+        self.seat_cap = None  # Giá trị lớn nhất của một chỗ ngồi ở bàn có học sinh chưa được sinh bộ ba
+        self.upper_bound = None  # Tổng giá trị chỗ ngồi tốt nhất của từng học sinh (cận trên của tối ưu)
+        self.status = None  # OPTIMAL khi đạt cận trên hoặc mọi bộ ba ứng viên đã có trong mô hình
+        self.restricted_status = None  # Trạng thái CP-SAT của lần giải cuối
+        self.rounds = 0  # Số lần giải
+        self.hard_count = 0
+        self.variable_count = 0
+        self.total_weight = 0  # Lưu tổng trọng số
+        self.solve_time = 0  # Lưu thời gian chạy
+        self.assigned_tables = []  # Lưu danh sách các bàn đã sắp xếp
+        self.timer = PhaseTimer(trace_memory)  # Thời gian và bộ nhớ của từng pha
+
+    def solve(self):
+        """ Giải mô hình thu hẹp, sinh thêm bộ ba theo lời giải hiện tại rồi giải lại. """
+        start_time = time.time()
+        deadline = None if self.time_limit is None else start_time + self.time_limit
+        counts = table_counts(self.num_students)
+        if counts is None:
+            self.status, self.assigned_tables, self.total_weight = 'INFEASIBLE', [], None
+            self.solve_time = time.time() - start_time
+            return
+
+        with self.timer.phase('weights'):
+            self._initialize_pool()
+        with self.timer.phase('hint'):
+            seating = heuristic_seating(self.num_students, self.preferences)
+            if seating is not None:
+                hinted = self._add_to_pool(np.sort(np.array([table for table in seating if len(table) == 3],
+                                                            dtype=np.int64).reshape(-1, 3), axis=1))
+                self.in_model[hinted] = True
+
+        while True:
+            with self.timer.phase('hard_clauses'):
+                model, pair_vars, triple_ids, triple_vars = self._build_model(counts, seating)
+            with self.timer.phase('solve'):
+                solver = cp_model.CpSolver()
+                if deadline is not None:
+                    solver.parameters.max_time_in_seconds = max(0.0, deadline - time.time())
+                if self.num_workers is not None:
+                    solver.parameters.num_workers = self.num_workers
+                status = solver.Solve(model)
+            self.rounds += 1
+            self.restricted_status = solver.StatusName(status)
+            if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                break
+            with self.timer.phase('extract'):
+                seating = self._decode(solver, counts[0], pair_vars, triple_ids, triple_vars)
+            if status != cp_model.OPTIMAL or self._is_complete():
+                break
+            if self._weight(seating) >= self._seat_bounds()[1:].sum() / self.scale - 1e-9:
+                break  # Đã đạt cận trên nên là tối ưu
+            if deadline is not None and time.time() >= deadline:
+                break
+            with self.timer.phase('pricing'):
+                added = self._price(seating)
+                if not added or self.rounds >= self.max_rounds:
+                    # Phép thử phần trọng số không thay được đối ngẫu LP: trước khi dừng phải có mọi bộ ba
+                    self._complete_pool()
+
+        with self.timer.phase('extract'):
+            self.assigned_tables = seating if self.restricted_status in ('OPTIMAL', 'FEASIBLE') else []
+            self.total_weight = self._weight(self.assigned_tables) if self.assigned_tables else None
+            self.upper_bound = self._seat_bounds()[1:].sum() / self.scale
+            if not self.assigned_tables:
+                self.status = self.restricted_status
+            elif self.restricted_status == 'OPTIMAL' and (self._is_complete()
+                                                          or self.total_weight >= self.upper_bound - 1e-9):
+                self.status = 'OPTIMAL'
+            else:
+                self.status = 'FEASIBLE'
+        self.solve_time = time.time() - start_time
+
+    def _initialize_pool(self):
+        """
+        Lists the candidate pairs and starts the triple pool with the mutual triangles, or with
+        every candidate triple if the weights were handed over already computed.
+        """
+        self.adj = build_adjacency(self.num_students, self.preferences)
+        self.explored = np.zeros(self.num_students + 1, dtype=bool)
+        self.explored[0] = True
+        has_self_loops = bool(np.diag(self.adj).any())
+        # Không có học sinh tự chọn mình thì mỗi chỗ ngồi được nhiều nhất 1 (bàn thỏa mãn hoàn toàn);
+        # nếu có thì một chỗ ở bộ ba được tới 3 * 3^3 / 8 / 3
+        self.seat_cap = self.scale * (27 / 8 if has_self_loops and self.objective == 'total' else 1)
+        if self.weights is not None:
+            self.pairs, self.pair_values, self.triples, self.triple_values = candidate_tables(self.weights,
+                                                                                              self.objective)
+            self.triples = self.triples.astype(np.int64)
+            self.explored[:] = True
+            self.in_model = np.zeros(len(self.triples), dtype=bool)
+            self.in_model[self._triangle_ids(mutual_triangles(self.adj))] = True
+            return
+        pairs, wij = pair_weights(self.adj)
+        self.pair_values = table_values(wij, 2, self.objective)
+        self.pairs, self.pair_values = pairs[self.pair_values > 0], self.pair_values[self.pair_values > 0]
+        self.triples = np.empty((0, 3), dtype=np.int64)
+        self.triple_values = np.empty(0, dtype=np.int64)
+        self.in_model = np.zeros(0, dtype=bool)
+        triangles = self._add_to_pool(mutual_triangles(self.adj))
+        self.in_model[triangles] = True
+        if self.objective == 'perfect' and not has_self_loops:
+            self.explored[:] = True  # Bộ ba thỏa mãn hoàn toàn chính là tam giác yêu thích lẫn nhau
+
+    def _is_complete(self):
+        """ Mọi học sinh đã được sinh bộ ba và mọi bộ ba của pool đã có trong mô hình. """
+        return bool(self.explored.all() and self.in_model.all())
+
+    def _complete_pool(self):
+        """ Sinh bộ ba quanh các học sinh còn lại và đưa cả pool vào mô hình. """
+        unexplored = np.flatnonzero(~self.explored)
+        if len(unexplored):
+            self._add_to_pool(triples_around(self.adj, unexplored.tolist()))
+            self.explored[:] = True
+        self.in_model[:] = True
+
+    def _triangle_ids(self, triangles):
+        """ Vị trí trong pool của các tam giác có trong pool. """
+        return np.flatnonzero(np.isin(self._triple_keys(self.triples), self._triple_keys(triangles)))
+
+    def _add_to_pool(self, triples):
+        """
+        Adds the scoring triples among sorted `triples` to the pool.
+
+        Returns:
+            np.ndarray: Pool positions of all the scoring ones, whether new or already there.
+        """
+        keys = self._triple_keys(triples)
+        keys, first = np.unique(keys, return_index=True)
+        triples = triples[first]
+        pool_keys = self._triple_keys(self.triples)
+        new = ~np.isin(keys, pool_keys)
+        values = self._triple_values(triples[new])
+        scoring = values > 0
+        self.triples = np.concatenate([self.triples, triples[new][scoring]])
+        self.triple_values = np.concatenate([self.triple_values, values[scoring]])
+        self.in_model = np.concatenate([self.in_model, np.zeros(int(scoring.sum()), dtype=bool)])
+        return np.flatnonzero(np.isin(self._triple_keys(self.triples), keys))
+
+    def _triple_values(self, triples):
+        """ Giá trị của các bộ ba (mảng (t, 3)) theo hàm mục tiêu, tính thẳng từ ma trận yêu thích. """
+        a = self.adj.astype(np.int64)
+        i, j, k = triples[:, 0], triples[:, 1], triples[:, 2]
+        w_i = a[i, i] + a[i, j] + a[i, k]
+        w_j = a[j, j] + a[j, i] + a[j, k]
+        w_k = a[k, k] + a[k, i] + a[k, j]
+        return table_values(3 * w_i * w_j * w_k / 8, 3, self.objective)
+
+    def _build_model(self, counts, seating):
+        """
+        Builds the restricted model: one column per candidate pair and per triple in the model,
+        a free variable per student, AddExactlyOne per student and the table counts.
+        The previous seating is given as a hint.
+        """
+        num_pairs, num_triples = counts
+        model = cp_model.CpModel()
+        triple_ids = np.flatnonzero(self.in_model)
+        pair_vars = [model.NewBoolVar('xij_%d_%d' % tuple(table)) for table in self.pairs.tolist()]
+        triple_vars = [model.NewBoolVar('xijk_%d_%d_%d' % tuple(table)) for table in self.triples[triple_ids].tolist()]
+        free_vars = [model.NewBoolVar(f'free_{i}') for i in range(1, self.num_students + 1)]
+        filler_pairs = model.NewIntVar(0, num_pairs, 'filler_pairs')  # Số bàn 2 phụ (trọng số 0)
+        filler_triples = model.NewIntVar(0, num_triples, 'filler_triples')  # Số bàn 3 phụ
+
+        covering = [[var] for var in free_vars]
+        for var, table in zip(pair_vars + triple_vars, self.pairs.tolist() + self.triples[triple_ids].tolist()):
+            for student in table:
+                covering[student - 1].append(var)
+        for student_vars in covering:
+            model.AddExactlyOne(student_vars)
+        # Học sinh tự do ngồi các bàn phụ: số học sinh tự do khi đó đúng bằng 2 * bàn 2 phụ + 3 * bàn 3 phụ
+        model.Add(sum(pair_vars) + filler_pairs == num_pairs)
+        model.Add(sum(triple_vars) + filler_triples == num_triples)
+        self.hard_count = self.num_students + 2
+        self.variable_count = len(pair_vars) + len(triple_vars) + len(free_vars) + 2
+
+        model.Maximize(cp_model.LinearExpr.WeightedSum(pair_vars + triple_vars,
+                                                       self.pair_values.tolist() + self.triple_values[triple_ids].tolist()))
+        if seating is not None:
+            chosen = {tuple(table) for table in seating}
+            for var, table in zip(pair_vars, self.pairs.tolist()):
+                model.AddHint(var, tuple(table) in chosen)
+            for var, table in zip(triple_vars, self.triples[triple_ids].tolist()):
+                model.AddHint(var, tuple(table) in chosen)
+        return model, pair_vars, triple_ids, triple_vars
+
+    def _decode(self, solver, num_pairs, pair_vars, triple_ids, triple_vars):
+        """ Các cột được chọn cộng với các bàn phụ của học sinh tự do. """
+        tables = [table for var, table in zip(pair_vars, self.pairs.tolist()) if solver.BooleanValue(var)]
+        tables += [table for var, table in zip(triple_vars, self.triples[triple_ids].tolist())
+                   if solver.BooleanValue(var)]
+        seated = np.zeros(self.num_students + 1, dtype=bool)
+        seated[[student for table in tables for student in table]] = True
+        free = (np.flatnonzero(~seated[1:]) + 1).tolist()
+        filler_pairs = 2 * (num_pairs - sum(len(table) == 2 for table in tables))  # Số học sinh ngồi bàn 2 phụ
+        tables += [free[p:p + 2] for p in range(0, filler_pairs, 2)]
+        tables += [free[t:t + 3] for t in range(filler_pairs, len(free), 3)]
+        return tables
+
+    def _table_values(self, tables):
+        """ Giá trị (theo hàm mục tiêu, đã nhân hệ số) của từng bàn, theo thứ tự bàn 2 rồi bàn 3. """
+        wij, wijk = table_weights(self.adj, tables)
+        return table_values(wij, 2, self.objective), table_values(wijk, 3, self.objective)
+
+    def _weight(self, tables):
+        """ Trọng số của cách xếp theo hàm mục tiêu của bộ giải (kể cả bàn phụ tình cờ có điểm). """
+        pair_values, triple_values = self._table_values(tables)
+        return (int(pair_values.sum()) + int(triple_values.sum())) / self.scale
+
+    def _seat_bounds(self):
+        """
+        Best value per seat each student can get: from the candidate pairs and the pool for the
+        explored students, whose scoring triples are all in the pool, and seat_cap for the others.
+        """
+        best = np.zeros(self.num_students + 1, dtype=np.float64)
+        np.maximum.at(best, self.pairs.ravel(), np.repeat(self.pair_values / 2, 2))
+        np.maximum.at(best, self.triples.ravel(), np.repeat(self.triple_values / 3, 3))
+        best[~self.explored] = np.maximum(best[~self.explored], self.seat_cap)
+        return best
+
+    def _triple_keys(self, triples):
+        t = triples.astype(np.int64)
+        n = self.num_students + 1
+        return (t[:, 0] * n + t[:, 1]) * n + t[:, 2]
+
+    def _price(self, seating):
+        """
+        Explores the students whose share in the seating is below their best seat value, then adds
+        the batch_size pool triples outside the model whose value most exceeds the shares of their
+        students.
+
+        Returns:
+            int: Number of triples added to the model.
+        """
+        pairs = [table for table in seating if len(table) == 2]
+        triples = [table for table in seating if len(table) == 3]
+        pair_values, triple_values = self._table_values(pairs + triples)
+        share = np.zeros(self.num_students + 1, dtype=np.float64)
+        for tables, values, size in ((pairs, pair_values, 2), (triples, triple_values, 3)):
+            if tables:
+                share[np.asarray(tables)] = (values / size)[:, None]
+
+        unexplored = np.flatnonzero((share < self._seat_bounds() - 1e-9) & ~self.explored)
+        if len(unexplored):
+            self._add_to_pool(triples_around(self.adj, unexplored.tolist()))
+            self.explored[unexplored] = True
+
+        outside = np.flatnonzero(~self.in_model)
+        if not len(outside):
+            return 0
+        margin = self.triple_values[outside] - share[self.triples[outside]].sum(axis=1)
+        promising = margin > 1e-9
+        if not promising.any():
+            return 0
+        candidates, margin = outside[promising], margin[promising]
+        chosen = candidates[np.argsort(-margin, kind='stable')[:self.batch_size]]
+        self.in_model[chosen] = True
+        return len(chosen)
+
+    def get_stats(self):
+        """ Trả về kích thước mô hình cuối cùng, số vòng sinh cột, trọng số, thời gian giải và thời gian từng pha. """
+        return {
+            'hard_clauses': self.hard_count,
+            'variables': self.variable_count,
+            'candidate_pairs': 0 if self.pairs is None else len(self.pairs),
+            'pool_triples': 0 if self.triples is None else len(self.triples),
+            'model_triples': 0 if self.in_model is None else int(self.in_model.sum()),
+            'explored_students': 0 if self.explored is None else int(self.explored[1:].sum()),
+            'rounds': self.rounds,
+            'upper_bound': self.upper_bound,
+            'total_weight': self.total_weight,
+            'solve_time': self.solve_time,
+            'status': self.status,
+            **self.timer.stats(),  # time_<pha>, peak_rss_<pha> và total_time
+        }
+
+    def print_assigned_tables(self):
+        """ In ra danh sách các bàn đã được sắp xếp """
+        print("Assigned tables:")
+        for table in self.assigned_tables:
+            print(table)
+
+
+if __name__ == "__main__":
+    input_data = 'data/max/max_70.txt'
+    num_students, preferences = read_data(input_data)
+
+    solver = TeamCompositionPartitionSolver(num_students, preferences, objective='total')
+    solver.solve()
+    stats = solver.get_stats()
+
+    # In các thống kê ra
+    print(f"Triples generated: {stats['pool_triples']} ({stats['model_triples']} in the model)")
+    print(f"Rounds: {stats['rounds']}")
+    print(f"Total satisfied weight: {stats['total_weight']}")
+    print(f"Status: {stats['status']}")
+    print(f"Solve time: {stats['solve_time']:} seconds")
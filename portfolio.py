@@ -0,0 +1,229 @@
+import time
+import multiprocessing
+from multiprocessing.connection import wait
+import rc2_solver_timeout
+from cpsat_solver import TeamCompositionCPSATSolver
+from sat_solver import TeamCompositionSATSolver
+from partition_solver import TeamCompositionPartitionSolver
+from heuristic import TeamCompositionHeuristicSolver
+from weights import calculate_weights
+from verifier import OBJECTIVES, verify_seating
+from runner import objective_of
+from instance_io import read_data
+
+# Các bộ giải (bộ giải, mã hóa) chạy song song mặc định cho từng hàm mục tiêu
+PORTFOLIO_BACKENDS = {
+    'total': (('rc2', 'min'), ('cpsat', 'max'), ('partition', 'total')),
+    'perfect': (('sat', None), ('rc2', 'max'), ('partition', 'perfect')),
+}
+PORTFOLIO_SOLVERS = ('sat', 'rc2', 'cpsat', 'partition', 'heuristic')
+
+# Tiến trình con được fork để thừa hưởng dữ liệu và trọng số đã tính mà không phải pickle lại
+_CONTEXT = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+
+
+def backend_name(backend):
+    """ Tên của một bộ giải trong kết quả, ví dụ 'rc2_min' hoặc 'sat'. """
+    solver_name, encoding_type = backend
+    return solver_name if encoding_type is None else f'{solver_name}_{encoding_type}'
+
+
+def run_backend(backend, num_students, preferences, weights, time_limit, on_solution=None):
+    """
+    Runs one backend on an instance whose weights are already computed.
+
+    Args:
+        backend (tuple): (solver, encoding_type), see PORTFOLIO_SOLVERS.
+        num_students (int): Number of students.
+        preferences (dict): Preferences of the class.
+        weights (TableWeights): Weights of the class, handed to the solver instead of recomputed.
+        time_limit (float): Time limit of the backend in seconds.
+        on_solution (callable): Optional on_solution(tables, total_weight, elapsed) for every
+            improving seating of the backends that report them (CP-SAT and RC2).
+
+    Returns:
+        tuple: (status, tables, total_weight) of the backend's final answer.
+    """
+    solver_name, encoding_type = backend
+    if solver_name == 'cpsat':
+        solver = TeamCompositionCPSATSolver(num_students, preferences, encoding_type=encoding_type,
+                                            time_limit=time_limit)
+        solver.weights = weights
+        solver.solve(on_solution)
+    elif solver_name == 'rc2':
+        solver = rc2_solver_timeout.TeamCompositionSolver(num_students, preferences, encoding_type=encoding_type)
+        solver.weights = weights
+        solver.solve(timeout=time_limit, on_solution=on_solution)
+    elif solver_name == 'sat':
+        solver = TeamCompositionSATSolver(num_students, preferences)
+        solver.weights = weights
+        solver.solve()
+        # Lời giải SAT thỏa mãn hoàn toàn mọi bàn nên là tối ưu của hàm mục tiêu 'perfect'
+        if solver.solution_found:
+            return 'OPTIMAL', solver.assigned_tables, num_students
+        return 'UNSAT', [], None
+    elif solver_name == 'partition':
+        solver = TeamCompositionPartitionSolver(num_students, preferences, objective=encoding_type,
+                                                time_limit=time_limit)
+        solver.weights = weights
+        solver.solve()
+    elif solver_name == 'heuristic':
+        solver = TeamCompositionHeuristicSolver(num_students, preferences, time_limit=time_limit)
+        solver.solve()
+        return ('FEASIBLE' if solver.assigned_tables else 'INFEASIBLE'), solver.assigned_tables, solver.total_weight
+    else:
+        raise ValueError(f"Invalid backend '{solver_name}'. Use one of: {', '.join(PORTFOLIO_SOLVERS)}.")
+    return solver.status, solver.assigned_tables, solver.total_weight
+
+
+def _backend_worker(backend, num_students, preferences, weights, time_limit, conn):
+    """ Chạy một bộ giải trong tiến trình con, gửi từng lời giải cải thiện rồi kết quả cuối cùng qua pipe. """
+    def on_solution(tables, total_weight, elapsed):
+        conn.send(('solution', None, tables, total_weight))
+
+    try:
+        status, tables, total_weight = run_backend(backend, num_students, preferences, weights, time_limit,
+                                                   on_solution)
+        conn.send(('done', status, tables, total_weight))
+    except Exception as e:
+        conn.send(('error', repr(e), [], None))
+    conn.close()
+
+
+class TeamCompositionPortfolioSolver:
+    """
+    Races several backends on the same instance, each in its own process.
+
+    The weights of the instance are computed once in the parent; the workers are forked
+    (where the platform allows) so they inherit both without copying or pickling. Every improving
+    seating a worker finds is sent back at once, so the race ends either with the first backend
+    that proves its answer optimal or, at the time limit, with the best seating received so far.
+    The other workers are then killed.
+    """
+
+    def __init__(self, num_students, preferences, objective='total', backends=None, time_limit=60):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Invalid objective '{objective}'. Use one of: {', '.join(OBJECTIVES)}.")
+        backends = tuple(backends or PORTFOLIO_BACKENDS[objective])
+        for solver_name, encoding_type in backends:
+            if solver_name not in PORTFOLIO_SOLVERS:
+                raise ValueError(f"Invalid backend '{solver_name}'. Use one of: {', '.join(PORTFOLIO_SOLVERS)}.")
+            # Chỉ so sánh được các bộ giải tối ưu cùng một hàm mục tiêu
+            if objective_of(solver_name, encoding_type) != objective:
+                raise ValueError(f"Backend ({solver_name}, {encoding_type}) does not optimise the "
+                                 f"'{objective}' objective.")
+        self.num_students = num_students
+        self.preferences = preferences
+        self.objective = objective  # 'total' hoặc 'perfect', xem verifier.OBJECTIVES
+        self.backends = backends
+        self.time_limit = time_limit  # Giới hạn thời gian (giây) của cả cuộc đua
+        self.weights = None
+        self.status = None  # OPTIMAL nếu bộ giải thắng đã chứng minh tối ưu, FEASIBLE nếu hết giờ
+        self.winner = None  # Tên bộ giải có lời giải được chọn
+        self.total_weight = 0  # Lưu tổng trọng số
+        self.solve_time = 0  # Lưu thời gian chạy
+        self.weights_time = 0  # Thời gian tính trọng số (một lần cho mọi bộ giải)
+        self.assigned_tables = []  # Lưu danh sách các bàn đã sắp xếp
+        self.results = {}  # Tên bộ giải -> trạng thái, trọng số và thời gian của nó
+
+    def solve(self):
+        """ Chạy đua các bộ giải và giữ lời giải tối ưu đầu tiên hoặc lời giải tốt nhất khi hết giờ. """
+        start_time = time.time()
+        self.weights = calculate_weights(self.num_students, self.preferences)
+        self.weights_time = time.time() - start_time
+        deadline = start_time + self.time_limit
+        best = None  # (trọng số, tên bộ giải, các bàn)
+
+        running = {}  # Pipe -> (tiến trình, tên bộ giải)
+        for backend in self.backends:
+            name = backend_name(backend)
+            receiver, sender = _CONTEXT.Pipe(duplex=False)
+            process = _CONTEXT.Process(target=_backend_worker, daemon=True,
+                                       args=(backend, self.num_students, self.preferences, self.weights,
+                                             max(0.0, deadline - time.time()), sender))
+            process.start()
+            sender.close()
+            running[receiver] = (process, name)
+            self.results[name] = {'status': None, 'weight': None, 'time': None}
+
+        try:
+            while running and self.status is None:
+                ready = wait(list(running), timeout=max(0.0, deadline - time.time()))
+                if not ready:
+                    break  # Hết giờ
+                for receiver in ready:
+                    process, name = running[receiver]
+                    try:
+                        kind, status, tables, weight = receiver.recv()
+                    except EOFError:
+                        kind, status, tables, weight = 'error', f'exit code {process.exitcode}', [], None
+                    if tables and (best is None or weight > best[0]):
+                        best = (weight, name, tables)
+                    if kind == 'solution':
+                        continue
+                    result = self.results[name]
+                    result['status'] = status if kind == 'done' else 'ERROR'
+                    result['weight'] = weight
+                    result['time'] = time.time() - start_time
+                    if kind == 'error':
+                        result['error'] = status
+                    del running[receiver]
+                    receiver.close()
+                    if kind == 'done' and status == 'OPTIMAL' and tables:
+                        self.status, best = 'OPTIMAL', (weight, name, tables)
+        finally:
+            for receiver, (process, name) in running.items():
+                process.kill()  # Hủy các bộ giải còn lại
+                process.join()
+                receiver.close()
+                self.results[name]['status'] = self.results[name]['status'] or 'CANCELLED'
+
+        if best is None:
+            self.status, self.winner, self.assigned_tables, self.total_weight = self.status or 'UNKNOWN', None, [], None
+        else:
+            self.total_weight, self.winner, self.assigned_tables = best
+            self.status = self.status or 'FEASIBLE'
+        self.solve_time = time.time() - start_time
+
+    def verify(self):
+        """ Kiểm tra độc lập lời giải được chọn (xem verifier.verify_seating). """
+        return verify_seating(self.num_students, self.preferences, self.assigned_tables, self.total_weight,
+                              self.objective)
+
+    def get_stats(self):
+        """ Trả về bộ giải thắng, trạng thái, trọng số, thời gian và kết quả của từng bộ giải. """
+        stats = {
+            'winner': self.winner,
+            'status': self.status,
+            'total_weight': self.total_weight,
+            'solve_time': self.solve_time,
+            'time_weights': self.weights_time,
+        }
+        for name, result in self.results.items():
+            stats[f'{name}_status'] = result['status']
+            stats[f'{name}_weight'] = result['weight']
+            stats[f'{name}_time'] = result['time']
+        return stats
+
+    def print_assigned_tables(self):
+        """ In ra danh sách các bàn đã được sắp xếp """
+        print("Assigned tables:")
+        for table in self.assigned_tables:
+            print(table)
+
+
+if __name__ == "__main__":
+    input_data = 'data/max/max_70.txt'
+    num_students, preferences = read_data(input_data)
+
+    solver = TeamCompositionPortfolioSolver(num_students, preferences, objective='total', time_limit=60)
+    solver.solve()
+    stats = solver.get_stats()
+
+    # In các thống kê ra
+    print(f"Winner: {stats['winner']} ({stats['status']})")
+    print(f"Total satisfied weight: {stats['total_weight']}")
+    print(f"Solve time: {stats['solve_time']:} seconds")
+    for backend in solver.backends:
+        name = backend_name(backend)
+        print(f"  {name}: {stats[f'{name}_status']}, weight {stats[f'{name}_weight']}, time {stats[f'{name}_time']}")
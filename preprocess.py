@@ -0,0 +1,341 @@
+import time
+from collections import defaultdict, deque
+import numpy as np
+from clause_buffer import ClauseBuffer
+
+MAX_RESOLVENT_LENGTH = 16  # Không khử biến nếu một resolvent dài hơn
+SUBSUME_LENGTH = 4  # Chỉ các mệnh đề ngắn được dùng để loại mệnh đề bị bao hàm
+MAX_SUBSUME_OCCURRENCES = 1000  # Bỏ qua literal xuất hiện quá nhiều lần khi tìm mệnh đề bị bao hàm
+# Số vòng tìm literal thuần trên toàn bộ mảng; chuỗi literal thuần dài hơn (ví dụ các biến phụ của
+# seqcounter khi các biến bàn đã bị gán) được khử biến xử lý theo danh sách chờ
+MAX_PURE_ROUNDS = 4
+
+
+class Preprocessor:
+    """
+    Simplifies hard CNF clauses before they are handed to a backend: unit propagation, removal of
+    satisfied and duplicate clauses, pure-literal elimination, subsumption by short clauses and
+    bounded variable elimination (a variable is resolved away when that removes clauses).
+
+    Unit propagation, pure literals and duplicates run on the flat arrays of a ClauseBuffer; only
+    the clauses of the variables that may be eliminated are turned into Python lists. Every
+    assignment and elimination is pushed on a reconstruction stack, so reconstruct() extends a
+    model of the simplified clauses to a model of the original ones.
+
+    Frozen variables (soft clause variables, assumptions, variables decoded directly from the
+    model, native AtMost constraints) are never eliminated nor set by the pure-literal rule, and a
+    frozen variable fixed by unit propagation keeps its unit clause, so it is in every model.
+    """
+
+    def __init__(self, clauses, num_vars=None, frozen=(), bve=True, time_limit=None):
+        self.clauses = ClauseBuffer.of(clauses)
+        self.num_vars = max(num_vars or 0, self.clauses.nv)
+        self.frozen = np.zeros(self.num_vars + 1, dtype=bool)
+        frozen = np.asarray(list(frozen) if not isinstance(frozen, np.ndarray) else frozen, dtype=np.int64)
+        self.frozen[np.abs(frozen[np.abs(frozen) <= self.num_vars])] = True
+        self.bve = bve  # Khử biến có giới hạn
+        self.time_limit = time_limit  # Giới hạn thời gian (giây) của pha khử biến
+        self.value = np.zeros(self.num_vars + 1, dtype=np.int8)  # 1 đúng, -1 sai, 0 chưa gán
+        # ('assign', literals), ('eliminate', biến, các mệnh đề chứa biến dương) hoặc
+        # ('binary', các biến, literal còn lại trong mệnh đề nhị phân chứa biến dương)
+        self.stack = []
+        self.unsat = False
+        self.stats = {'fixed': 0, 'pure': 0, 'eliminated': 0, 'subsumed': 0, 'duplicates': 0}
+        self.preprocess_time = 0
+
+    def run(self):
+        """
+        Simplifies the clauses.
+
+        Returns:
+            ClauseBuffer: The simplified clauses, a contradiction if they are unsatisfiable.
+        """
+        start_time = time.time()
+        lits, lengths = self.clauses.lits[:self.clauses.num_lits], np.diff(self.clauses.offsets[:len(self.clauses) + 1])
+        self.stats.update(self._sizes('before', lits, lengths))
+        lits, lengths = self._propagate(lits, lengths)
+        lits, lengths = self._remove_duplicates(lits, lengths)
+        if self.bve and not self.unsat:
+            lits, lengths = self._eliminate_binary(lits, lengths)
+            lits, lengths = self._eliminate(lits, lengths, start_time)
+            lits, lengths = self._propagate(lits, lengths)  # Resolvent có thể là mệnh đề đơn vị
+
+        result = ClauseBuffer()
+        if self.unsat:
+            result.extend([[1], [-1]])
+        else:
+            result._add(lits, lengths)
+            fixed = np.flatnonzero(self.frozen & (self.value != 0))  # Biến bị đóng băng giữ mệnh đề đơn vị
+            result.extend((fixed * self.value[fixed]).astype(np.int32))
+        result.nv = max(result.nv, self.num_vars)
+        self.stats.update(self._sizes('after', result.lits[:result.num_lits],
+                                      np.diff(result.offsets[:len(result) + 1])))
+        self.preprocess_time = time.time() - start_time
+        return result
+
+    def _sizes(self, when, lits, lengths):
+        occurs = np.zeros(self.num_vars + 1, dtype=bool)
+        occurs[np.abs(lits)] = True
+        return {f'clauses_{when}': len(lengths), f'literals_{when}': len(lits), f'variables_{when}': int(occurs.sum())}
+
+    def _assign(self, lits):
+        """ Gán đúng cho các literal và ghi lên ngăn xếp dựng lại mô hình. """
+        self.value[np.abs(lits)] = np.sign(lits)
+        self.stack.append(('assign', lits.astype(np.int64)))
+
+    def _propagate(self, lits, lengths):
+        """
+        Unit propagation and pure-literal elimination to a fixpoint, on the flat arrays: satisfied
+        clauses and false literals are dropped at each round.
+        """
+        pure_rounds = 0
+        while not self.unsat and len(lengths):
+            clause_ids = np.repeat(np.arange(len(lengths)), lengths)
+            lit_values = self.value[np.abs(lits)] * np.sign(lits).astype(np.int8)
+            satisfied = np.bincount(clause_ids[lit_values == 1], minlength=len(lengths)) > 0
+            keep = ~satisfied[clause_ids] & (lit_values == 0)
+            lits, clause_ids = lits[keep], clause_ids[keep]
+            lengths = np.bincount(clause_ids, minlength=len(lengths))[~satisfied]
+            if (lengths == 0).any():
+                self.unsat = True
+                break
+
+            starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+            units = np.unique(lits[starts[lengths == 1]])
+            if len(units):
+                if len(np.unique(np.abs(units))) < len(units):  # Cả x và -x đều là mệnh đề đơn vị
+                    self.unsat = True
+                    break
+                self._assign(units)
+                self.stats['fixed'] += len(units)
+                continue
+
+            if pure_rounds == MAX_PURE_ROUNDS:
+                break
+            pure_rounds += 1
+            occurs = np.zeros((2, self.num_vars + 1), dtype=bool)
+            occurs[(lits > 0).astype(np.int64), np.abs(lits)] = True
+            pure = np.flatnonzero(occurs[0] ^ occurs[1])
+            pure = pure[~self.frozen[pure]]
+            if not len(pure):
+                break
+            self._assign(np.where(occurs[1, pure], pure, -pure))
+            self.stats['pure'] += len(pure)
+        return lits, lengths
+
+    def _remove_duplicates(self, lits, lengths):
+        """ Bỏ các mệnh đề trùng nhau (không tính thứ tự literal), theo từng nhóm cùng độ dài. """
+        if self.unsat or not len(lengths):
+            return lits, lengths
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        kept_lits, kept_lengths = [], []
+        for length in np.unique(lengths):
+            rows = starts[lengths == length][:, None] + np.arange(length)
+            group = np.sort(lits[rows], axis=1).astype(np.int64)
+            base = 2 * self.num_vars + 1
+            if base ** int(length) < 2 ** 62:
+                # Mỗi mệnh đề thành một khóa int64 (nhanh hơn np.unique theo hàng)
+                keys = (group + self.num_vars) @ (base ** np.arange(length - 1, -1, -1, dtype=np.int64))
+                group = group[np.sort(np.unique(keys, return_index=True)[1])]
+            else:
+                group = np.unique(group, axis=0)
+            self.stats['duplicates'] += len(rows) - len(group)
+            kept_lits.append(group.ravel())
+            kept_lengths.append(np.full(len(group), length, dtype=np.int64))
+        return np.concatenate(kept_lits).astype(np.int32), np.concatenate(kept_lengths)
+
+    def _eliminate_binary(self, lits, lengths):
+        """
+        Vectorised elimination of the unfrozen variables that occur once positively and once
+        negatively, both times in binary clauses, e.g. the chains of seqcounter variables left once
+        the table variables are fixed: (v, a) and (-v, b) are replaced by (a, b). Each round resolves
+        away a set of such variables that share no clause, chosen by random priorities, so a chain
+        shrinks by a constant fraction per round instead of one variable at a time.
+        """
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        binary = lengths == 2
+        pairs = lits[starts[binary][:, None] + np.arange(2)].astype(np.int64)
+        clause_ids = np.repeat(np.arange(len(lengths)), lengths)
+        rest_lits, rest_lengths = lits[~binary[clause_ids]], lengths[~binary]
+        in_rest = np.bincount(np.abs(rest_lits), minlength=self.num_vars + 1) > 0
+        priority = np.random.default_rng(0).permutation(self.num_vars + 1)
+        while len(pairs):
+            flat = pairs.ravel()
+            positive = np.bincount(flat[flat > 0], minlength=self.num_vars + 1)
+            negative = np.bincount(-flat[flat < 0], minlength=self.num_vars + 1)
+            candidate = ~self.frozen & ~in_rest & (positive == 1) & (negative == 1)
+            # Trong mệnh đề có hai biến ứng viên, biến có độ ưu tiên thấp hơn chờ vòng sau
+            both = candidate[np.abs(pairs[:, 0])] & candidate[np.abs(pairs[:, 1])]
+            first_loses = priority[np.abs(pairs[both, 0])] < priority[np.abs(pairs[both, 1])]
+            candidate[np.where(first_loses, np.abs(pairs[both, 0]), np.abs(pairs[both, 1]))] = False
+            if not candidate.any():
+                break
+            other = np.zeros(2 * self.num_vars + 2, dtype=np.int64)  # Literal còn lại, theo chỉ số của literal
+            removed = np.zeros(len(pairs), dtype=bool)
+            for column in (0, 1):
+                lit = pairs[:, column]
+                chosen = candidate[np.abs(lit)]
+                other[(lit[chosen] > 0) * (self.num_vars + 1) + np.abs(lit[chosen])] = pairs[chosen, 1 - column]
+                removed |= chosen
+            variables = np.flatnonzero(candidate)
+            a, b = other[self.num_vars + 1 + variables], other[variables]  # (v, a) và (-v, b)
+            self.stack.append(('binary', variables, a))
+            self.stats['eliminated'] += len(variables)
+            keep = a != -b  # Resolvent hiển nhiên đúng
+            pairs = np.concatenate([pairs[~removed], np.stack([a[keep], b[keep]], axis=1)])
+
+        unit = pairs[:, 0] == pairs[:, 1]  # Resolvent (a, a) là mệnh đề đơn vị
+        return (np.concatenate([rest_lits, pairs[~unit].ravel(), pairs[unit, 0]]).astype(np.int32),
+                np.concatenate([rest_lengths, np.full((~unit).sum(), 2, dtype=np.int64),
+                                np.ones(unit.sum(), dtype=np.int64)]))
+
+    def _eliminate(self, lits, lengths, start_time):
+        """
+        Subsumption and bounded variable elimination on the clauses of the candidate variables:
+        unfrozen variables whose positive and negative occurrences p and n satisfy p * n < p + n,
+        so that resolving them away always removes clauses. The other clauses stay in the arrays.
+        """
+        clause_ids = np.repeat(np.arange(len(lengths)), lengths)
+        positive = np.bincount(lits[lits > 0], minlength=self.num_vars + 1)
+        negative = np.bincount(-lits[lits < 0], minlength=self.num_vars + 1)
+        candidate = (~self.frozen & (self.value == 0) & (positive + negative > 0)
+                     & (positive * negative < positive + negative))
+        touched = np.bincount(clause_ids[candidate[np.abs(lits)]], minlength=len(lengths)) > 0
+        if not touched.any():
+            return lits, lengths
+
+        bounds = np.concatenate([[0], np.cumsum(lengths)]).tolist()
+        flat = lits.tolist()
+        clauses = [tuple(flat[bounds[c]:bounds[c + 1]]) for c in np.flatnonzero(touched).tolist()]
+        occurrences = defaultdict(set)
+        for c, clause in enumerate(clauses):
+            for lit in clause:
+                occurrences[lit].add(c)
+
+        def remove(c):
+            for lit in clauses[c]:
+                occurrences[lit].discard(c)
+            clauses[c] = None
+
+        # Mệnh đề ngắn C loại mệnh đề D dài hơn chứa nó (các mệnh đề trùng nhau đã bị bỏ);
+        # D được tìm trong danh sách xuất hiện của literal hiếm nhất của C
+        longest = max(map(len, clauses))
+        for c in sorted(range(len(clauses)), key=lambda c: len(clauses[c])):
+            clause = clauses[c]
+            if clause is None:
+                continue
+            if len(clause) >= longest or len(clause) > SUBSUME_LENGTH:
+                break
+            rarest = min(clause, key=lambda lit: len(occurrences[lit]))
+            if len(occurrences[rarest]) > MAX_SUBSUME_OCCURRENCES:
+                continue
+            for d in list(occurrences[rarest]):
+                if len(clauses[d]) > len(clause) and set(clause).issubset(clauses[d]):
+                    remove(d)
+                    self.stats['subsumed'] += 1
+
+        # Danh sách chờ: một biến được xét lại khi các mệnh đề của nó thay đổi
+        order = np.flatnonzero(candidate)
+        queue = deque(order[np.argsort((positive * negative)[order], kind='stable')].tolist())
+        candidate = candidate.tolist()  # List Python: truy cập từng phần tử nhanh hơn mảng NumPy
+        queued = list(candidate)
+        while queue:
+            if self.time_limit is not None and time.time() - start_time > self.time_limit:
+                break
+            var = queue.popleft()
+            queued[var] = False
+            pos, neg = list(occurrences[var]), list(occurrences[-var])
+            if not pos and not neg:
+                continue
+            resolvents = self._resolvents(var, [clauses[c] for c in pos], [clauses[c] for c in neg])
+            if resolvents is None:
+                continue
+            # Biến thuần (không có resolvent nào) hay biến bị khử đều được dựng lại từ các mệnh đề chứa biến dương
+            self.stack.append(('eliminate', var, [clauses[c] for c in pos]))
+            self.stats['pure' if not pos or not neg else 'eliminated'] += 1
+            changed = [clauses[c] for c in pos + neg] + resolvents
+            for c in pos + neg:
+                remove(c)
+            for resolvent in resolvents:
+                for lit in resolvent:
+                    occurrences[lit].add(len(clauses))
+                clauses.append(resolvent)
+            for clause in changed:
+                for lit in clause:
+                    other = lit if lit > 0 else -lit
+                    if candidate[other] and not queued[other]:
+                        queued[other] = True
+                        queue.append(other)
+            candidate[var] = False
+
+        remaining = [clause for clause in clauses if clause is not None]
+        keep = ~touched[clause_ids]
+        new_lits = np.fromiter((lit for clause in remaining for lit in clause), dtype=np.int32)
+        return (np.concatenate([lits[keep], new_lits]).astype(np.int32),
+                np.concatenate([lengths[~touched], np.array([len(clause) for clause in remaining], dtype=np.int64)]))
+
+    @staticmethod
+    def _resolvents(var, pos, neg):
+        """ Các resolvent không hiển nhiên đúng trên biến var, hoặc None nếu việc khử không làm giảm số mệnh đề. """
+        resolvents = []
+        for p in pos:
+            for n in neg:
+                resolvent = set(p)
+                resolvent.discard(var)
+                tautology = False
+                for lit in n:
+                    if lit == -var:
+                        continue
+                    if -lit in resolvent:
+                        tautology = True
+                        break
+                    resolvent.add(lit)
+                if tautology:
+                    continue
+                if len(resolvent) > MAX_RESOLVENT_LENGTH or len(resolvents) >= len(pos) + len(neg):
+                    return None
+                resolvents.append(tuple(sorted(resolvent)))
+        return resolvents
+
+    def reconstruct(self, model):
+        """
+        Extends a model of the simplified clauses to a model of the original clauses.
+
+        Args:
+            model (list): Signed literals returned by the solver.
+
+        Returns:
+            list: Signed literals of variables 1..num_vars.
+        """
+        model = np.asarray(model if model is not None else [], dtype=np.int64)
+        model = model[np.abs(model) <= self.num_vars]
+        value = np.full(self.num_vars + 1, -1, dtype=np.int8)  # Biến không có trong mô hình: sai
+        value[np.abs(model)] = np.sign(model)
+        for entry in reversed(self.stack):
+            if entry[0] == 'assign':
+                value[np.abs(entry[1])] = np.sign(entry[1])
+                continue
+            if entry[0] == 'binary':
+                # v sai trừ khi literal còn lại a của mệnh đề (v, a) sai
+                _, variables, others = entry
+                value[variables] = np.where(value[np.abs(others)] * np.sign(others) == 1, -1, 1)
+                continue
+            _, var, clauses = entry
+            value[var] = -1
+            for clause in clauses:
+                if not any(value[abs(lit)] == (1 if lit > 0 else -1) for lit in clause):
+                    value[var] = 1
+                    break
+        variables = np.arange(1, self.num_vars + 1)
+        return (variables * value[1:]).tolist()
+
+    def get_stats(self):
+        """ Kích thước trước/sau (mệnh đề, literal, biến), số biến bị gán/khử và thời gian tiền xử lý. """
+        return {**self.stats, 'unsat': self.unsat, 'time': self.preprocess_time}
+
+
+def preprocess_columns(preprocessor):
+    """ get_stats() of a Preprocessor with the keys prefixed by preprocess_, or {} without preprocessing. """
+    if preprocessor is None:
+        return {}
+    return {f'preprocess_{name}': value for name, value in preprocessor.get_stats().items()}
@@ -0,0 +1,98 @@
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource  # Chỉ có trên Unix
+except ImportError:
+    resource = None
+
+# Các pha của một lần giải, theo thứ tự thực hiện
+PHASES = ('init', 'hard_clauses', 'weights', 'soft_clauses', 'preprocess', 'hint', 'solver_build', 'solve', 'pricing', 'extract')
+
+
+def peak_rss_mib():
+    """ Peak resident set size of the current process in MiB (None where unavailable). """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss tính bằng KiB trên Linux và bằng byte trên macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class PhaseTimer:
+    """
+    Wall-clock time and memory of the phases of a solve (see PHASES).
+
+    For every phase it records the elapsed time (summed if the phase runs more than once) and the
+    peak RSS of the process when the phase ends. With trace_memory=True it also records the peak
+    of Python allocations inside the phase through tracemalloc; this slows the encoding down, and
+    memory allocated by the solvers' C++ code is only visible in the RSS.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.times = {}  # Pha -> thời gian (giây)
+        self.peak_rss = {}  # Pha -> RSS lớn nhất của tiến trình (MiB) khi pha kết thúc
+        self.peak_traced = {}  # Pha -> bộ nhớ Python lớn nhất trong pha (MiB), nếu trace_memory
+
+    @contextmanager
+    def phase(self, name):
+        """ Đo thời gian và bộ nhớ của khối lệnh bên trong như pha `name`. """
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0) + time.time() - start_time
+            self.peak_rss[name] = peak_rss_mib()
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                self.peak_traced[name] = max(self.peak_traced.get(name, 0), peak)
+            if started_tracing:
+                tracemalloc.stop()
+
+    @property
+    def total_time(self):
+        return sum(self.times.values())
+
+    def stats(self):
+        """
+        Returns:
+            dict: time_<phase>, peak_rss_<phase> (and peak_traced_<phase>) for every phase that ran,
+                plus total_time over all phases, i.e. the end-to-end time of the solver.
+        """
+        stats = {}
+        for name in sorted(self.times, key=lambda phase: PHASES.index(phase) if phase in PHASES else len(PHASES)):
+            stats[f'time_{name}'] = self.times[name]
+            stats[f'peak_rss_{name}'] = self.peak_rss[name]
+            if name in self.peak_traced:
+                stats[f'peak_traced_{name}'] = self.peak_traced[name]
+        stats['total_time'] = self.total_time
+        return stats
+
+
+def phase_columns(runs, suffix=''):
+    """
+    Result columns for the phase statistics of several runs of a solver.
+
+    Args:
+        runs (list): get_stats() dicts of the runs.
+        suffix (str): Appended to every column name, e.g. 'min_rc2'.
+
+    Returns:
+        dict: The phase times and total_time averaged over the runs and the largest peak memory.
+    """
+    columns = {}
+    for key in runs[0] if runs else ():
+        values = [stats[key] for stats in runs if stats.get(key) is not None]
+        if not (key.startswith(('time_', 'peak_')) or key == 'total_time') or not values:
+            continue
+        name = f'{key}_{suffix}' if suffix else key
+        columns[name] = max(values) if key.startswith('peak_') else sum(values) / len(values)
+    return columns
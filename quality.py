@@ -0,0 +1,205 @@
+import os
+import time
+import pandas as pd
+from rc2_solver_timeout import TeamCompositionSolver
+from cpsat_solver import TeamCompositionCPSATSolver
+from heuristic import TeamCompositionHeuristicSolver
+from partition_solver import TeamCompositionPartitionSolver
+from instance_io import INSTANCE_EXTENSIONS, load_reference, read_data, save_reference, adjacency_hash
+from weights import build_adjacency
+from verifier import OBJECTIVES, verify_seating
+from runner import DONE, objective_of, run_jobs
+from result_store import ResultStore, DEFAULT_STORE
+from benchmark_suite import code_version
+
+# Các bộ giải có giới hạn thời gian được so sánh (bộ giải, mã hóa)
+QUALITY_BACKENDS = (('cpsat', 'max'), ('cpsat', 'min'), ('rc2', 'min'), ('rc2', 'max'), ('heuristic', None),
+                    ('partition', 'total'), ('partition', 'perfect'))
+CHECKPOINTS = (1, 2, 5, 10, 30, 60)  # Các mốc thời gian (giây) tính khoảng cách tối ưu
+
+
+def optimality_gap(weight, reference):
+    """
+    Relative gap (reference - weight) / reference of a weight to the reference weight: 0 at the
+    optimum, 1 without a seating. Negative if the weight beats a reference that is only a lower bound.
+    """
+    if reference is None:
+        return None
+    if weight is None:
+        return 1.0
+    if reference == 0:
+        return 0.0
+    return (reference - weight) / reference
+
+
+def gap_curve(trajectory, reference, checkpoints=CHECKPOINTS):
+    """
+    Gap of the best seating found by every checkpoint.
+
+    Args:
+        trajectory (list): (time, weight) of every improving seating, in time order.
+        reference (float): Reference weight of the instance.
+        checkpoints (tuple): Times in seconds since the start of the job.
+
+    Returns:
+        dict: gap_<t> for every checkpoint t.
+    """
+    gaps = {}
+    for checkpoint in checkpoints:
+        found = [weight for elapsed, weight in trajectory if elapsed <= checkpoint]
+        gaps[f'gap_{checkpoint:g}'] = optimality_gap(max(found) if found else None, reference)
+    return gaps
+
+
+def _solve(solver_name, encoding_type, num_students, preferences, time_limit, on_solution):
+    """ Chạy một bộ giải với giới hạn thời gian và trả về bộ giải đã chạy xong. """
+    if solver_name == 'cpsat':
+        solver = TeamCompositionCPSATSolver(num_students, preferences, encoding_type=encoding_type,
+                                            time_limit=time_limit)
+        solver.solve(on_solution)
+    elif solver_name == 'rc2':
+        solver = TeamCompositionSolver(num_students, preferences, encoding_type=encoding_type)
+        solver.solve(timeout=time_limit, on_solution=on_solution)
+    elif solver_name == 'heuristic':
+        solver = TeamCompositionHeuristicSolver(num_students, preferences, time_limit=time_limit)
+        solver.solve()
+    elif solver_name == 'partition':
+        solver = TeamCompositionPartitionSolver(num_students, preferences, objective=encoding_type,
+                                                time_limit=time_limit)
+        solver.solve()
+    else:
+        raise ValueError(f"Invalid backend '{solver_name}'. Use one of: {QUALITY_BACKENDS}.")
+    return solver
+
+
+def quality_job(job):
+    """
+    Runs one time-limited backend on one instance and records the weight of every improving seating
+    against the time since the job started (reading and encoding included).
+
+    Returns:
+        dict: The result row with the trajectory, the reference weight of the backend's objective
+            and gap_<t> for every checkpoint.
+    """
+    start_time = time.time()
+    trajectory = []
+
+    def on_solution(tables, weight, elapsed):
+        trajectory.append((time.time() - start_time, weight))
+
+    num_students, preferences = read_data(job['filepath'])
+    solver = _solve(job['solver'], job['encoding_type'], num_students, preferences, job['time_limit'], on_solution)
+    elapsed = time.time() - start_time
+    if solver.assigned_tables and (not trajectory or trajectory[-1][1] < solver.total_weight):
+        trajectory.append((elapsed, solver.total_weight))  # Heuristic: chỉ có lời giải cuối cùng
+
+    objective = objective_of(job['solver'], job['encoding_type'])
+    reference = load_reference(job['filepath'], objective, build_adjacency(num_students, preferences))
+    reference_weight = reference['weight'] if reference else None
+    row = {
+        'dataset': job.get('dataset'),
+        'filename': os.path.basename(job['filepath']),
+        'num_students': num_students,
+        'solver': job['solver'],
+        'encoding_type': job['encoding_type'],
+        'objective': objective,
+        'time_limit': job['time_limit'],
+        'total_weight': solver.total_weight if solver.assigned_tables else None,
+        'reference_weight': reference_weight,
+        'reference_optimal': reference['optimal'] if reference else None,
+        'reference_source': reference['source'] if reference else None,
+        'gap': optimality_gap(trajectory[-1][1] if trajectory else None, reference_weight),
+        'time_to_best': trajectory[-1][0] if trajectory else None,
+        'elapsed': elapsed,
+        'solver_status': getattr(solver, 'status', None),
+        'trajectory': [[t, weight] for t, weight in trajectory],
+        'status': DONE,
+    }
+    row.update(gap_curve(trajectory, reference_weight, job['checkpoints']))
+    return row
+
+
+def prove_optimum(filepath, objective='total', time_limit=600):
+    """
+    Solves an instance without a planted seating (or with a planted lower bound) and records the
+    seating in its reference sidecar, as the proven optimum if the solver finishes in time.
+    'total' is solved with CP-SAT 'max', 'perfect' with the partition solver, which also handles
+    classes without any perfect table.
+
+    Returns:
+        dict or None: The reference now stored for the objective.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Invalid objective '{objective}'. Use one of: {', '.join(OBJECTIVES)}.")
+    num_students, preferences = read_data(filepath)
+    solver_name, encoding_type = ('cpsat', 'max') if objective == 'total' else ('partition', 'perfect')
+    solver = _solve(solver_name, encoding_type, num_students, preferences, time_limit, None)
+    if solver.assigned_tables:
+        check = verify_seating(num_students, preferences, solver.assigned_tables)
+        save_reference(filepath, adjacency_hash(build_adjacency(num_students, preferences)), objective,
+                       solver.assigned_tables, check[f'{objective}_weight'], optimal=solver.status == 'OPTIMAL',
+                       source=solver_name)
+    return load_reference(filepath, objective)
+
+
+def run_quality(data_directories, backends=QUALITY_BACKENDS, time_limit=60, checkpoints=CHECKPOINTS, max_workers=1,
+                label=None, store_file=DEFAULT_STORE):
+    """
+    Measures the optimality gap against time of every backend on every instance that has a
+    reference sidecar (see generator.generate_instance and prove_optimum), and appends every run
+    to the result store.
+
+    Args:
+        data_directories (tuple): Directories of instances; the directory name is stored as the dataset.
+        backends (tuple): (solver, encoding_type) pairs, see QUALITY_BACKENDS.
+        time_limit (float): Time limit of every backend in seconds.
+        checkpoints (tuple): Times at which the gap is reported.
+        max_workers (int): Jobs running at the same time. Keep 1 so backends do not slow each other down.
+        label (str): Label of the measurement (default: the short commit hash).
+        store_file (str): Path to the SQLite result store.
+
+    Returns:
+        pd.DataFrame: The rows of this measurement.
+    """
+    label = label or code_version()
+    jobs = []
+    for data_directory in data_directories:
+        dataset = os.path.basename(os.path.normpath(data_directory))
+        for filename in sorted(os.listdir(data_directory)):
+            filepath = os.path.join(data_directory, filename)
+            if not filename.endswith(INSTANCE_EXTENSIONS) or load_reference(filepath, 'total') is None:
+                continue
+            jobs += [{'filepath': filepath, 'dataset': dataset, 'solver': solver, 'encoding_type': encoding_type,
+                      'run': 0, 'time_limit': time_limit, 'checkpoints': checkpoints}
+                     for solver, encoding_type in backends]
+
+    store = ResultStore(store_file)
+    rows = []
+    # Thời gian đọc và mã hóa không nằm trong giới hạn của bộ giải, nên job chỉ bị dừng khi vượt xa giới hạn
+    for job, row in run_jobs(jobs, max_workers=max_workers, timeout=2 * time_limit + 60, target=quality_job):
+        print(job['dataset'], row['filename'], job['solver'], job['encoding_type'], row['status'], row.get('gap'))
+        row = dict(row, dataset=job['dataset'])
+        store.append(row, job['solver'], encoding_type=job['encoding_type'],
+                     params={'quality': label, 'time_limit': time_limit}, filepath=job['filepath'])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def summarize_gaps(rows):
+    """ Mean gap at every checkpoint and the number of instances per dataset and backend. """
+    gap_columns = [column for column in rows if column.startswith('gap_')]
+    return (rows.groupby(['dataset', 'solver', 'encoding_type'], dropna=False)
+            .agg(instances=('filename', 'count'), **{column: (column, 'mean') for column in gap_columns + ['gap']})
+            .reset_index())
+
+
+if __name__ == "__main__":
+    from generator import generate_corpus
+
+    # Lớp có cách xếp cài sẵn; các họ khác cần prove_optimum trước khi đo
+    directories = []
+    for kind in ('fully', 'noise'):
+        directories.append(f"data/quality_{kind}")
+        generate_corpus(range(70, 351, 70), kind, directory=directories[-1], density=0.05, seed=0)
+    rows = run_quality(directories, time_limit=60)
+    print(summarize_gaps(rows))
@@ -1,204 +1,410 @@
 import os
 import time
-from pysat.examples.rc2 import RC2
+import threading
+from math import copysign
+import numpy as np
+from pysat.examples.rc2 import RC2, RC2Stratified
 from pysat.formula import WCNF, IDPool
 from pysat.card import CardEnc, EncType
+from pysat.solvers import Minisat22
+from weights import calculate_weights
+from amo import atmost_one_array, check_amo_encoding
+from clause_buffer import ClauseBuffer
+from indexing import VariableIndex
+from skeleton import HardSkeleton, get_skeleton, store_skeleton
+from candidates import candidate_ranks, filler_is_feasible
+from heuristic import heuristic_seating, seating_vars
+from profiling import PhaseTimer
+from decoding import decode_seating, true_vars_of_model
+from instance_io import read_data
+from preprocess import Preprocessor, preprocess_columns
+
+
+class _StopSearch(Exception):
+    """ Raised when the on_solution callback asks to stop the anytime search. """
+
+
+class _AnytimeRC2(RC2Stratified):
+    """ RC2Stratified that hands the model of every finished optimisation level to `on_model`. """
+
+    def __init__(self, formula, on_model, **kwargs):
+        super().__init__(formula, **kwargs)
+        self.on_model = on_model
+
+    def next_level(self):
+        if self.done > 0:
+            # Mức vừa xong kết thúc bằng một lời gọi SAT thỏa mãn: mô hình thỏa mọi mệnh đề cứng
+            model = self.oracle.get_model()
+            self.on_model([int(copysign(self.vmap.i2e[abs(lit)], lit)) for lit in model if abs(lit) in self.vmap.i2e])
+        super().next_level()
+
 
 class TeamCompositionSolver:
-    def __init__(self, num_students, preferences, encoding_type='min'):
+    def __init__(self, num_students, preferences, encoding_type='min', prune=False, use_skeleton_cache=True,
+                 skeleton_dir=None, amo_encoding='seqcounter', trace_memory=False, preprocess=False):
         self.num_students = num_students
         self.preferences = preferences
         self.encoding_type = encoding_type  # 'min' or 'max'
+        self.prune = prune  # Chỉ tạo biến cho các bàn có thể ghi điểm
+        check_amo_encoding(amo_encoding)
+        self.amo_encoding = amo_encoding  # Mã hóa at-most-one cho ràng buộc mỗi học sinh một bàn
+        self.weights = None
         self.formula = WCNF()
-        self.vpool = IDPool(start_from=1)  # ID Pool for managing variables
-        self.xij_vars = {}
-        self.xijk_vars = {}
-        self.y_vars = {}
+        self.formula.hard = ClauseBuffer()  # Mệnh đề cứng trong mảng int32 liền nhau thay vì list của list
+        self.index = None  # Ánh xạ bàn (i, j) / (i, j, k) và y_i sang ID biến
+        self.vpool = None  # ID Pool cho các biến phụ của mã hóa AMO
         self.total_weight = 0  # Lưu tổng trọng số
         self.solve_time = 0  # Lưu thời gian chạy
         self.assigned_tables = []  # Lưu danh sách các bàn đã sắp xếp
         self.hard_count = 0
         self.soft_count = 0
-        self._initialize_variables()
+        self.fixed_cost = 0  # Chi phí không tránh được của học sinh không có bàn ứng viên
+        self.incumbents = []  # (thời gian, tổng trọng số) của từng lời giải cải thiện
+        self.cost_bound = None  # Cận dưới của chi phí mà RC2 đã chứng minh được
+        self._best = None  # (chi phí, mô hình) của lời giải tốt nhất trong chế độ anytime
+        self._soft_units = None  # Mệnh đề mềm đã tách sẵn để tính chi phí của một mô hình
+        self.timer = PhaseTimer(trace_memory)  # Thời gian và bộ nhớ của từng pha
+        self.preprocess = preprocess  # Rút gọn mệnh đề cứng trước khi giải (xem preprocess.py)
+        self.preprocessor = None
+        # Khung mệnh đề cứng chỉ phụ thuộc vào sĩ số nên được dùng lại giữa các lần giải
+        self.use_skeleton_cache = use_skeleton_cache and not prune
+        self.skeleton_dir = skeleton_dir
+        self.skeleton = None
+        with self.timer.phase('init'):
+            if self.use_skeleton_cache:
+                self.skeleton = get_skeleton('cnf', num_students, amo_encoding, skeleton_dir)
+            self._initialize_variables()
 
     def _initialize_variables(self):
         """ Initialize Boolean variables for the formula. """
-        for i in range(1, self.num_students + 1):
-            for j in range(i + 1, self.num_students + 1):
-                self.xij_vars[(i, j)] = self.vpool.id()
-            for j in range(i + 1, self.num_students + 1):
-                for k in range(j + 1, self.num_students + 1):
-                    self.xijk_vars[(i, j, k)] = self.vpool.id()
-            self.y_vars[i] = self.vpool.id()
+        if self.prune:
+            self._initialize_candidate_variables()
+        elif self.skeleton is not None:
+            self.index = self.skeleton.index
+        else:
+            self.index = VariableIndex(self.num_students)
+        top = self.skeleton.top if self.skeleton is not None else self.index.top
+        self.vpool = IDPool(start_from=top + 1)
+
+    def _initialize_candidate_variables(self):
+        """
+        Initialize variables only for candidate tables: the soft-clause tables (wij == 2, wijk == 3)
+        in 'max' mode and every non-zero-weight table in 'min' mode. Students left out of the
+        chosen candidates are seated at zero-weight filler tables when decoding.
+        """
+        self.weights = self.calculate_weights()
+        pair_ranks, triple_ranks = candidate_ranks(self.weights, perfect_only=self.encoding_type == 'max')
+        self.index = VariableIndex(self.num_students, pair_ranks, triple_ranks)
 
     def add_hard_clauses(self):
         """ Add hard constraints to the formula. """
+        if self.skeleton is not None:
+            self._load_skeleton_clauses()
+            return
         self._add_single_assignment_clauses()
         self._add_valid_table_clauses()
+        num_clauses = len(self.formula.hard)
         self._add_cardinality_constraint()
+        self.formula.nv = max(self.formula.nv, self.formula.hard.nv)
+        if self.use_skeleton_cache:
+            self.skeleton = HardSkeleton('cnf', self.num_students, self.amo_encoding, self.index,
+                                         self.formula.hard.copy(), self.vpool.top,
+                                         len(self.formula.hard) - num_clauses)
+            store_skeleton(self.skeleton, self.skeleton_dir)
+
+    def _load_skeleton_clauses(self):
+        """
+        Reuse the cached hard clauses of this class size instead of encoding them again. The buffer
+        is shared with the skeleton, not copied: nothing is added to the hard clauses afterwards.
+        """
+        self.formula.hard = ClauseBuffer.of(self.skeleton.formula)
+        self.formula.nv = max(self.formula.nv, self.skeleton.top)
+        self.hard_count += self.num_students + self.skeleton.num_valid_table_clauses + 1
 
     def _add_single_assignment_clauses(self):
         """ Add constraints ensuring each student is assigned to exactly one table. """
         for i in range(1, self.num_students + 1):
             clause = self._get_single_assignment_clause(i)
-            card_enc_atmost = CardEnc.atmost(lits=clause, bound=1, vpool=self.vpool, encoding=EncType.seqcounter)
-            for c in card_enc_atmost.clauses:
-                self.formula.append(c)
-            self.formula.append(clause)
+            self.formula.hard.extend(atmost_one_array(clause, self.vpool, self.amo_encoding))
+            if not self.prune:
+                self.formula.hard.append(clause)
 
     def _get_single_assignment_clause(self, i):
         """ Generate clause for single assignment of student i. """
-        clause = []
-        if i == 1:
-            clause = [self.xij_vars[(i, j)] for j in range(2, self.num_students + 1)]
-            clause += [self.xijk_vars[(i, j, k)] for j in range(2, self.num_students) for k in range(j + 1, self.num_students + 1)]
-        elif 2 <= i <= self.num_students - 1:
-            clause = [self.xij_vars[(j, i)] for j in range(1, i)] + [self.xij_vars[(i, j)] for j in range(i + 1, self.num_students + 1)]
-            clause += [self.xijk_vars[(j, k, i)] for k in range(2, i) for j in range(1, k)]
-            clause += [self.xijk_vars[(j, i, k)] for j in range(1, i) for k in range(i + 1, self.num_students + 1)]
-            clause += [self.xijk_vars[(i, j, k)] for j in range(i + 1, self.num_students) for k in range(j + 1, self.num_students + 1)]
-        else:  # i == num_students
-            clause = [self.xij_vars[(j, i)] for j in range(1, self.num_students)]
-            clause += [self.xijk_vars[(j, k, i)] for j in range(1, self.num_students - 1) for k in range(j + 1, self.num_students)]
         self.hard_count += 1
-        return clause
+        return self.index.student_vars(i)
 
     def _add_valid_table_clauses(self):
         """ Add constraints ensuring valid table assignments. """
-        for (i, j) in self.xij_vars:
-            self.formula.append([-self.xij_vars[(i, j)], self.y_vars[i]])
-            self.formula.append([-self.xij_vars[(i, j)], self.y_vars[j]])
-            self.hard_count += 2
-        for (i, j, k) in self.xijk_vars:
-            self.formula.append([-self.xijk_vars[(i, j, k)], -self.y_vars[i]])
-            self.formula.append([-self.xijk_vars[(i, j, k)], -self.y_vars[j]])
-            self.formula.append([-self.xijk_vars[(i, j, k)], -self.y_vars[k]])
-            self.hard_count += 3
+        pair_vars, pairs = self.index.pair_vars(), self.index.pair_tables()
+        y = self.index.y_start - 1 + pairs  # y_i, y_j của từng cặp
+        clauses = np.stack([-pair_vars, y[:, 0], -pair_vars, y[:, 1]], axis=1).reshape(-1, 2)
+        self.formula.hard.extend(clauses)
+        self.hard_count += len(clauses)
+
+        triple_vars, triples = self.index.triple_vars(), self.index.triple_tables()
+        y = self.index.y_start - 1 + triples
+        clauses = np.stack([-triple_vars, -y[:, 0], -triple_vars, -y[:, 1], -triple_vars, -y[:, 2]],
+                           axis=1).reshape(-1, 2)
+        self.formula.hard.extend(clauses)
+        self.hard_count += len(clauses)
 
     def _add_cardinality_constraint(self):
         """ Add cardinality constraints for the number of tables. """
         num_tables_2 = int(self.num_students * 4 / 7)
-        card_constraint = CardEnc.equals(lits=list(self.y_vars.values()), bound=num_tables_2, vpool=self.vpool, encoding=EncType.seqcounter)
-        for clause in card_constraint.clauses:
-            self.formula.append(clause)
+        card_constraint = CardEnc.equals(lits=self.index.y_vars().tolist(), bound=num_tables_2, vpool=self.vpool, encoding=EncType.seqcounter)
+        self.formula.hard.extend(card_constraint.clauses)
         self.hard_count += 1
+        if self.prune and not filler_is_feasible(self.num_students):
+            # Không thể xếp các học sinh còn lại vào bàn 2 và bàn 3 như mô hình đầy đủ
+            self.formula.hard.extend([[self.index.y_var(1)], [-self.index.y_var(1)]])
+            self.hard_count += 2
 
     def calculate_weights(self):
         """ Calculate weights based on the chosen encoding type. """
-        out_degrees = {i: 0 for i in range(1, self.num_students + 1)}
-        for i, friends in self.preferences.items():
-            out_degrees[i] = len(friends)
-
-        wij = {}
-        wijk = {}
+        return calculate_weights(self.num_students, self.preferences)
 
-        for i in range(1, self.num_students + 1):
-            for j in range(i + 1, self.num_students + 1):
-                subgraph_out_degrees = {
-                    v: sum(1 for neighbor in self.preferences.get(v, []) if neighbor in {i, j})
-                    for v in [i, j]
-                }
-                wi = subgraph_out_degrees[i]
-                wj = subgraph_out_degrees[j]
-                wij[(i, j)] = 2 * wi * wj
-            for j in range(i + 1, self.num_students + 1):
-                for k in range(j + 1, self.num_students + 1):
-                    subgraph_out_degrees = {
-                        v: sum(1 for neighbor in self.preferences.get(v, []) if neighbor in {i, j, k})
-                        for v in [i, j, k]
-                    }
-                    wi = subgraph_out_degrees[i]
-                    wj = subgraph_out_degrees[j]
-                    wk = subgraph_out_degrees[k]
-                    wijk[(i, j, k)] = 3 * wi * wj * wk / 8
-        return wij, wijk
-
-    def add_soft_clauses(self, wij, wijk):
+    def add_soft_clauses(self, weights):
         """ Add soft constraints to the formula based on encoding type. """
         if self.encoding_type == 'min':
-            self._add_soft_clauses_minimizing(wij, wijk)
+            self._add_soft_clauses_minimizing(weights)
         elif self.encoding_type == 'max':
-            self._add_soft_clauses_maximizing(wij, wijk)
+            self._add_soft_clauses_maximizing(weights)
         else:
             raise ValueError("Invalid encoding type. Use 'min' for minimizing or 'max' for maximizing.")
 
-    def _add_soft_clauses_minimizing(self, wij, wijk):
+    def _add_soft_clauses_minimizing(self, weights):
         """ Add soft constraints for minimizing encoding. """
-        for (i, j), weight in wij.items():
-            if weight < 2:
-                self.formula.append([-self.xij_vars[(i, j)]], weight=2 - weight)
-                self.soft_count += 1
-
-        for (i, j, k), weight in wijk.items():
-            if weight < 3:
-                self.formula.append([-self.xijk_vars[(i, j, k)]], weight=3 - weight)
-                self.soft_count += 1
-
-    def _add_soft_clauses_maximizing(self, wij, wijk):
+        pair_weights, triple_weights = weights.weights_by_var(self.index)
+        for var_ids, table_weights, full_weight in [(self.index.pair_vars(), pair_weights, 2),
+                                                    (self.index.triple_vars(), triple_weights, 3)]:
+            keep = table_weights < full_weight
+            self.formula.extend((-var_ids[keep])[:, None].tolist(), weights=(full_weight - table_weights[keep]).tolist())
+            self.soft_count += int(keep.sum())
+
+        if self.prune:
+            # Học sinh ngồi bàn phụ (trọng số 0) bị phạt 1, giống như ở mô hình đầy đủ
+            for i in range(1, self.num_students + 1):
+                lits = self.index.student_vars(i).tolist()
+                if lits:
+                    self.formula.append(lits, weight=1)
+                    self.soft_count += 1
+                else:
+                    self.fixed_cost += 1
+
+    def _add_soft_clauses_maximizing(self, weights):
         """ Add soft constraints for maximizing encoding. """
-        for (i, j), weight in wij.items():
-            if weight == 2:
-                self.formula.append([self.xij_vars[(i, j)]], weight=int(weight))
-                self.soft_count += 1
-
-        for (i, j, k), weight in wijk.items():
-            if weight == 3:
-                self.formula.append([self.xijk_vars[(i, j, k)]], weight=int(weight))
-                self.soft_count += 1
-
-    def solve(self):
-        """ Giải bài toán MaxSAT và đo thời gian """
-        self.add_hard_clauses()
+        pair_weights, triple_weights = weights.weights_by_var(self.index)
+        for var_ids, table_weights, full_weight in [(self.index.pair_vars(), pair_weights, 2),
+                                                    (self.index.triple_vars(), triple_weights, 3)]:
+            keep = table_weights == full_weight
+            self.formula.extend(var_ids[keep][:, None].tolist(), weights=[full_weight] * int(keep.sum()))
+            self.soft_count += int(keep.sum())
+
+    def solve(self, on_solution=None):
+        """
+        Giải bài toán MaxSAT và đo thời gian.
+
+        Args:
+            on_solution (callable): Optional callback on_solution(tables, total_weight, elapsed), called
+                for every improving seating. Returning True stops the search with the current best.
+        """
+        self.build_formula()
+
+        if on_solution is not None:
+            self._solve_anytime(on_solution)
+            return
+
+        with self.timer.phase('solver_build'):
+            solver = RC2(self.formula)
+        with self.timer.phase('solve'):
+            start_time = time.time()
+            solution = solver.compute()
+            self.solve_time = time.time() - start_time
+        with self.timer.phase('extract'):
+            # Giải mã kết quả; tổng trọng số lấy từ chi phí của RC2
+            self.assigned_tables, _ = self.extract_solution_and_calculate_weights(solution)
+            self.total_weight = self.weight_of_cost(solver.cost)
+
+    def build_formula(self):
+        """ Thêm mệnh đề cứng, tính trọng số và thêm mệnh đề mềm, đo thời gian từng pha. """
+        with self.timer.phase('hard_clauses'):
+            self.add_hard_clauses()
         # Tính toán trước các trọng số wij, wijk và lưu lại
-        self.wij, self.wijk = self.calculate_weights()
-        self.add_soft_clauses(self.wij, self.wijk)
-
-        solver = RC2(self.formula)
+        with self.timer.phase('weights'):
+            if self.weights is None:
+                self.weights = self.calculate_weights()
+        with self.timer.phase('soft_clauses'):
+            self.add_soft_clauses(self.weights)
+        if self.preprocess:
+            with self.timer.phase('preprocess'):
+                self.preprocess_hard_clauses()
+
+    def preprocess_hard_clauses(self):
+        """
+        Simplify the hard clauses. Every table and y variable is frozen: they carry the soft clauses,
+        the heuristic assumptions and the decoded seating, so models of the simplified clauses are
+        decoded as before and only auxiliary AMO/cardinality variables are eliminated.
+        """
+        frozen = np.arange(1, self.index.top + 1)
+        self.preprocessor = Preprocessor(self.formula.hard, self.formula.nv, frozen)
+        self.formula.hard = self.preprocessor.run()
+
+    def _solve_anytime(self, on_solution=None, deadline=None):
+        """
+        Anytime search: a phase-guided SAT call gives a first seating, then stratified RC2 reports
+        the model of every finished weight level and finally the optimum. Without soft clauses the
+        first seating is already optimal and RC2 is not run. Every improving seating is
+        recorded in self.incumbents and passed to on_solution. If `deadline` (a time.time() value)
+        is given, both calls are interrupted when it passes.
+
+        Returns:
+            tuple: (optimal, interrupted) flags of the search.
+        """
         start_time = time.time()
-        solution = solver.compute()
+        self.incumbents, self._best = [], None
+        with self.timer.phase('solver_build'):
+            self._split_soft_clauses()
+        optimal, interrupted = False, False
+
+        def record(model):
+            self._record_incumbent(model, start_time, on_solution)
+
+        try:
+            with self.timer.phase('hint'):  # Lời giải đầu tiên từ heuristic và một lời gọi SAT
+                model = self._find_incumbent(deadline)
+            if model is not None:
+                record(model)
+            if not self.formula.soft:
+                # Không có mệnh đề mềm (ví dụ 'max' khi không có bàn thỏa mãn hoàn toàn): RC2Stratified
+                # không gọi bộ giải SAT nên bị lỗi, còn lời gọi SAT ở trên đã giải xong phần cứng
+                optimal = model is not None
+                interrupted = not optimal and deadline is not None and time.time() >= deadline
+                self.cost_bound = 0 if optimal else None
+            elif deadline is not None and time.time() >= deadline:
+                interrupted = True
+            else:
+                with self.timer.phase('solver_build'):
+                    rc2 = _AnytimeRC2(self.formula, record)
+                timer = None
+                if deadline is not None:
+                    timer = threading.Timer(max(deadline - time.time(), 0), rc2.interrupt)
+                    timer.start()
+                try:
+                    with self.timer.phase('solve'):
+                        solution = rc2.compute(expect_interrupt=deadline is not None)
+                finally:
+                    if timer is not None:
+                        timer.cancel()
+                    self.cost_bound = rc2.cost
+                    rc2.delete()
+                if solution is not None:
+                    optimal = True
+                    record(solution)
+                else:
+                    interrupted = rc2.interrupted
+        except _StopSearch:
+            interrupted = True
         self.solve_time = time.time() - start_time
-        self.total_weight = sum(self.formula.wght) - solver.cost
-        if self.encoding_type == 'min':
-            self.total_weight = self.num_students - solver.cost
-
-        # # # Giải mã kết quả và tính toán tổng trọng số
-        # # self.assigned_tables, self.total_weight = self.extract_solution_and_calculate_weights(solution)
 
+        with self.timer.phase('extract'):
+            if self._best is None:
+                self.assigned_tables, self.total_weight = [], None
+            else:
+                cost, model = self._best
+                self.assigned_tables, _ = self.extract_solution_and_calculate_weights(model)
+                self.total_weight = self.weight_of_cost(cost)
+        return optimal, interrupted
+
+    def _record_incumbent(self, model, start_time, on_solution=None):
+        """ Keep the model if it improves on the best one and report it to on_solution. """
+        cost = self._cost_of_model(model)
+        if self._best is not None and cost >= self._best[0]:
+            return
+        self._best = (cost, model)
+        elapsed = time.time() - start_time
+        total_weight = self.weight_of_cost(cost)
+        self.incumbents.append((elapsed, total_weight))
+        if on_solution is not None:
+            tables, _ = self.extract_solution_and_calculate_weights(model)
+            if on_solution(tables, total_weight, elapsed):
+                raise _StopSearch()
+
+    def _find_incumbent(self, deadline=None):
+        """
+        Solve the hard clauses once to get a feasible seating before RC2 starts. The call assumes
+        the tables of the heuristic seating, so it returns that seating whenever the encoding can
+        express it; otherwise it is repeated without assumptions, preferring the soft literals.
+        Returns None if the hard clauses are unsatisfiable or the deadline fires first.
+        """
+        solver = Minisat22()
+        self.formula.hard.feed(solver)
+        timer = None
+        if deadline is not None:
+            timer = threading.Timer(max(deadline - time.time(), 0), solver.interrupt)
+            timer.start()
+        found = False
+        seating = heuristic_seating(self.num_students, self.preferences)
+        if seating is not None:
+            assumptions = np.flatnonzero(seating_vars(self.index, seating))
+            found = solver.solve_limited(assumptions=assumptions.tolist(), expect_interrupt=deadline is not None)
+        if found is False:  # Không có lời giải heuristic, hoặc mô hình không biểu diễn được nó
+            solver.set_phases([clause[0] for clause in self.formula.soft])
+            found = solver.solve_limited(expect_interrupt=deadline is not None)
+        if timer is not None:
+            timer.cancel()
+        model = solver.get_model() if found else None
+        solver.delete()
+        return model
+
+    def _split_soft_clauses(self):
+        """
+        Copy the soft clauses for _cost_of_model before RC2 appends its selectors to them. Most are
+        unit clauses and are evaluated at once with NumPy.
+        """
+        unit = [len(clause) == 1 for clause in self.formula.soft]
+        lits = np.array([clause[0] for clause, u in zip(self.formula.soft, unit) if u], dtype=np.int64)
+        weights = np.array([w for w, u in zip(self.formula.wght, unit) if u])
+        others = [(list(clause), w) for clause, w, u in zip(self.formula.soft, self.formula.wght, unit) if not u]
+        self._soft_units = (lits, weights, others)
+
+    def _cost_of_model(self, model):
+        """ Sum the weights of the soft clauses falsified by a model. """
+        model = np.asarray(model, dtype=np.int64)
+        truth = np.zeros(max(self.formula.nv, int(np.abs(model).max(initial=0))) + 1, dtype=bool)
+        truth[model[model > 0]] = True
+        lits, weights, others = self._soft_units
+        cost = weights[truth[np.abs(lits)] != (lits > 0)].sum().item() if len(lits) else 0
+        for clause, weight in others:
+            if not any(truth[lit] if lit > 0 else not truth[-lit] for lit in clause):
+                cost += weight
+        return cost
+
+    def weight_of_cost(self, cost):
+        """ Convert the MaxSAT cost (falsified soft weight) into the satisfied TCPC weight. """
+        if self.encoding_type == 'min':
+            return self.num_students - cost - self.fixed_cost
+        return sum(self.formula.wght) - cost
 
     def extract_solution_and_calculate_weights(self, solution):
         """ Giải mã và tính tổng trọng số được thỏa mãn """
-        assigned_tables = {}
-        total_satisfied_weight = 0
-
-        if solution:
-            # Duyệt qua tất cả các biến dương (các biến được gán giá trị true trong solution)
-            for var in solution:
-                if var > 0:
-                    # Nếu biến dương thuộc xij_vars
-                    for (i, j), v in self.xij_vars.items():
-                        if v == var:
-                            assigned_tables.setdefault(var, []).extend([i, j])
-                            total_satisfied_weight += self.wij.get((i, j), 0)
-                            break  # Khi tìm thấy biến khớp, không cần tiếp tục duyệt
-                    # Nếu biến dương thuộc xijk_vars
-                    for (i, j, k), v in self.xijk_vars.items():
-                        if v == var:
-                            assigned_tables.setdefault(var, []).extend([i, j, k])
-                            total_satisfied_weight += self.wijk.get((i, j, k), 0)
-                            break  # Khi tìm thấy biến khớp, không cần tiếp tục duyệt
-
-        final_assigned_tables = [list(set(students)) for students in assigned_tables.values()]
-        return final_assigned_tables, total_satisfied_weight
+        if solution is None:
+            return [], 0
+        true_vars = true_vars_of_model(solution)  # Các biến được gán giá trị true trong solution
+        assigned_tables = decode_seating(self.index, true_vars)
+        total_satisfied_weight = self.weights.total_weight(assigned_tables)
+        return assigned_tables, total_satisfied_weight
 
     def get_stats(self):
-        """ Trả về các thống kê chính: số biến, số mệnh đề, trọng số và thời gian chạy """
-        num_variables = len(self.xij_vars) + len(self.xijk_vars) + len(self.y_vars)
+        """ Trả về các thống kê chính: số biến, số mệnh đề, trọng số, thời gian chạy và thời gian/bộ nhớ từng pha """
         return {
-            'variables': num_variables,
+            'variables': self.index.num_variables,
             'hard_clauses': self.hard_count,
             'soft_clauses': self.soft_count,
             'total_weight': self.total_weight,
-            'solve_time': self.solve_time
+            'solve_time': self.solve_time,
+            **preprocess_columns(self.preprocessor),  # Kích thước trước/sau khi tiền xử lý (nếu có)
+            **self.timer.stats(),  # time_<pha>, peak_rss_<pha> và total_time
         }
 
     def print_assigned_tables(self):
@@ -208,20 +414,6 @@ class TeamCompositionSolver:
             print(table)
 
 
-def read_data(filename):
-    """ Đọc sở thích của sinh viên từ file. """
-    with open(filename, 'r') as file:
-        lines = file.readlines()
-
-    num_students = int(lines[0].strip())
-    preferences = {}
-    for line in lines[1:]:
-        parts = list(map(int, line.strip().split()))
-        preferences[parts[0]] = parts[1:]
-
-    return num_students, preferences
-
-
 if __name__ == "__main__":
     input_data = 'data/fully/fully_7.txt'
     num_students, preferences = read_data(input_data)
@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import sqlite3
+import pandas as pd
+from instance_io import BINARY_EXTENSION, adjacency_hash, load_adjacency, read_header
+
+DEFAULT_STORE = 'results/results.db'
+
+
+def instance_hash(filepath):
+    """
+    adjacency_hash of an input file: read from the header of a binary instance, computed for a
+    text one. A class keeps one key whether it is renamed, moved or converted between .txt and
+    .npz, and the key is the one of its reference sidecar.
+    """
+    if filepath.endswith(BINARY_EXTENSION):
+        return read_header(filepath)[1]
+    return adjacency_hash(load_adjacency(filepath))
+
+
+def _to_json(value):
+    """ Chuyển các kiểu NumPy (int64, float64, bool_) về kiểu Python khi ghi JSON. """
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def write_excel(rows, output_file):
+    """ Writes result rows to an Excel file in one go, replacing the file. """
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    pd.DataFrame(rows).to_excel(output_file, index=False)
+    print(f"Results have been exported to {output_file}")
+
+
+class ResultStore:
+    """
+    Append-only store of benchmark result rows in a SQLite file.
+
+    Every row is keyed by the hash of the instance, the solver, the encoding and the solver
+    parameters, and its columns are kept as JSON so solvers with different statistics share one
+    table. Each append is a single transaction, so runs in parallel processes can write to the
+    same file; Excel files are written once from the store with export_excel.
+    """
+
+    def __init__(self, path=DEFAULT_STORE, timeout=60):
+        self.path = path
+        self.timeout = timeout  # Thời gian chờ (giây) khi tiến trình khác đang ghi
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')  # Cho phép đọc trong khi tiến trình khác ghi
+            conn.execute('''CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                instance_hash TEXT, filename TEXT, solver TEXT, encoding_type TEXT, params TEXT,
+                created REAL, data TEXT)''')
+            conn.execute('CREATE INDEX IF NOT EXISTS results_key ON results '
+                         '(instance_hash, solver, encoding_type, params)')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # Mỗi thao tác mở kết nối riêng nên store dùng được sau khi fork tiến trình
+        return sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+
+    def append(self, row, solver, encoding_type=None, params=None, filepath=None):
+        """
+        Appends a result row.
+
+        Args:
+            row (dict): The result row (e.g. a solver's get_stats() plus the filename).
+            solver (str): Name of the solver or benchmark that produced the row.
+            encoding_type (str): Encoding of the run, if any.
+            params (dict): Remaining solver parameters that identify the run.
+            filepath (str): Input file of the run; its content hash keys the row.
+        """
+        key = (
+            instance_hash(filepath) if filepath else None,
+            os.path.basename(filepath) if filepath else row.get('filename'),
+            solver,
+            encoding_type,
+            json.dumps(params or {}, sort_keys=True, default=_to_json),
+        )
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT INTO results (instance_hash, filename, solver, encoding_type, params, created, data) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?)', key + (time.time(), json.dumps(row, default=_to_json)))
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def rows(self, solver=None, encoding_type=None, params=None, instance_hashes=None, latest=False):
+        """
+        Reads the stored rows matching all given keys, oldest first.
+
+        With latest=True only the last row of every key is kept, so a rerun sweep replaces its
+        earlier rows in the export instead of duplicating them.
+
+        Returns:
+            list: The result rows as dicts.
+        """
+        query, args = 'SELECT data FROM results WHERE 1=1', []
+        for column, value in (('solver', solver), ('encoding_type', encoding_type)):
+            if value is not None:
+                query += f' AND {column} = ?'
+                args.append(value)
+        if params is not None:
+            query += ' AND params = ?'
+            args.append(json.dumps(params, sort_keys=True, default=_to_json))
+        if instance_hashes is not None:
+            instance_hashes = list(instance_hashes)
+            query += f" AND instance_hash IN ({', '.join('?' * len(instance_hashes))})"
+            args += instance_hashes
+        if latest:
+            query += ' AND id IN (SELECT MAX(id) FROM results GROUP BY instance_hash, solver, encoding_type, params)'
+        conn = self._connect()
+        try:
+            return [json.loads(data) for data, in conn.execute(query + ' ORDER BY id', args)]
+        finally:
+            conn.close()
+
+    def contains(self, filepath, solver, encoding_type=None, params=None):
+        """ Whether a row with this key is already stored, e.g. to resume an interrupted sweep. """
+        return bool(self.rows(solver, encoding_type, params or {}, [instance_hash(filepath)]))
+
+    def to_dataframe(self, **keys):
+        """ The matching rows as a DataFrame (see rows for the keys). """
+        return pd.DataFrame(self.rows(**keys))
+
+    def export_excel(self, output_file, **keys):
+        """
+        Writes the matching rows to an Excel file in one go, replacing the file.
+
+        Args:
+            output_file (str): Path to the output Excel file.
+            **keys: Filters passed to rows (solver, encoding_type, params, instance_hashes, latest).
+        """
+        write_excel(self.rows(**keys), output_file)
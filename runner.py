@@ -0,0 +1,248 @@
+import os
+import time
+import multiprocessing
+from multiprocessing.connection import wait
+from rc2_solver_tcpc import TeamCompositionSolver, read_data
+from cpsat_solver import TeamCompositionCPSATSolver
+from sat_solver import TeamCompositionSATSolver
+from dimacs import TeamCompositionExternalSolver
+from partition_solver import TeamCompositionPartitionSolver
+from result_store import ResultStore, DEFAULT_STORE, write_excel
+from verifier import verify_seating
+
+try:
+    import resource  # Chỉ có trên Unix
+except ImportError:
+    resource = None
+
+# Các bộ giải mà một job có thể chạy và các mã hóa hợp lệ của chúng
+JOB_SOLVERS = {
+    'sat': (None,),
+    'rc2': ('min', 'max'),
+    'cpsat': ('max', 'min'),
+    'external': ('min', 'max', 'sat'),  # Bộ giải SAT/MaxSAT ngoài, lệnh trong job['command'] (xem dimacs.py)
+    'partition': ('total', 'perfect'),  # Phân hoạch tập trên bàn ứng viên, mã hóa là hàm mục tiêu
+}
+
+# Các cặp (bộ giải, mã hóa) của run_and_export trong export.py
+DEFAULT_JOBS = (('sat', None), ('rc2', 'min'), ('cpsat', 'max'), ('cpsat', 'min'))
+
+# Trạng thái của một job
+DONE = 'DONE'  # Bộ giải chạy xong
+TIMEOUT = 'TIMEOUT'  # Hết thời gian, tiến trình bị dừng
+MEMOUT = 'MEMOUT'  # Vượt giới hạn bộ nhớ
+ERROR = 'ERROR'  # Bộ giải ném ngoại lệ hoặc tiến trình bị dừng bất thường
+
+
+def make_jobs(filepaths, solvers=DEFAULT_JOBS, num_runs=1, verify=True, command=None, preprocess=False):
+    """
+    Lists one job per (file, solver, encoding, run).
+
+    Args:
+        filepaths (list): Input files.
+        solvers (tuple): (solver, encoding_type) pairs, see JOB_SOLVERS.
+        num_runs (int): Number of runs of every solver on every file.
+        verify (bool): Check every returned seating and recompute its weight (see verifier.py).
+        command (list): Solver binary of the 'external' jobs, see dimacs.run_external.
+        preprocess (bool): Simplify the clauses of the 'sat' and 'rc2' jobs first, see preprocess.py.
+
+    Returns:
+        list: Job dicts with the keys filepath, solver, encoding_type, run and verify.
+    """
+    for solver, encoding_type in solvers:
+        if solver not in JOB_SOLVERS or encoding_type not in JOB_SOLVERS[solver]:
+            raise ValueError(f"Invalid job ({solver}, {encoding_type}). Use one of: {DEFAULT_JOBS}.")
+        if solver == 'external' and not command:
+            raise ValueError("External jobs need the command of the solver binary.")
+    return [{'filepath': filepath, 'solver': solver, 'encoding_type': encoding_type, 'run': run, 'verify': verify,
+             'command': command, 'preprocess': preprocess}
+            for filepath in filepaths
+            for solver, encoding_type in solvers
+            for run in range(num_runs)]
+
+
+def objective_of(solver, encoding_type):
+    """
+    Objective whose weight a solver reports: 'perfect' for SAT and RC2/external 'max', the
+    encoding itself for 'partition', 'total' otherwise.
+    """
+    if solver == 'partition':
+        return encoding_type
+    return 'perfect' if solver in ('sat', 'rc2', 'external') and encoding_type != 'min' else 'total'
+
+
+def run_job(job):
+    """
+    Runs a single job in the current process.
+
+    Returns:
+        dict: The job's result row (filename, solver, encoding and the solver's get_stats()).
+    """
+    num_students, preferences = read_data(job['filepath'])
+    if job['solver'] == 'sat':
+        solver = TeamCompositionSATSolver(num_students, preferences, preprocess=job.get('preprocess', False))
+    elif job['solver'] == 'rc2':
+        solver = TeamCompositionSolver(num_students, preferences, encoding_type=job['encoding_type'],
+                                       preprocess=job.get('preprocess', False))
+    elif job['solver'] == 'external':
+        solver = TeamCompositionExternalSolver(num_students, preferences, job['command'],
+                                               encoding_type=job['encoding_type'])
+    elif job['solver'] == 'partition':
+        solver = TeamCompositionPartitionSolver(num_students, preferences, objective=job['encoding_type'])
+    else:
+        solver = TeamCompositionCPSATSolver(num_students, preferences, encoding_type=job['encoding_type'])
+    solver.solve()
+    row = _job_row(job, num_students)
+    row.update(solver.get_stats())
+    row['solver_status'] = row.pop('status', None)  # OPTIMAL/FEASIBLE... của bộ giải (nếu có)
+    row['status'] = DONE
+    if job.get('verify', True) and solver.assigned_tables:
+        row.update(_verify_columns(job, solver))
+    return row
+
+
+def _verify_columns(job, solver):
+    """ Kiểm tra lời giải của bộ giải và tính lại trọng số (RC2 'max' chỉ tính các bàn thỏa mãn hoàn toàn). """
+    start_time = time.time()
+    objective = objective_of(job['solver'], job['encoding_type'])
+    check = verify_seating(solver.num_students, solver.preferences, solver.assigned_tables,
+                           getattr(solver, 'total_weight', None), objective)
+    return {
+        'valid': check['valid'],
+        'verify_errors': '; '.join(check['errors']),
+        'verified_total_weight': check['total_weight'],
+        'verified_perfect_weight': check['perfect_weight'],
+        'weight_matches': check.get('weight_matches'),
+        'verify_time': time.time() - start_time,
+    }
+
+
+def _job_row(job, num_students=None):
+    return {
+        'filename': os.path.basename(job['filepath']),
+        'num_students': num_students,
+        'solver': job['solver'],
+        'encoding_type': job['encoding_type'],
+        'run': job['run'],
+    }
+
+
+def _job_worker(job, memory_limit, conn, target=run_job):
+    """ Chạy job trong tiến trình con và gửi kết quả về qua pipe. """
+    if memory_limit is not None and resource is not None:
+        limit = int(memory_limit * 1024 * 1024)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        row = target(job)
+    except MemoryError:
+        row = dict(_job_row(job), status=MEMOUT)
+    except Exception as e:
+        row = dict(_job_row(job), status=ERROR, error=repr(e))
+    conn.send(row)
+    conn.close()
+
+
+def run_jobs(jobs, max_workers=None, timeout=None, memory_limit=None, on_result=None, target=run_job):
+    """
+    Runs jobs in parallel, each in its own process, and yields their result rows as they finish.
+
+    A job that exceeds `timeout` is killed and reported as TIMEOUT, so a slow solve only blocks its
+    own slot. With max_workers=1 the jobs run one after another, which keeps timings comparable.
+
+    Args:
+        jobs (list): Jobs from make_jobs.
+        max_workers (int): Number of jobs running at the same time (default: number of cores).
+        timeout (float): Wall-clock limit of every job in seconds (None for no limit).
+        memory_limit (float): Address-space limit of every job in MiB (None for no limit, ignored
+            where the resource module is unavailable).
+        on_result (callable): Optional function called with every job and its result row.
+        target (callable): Module-level function that runs one job and returns its row (run_job by default).
+
+    Yields:
+        tuple: (job, row) per job, in completion order; the row has 'status' and 'wall_time' set.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+    pending = list(reversed(jobs))
+    running = []  # (process, pipe, job, start time, result row)
+
+    while pending or running:
+        while pending and len(running) < max_workers:
+            job = pending.pop()
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_job_worker, args=(job, memory_limit, sender, target),
+                                              daemon=True)
+            process.start()
+            sender.close()
+            running.append([process, receiver, job, time.time(), None])
+
+        # Chờ đến khi có job gửi kết quả, kết thúc hoặc job sớm nhất hết thời gian
+        wait_time = None
+        if timeout is not None:
+            wait_time = max(0, min(entry[3] for entry in running) + timeout - time.time())
+        wait([entry[0].sentinel for entry in running] + [entry[1] for entry in running if entry[4] is None],
+             timeout=wait_time)
+
+        now = time.time()
+        for entry in list(running):
+            process, receiver, job, start, row = entry
+            if row is None and receiver.poll():
+                row = entry[4] = receiver.recv()
+            if process.is_alive():
+                if timeout is None or now - start < timeout:
+                    continue
+                process.kill()
+                row = row or dict(_job_row(job), status=TIMEOUT)
+            elif row is None:
+                row = dict(_job_row(job), status=ERROR, error=f'exit code {process.exitcode}')
+            process.join()
+            receiver.close()
+            running.remove(entry)
+            row['wall_time'] = now - start
+            if on_result is not None:
+                on_result(job, row)
+            yield job, row
+
+
+def run_parallel_and_export(data_directory, output_file="results/parallel.xlsx", solvers=DEFAULT_JOBS, num_runs=1,
+                            max_workers=None, timeout=None, memory_limit=None, store_file=DEFAULT_STORE):
+    """
+    Runs every solver on all .txt files in the directory as parallel jobs. Each result row is
+    appended to the result store as soon as its job finishes, and the Excel file is written once
+    all jobs are done.
+
+    Args:
+        data_directory (str): Path to the directory containing the input files.
+        output_file (str): Path to the output Excel file.
+        solvers (tuple): (solver, encoding_type) pairs, see JOB_SOLVERS.
+        num_runs (int): Number of runs of every solver on every file.
+        max_workers (int): Number of jobs running at the same time; 1 serializes the runs.
+        timeout (float): Wall-clock limit of every job in seconds.
+        memory_limit (float): Memory limit of every job in MiB.
+        store_file (str): Path to the SQLite result store.
+
+    Returns:
+        list: The result rows in completion order.
+    """
+    filepaths = [os.path.join(data_directory, filename) for filename in sorted(os.listdir(data_directory))
+                 if filename.endswith(".txt")]
+    jobs = make_jobs(filepaths, solvers, num_runs)
+    store = ResultStore(store_file)
+    params = {'timeout': timeout, 'memory_limit': memory_limit}
+    results = []
+    for job, row in run_jobs(jobs, max_workers=max_workers, timeout=timeout, memory_limit=memory_limit):
+        print(row)
+        store.append(row, job['solver'], encoding_type=job['encoding_type'], params=dict(params, run=job['run']),
+                     filepath=job['filepath'])
+        results.append(row)
+    write_excel(results, output_file)
+    return results
+
+
+if __name__ == "__main__":
+    # Chạy song song với giới hạn 10 phút và 8 GiB cho mỗi job
+    run_parallel_and_export('data/fully/', 'results/parallel_fully.xlsx', timeout=600, memory_limit=8192)
+
+    # # Chạy tuần tự để đo thời gian chính xác
+    # run_parallel_and_export('data/max/', 'results/parallel_max.xlsx', max_workers=1, timeout=600)
@@ -1,176 +1,214 @@
 import os
 import time
-import pandas as pd
-from openpyxl import load_workbook
-from pysat.formula import CNF, IDPool
+import numpy as np
+from pysat.formula import CNFPlus, IDPool
 from pysat.card import CardEnc, EncType
-from pysat.solvers import Minisat22
+from pysat.solvers import Minisat22, Minicard, Gluecard3, Gluecard4
+from weights import calculate_weights
+from amo import atmost_one_array, check_amo_encoding
+from clause_buffer import ClauseBuffer
+from indexing import VariableIndex
+from skeleton import HardSkeleton, get_skeleton, store_skeleton
+from candidates import candidate_ranks, num_two_seat_students
+from result_store import ResultStore, DEFAULT_STORE, instance_hash
+from profiling import PhaseTimer, phase_columns
+from decoding import decode_model
+from instance_io import read_data
+from preprocess import Preprocessor, preprocess_columns
+
+SAT_BACKENDS = {
+    'minisat': Minisat22,
+    'minicard': Minicard,
+    'gluecard3': Gluecard3,
+    'gluecard4': Gluecard4,
+}
+# Các bộ giải hỗ trợ ràng buộc AtMost gốc (không cần mã hóa thành mệnh đề)
+NATIVE_CARD_BACKENDS = ('minicard', 'gluecard3', 'gluecard4')
 
 
 class TeamCompositionSATSolver:
-    def __init__(self, num_students, preferences):
+    def __init__(self, num_students, preferences, prune=False, use_skeleton_cache=True, skeleton_dir=None,
+                 amo_encoding='seqcounter', backend='minisat', trace_memory=False, preprocess=False):
         self.num_students = num_students
         self.preferences = preferences
-        self.formula = CNF()
-        self.vpool = IDPool(start_from=1)  # ID Pool for managing variables
-        self.xij_vars = {}
-        self.xijk_vars = {}
-        self.y_vars = {}
+        self.prune = prune  # Chỉ tạo biến cho các cặp/bộ ba thỏa mãn hoàn toàn
+        if backend not in SAT_BACKENDS:
+            raise ValueError(f"Invalid backend '{backend}'. Use one of: {', '.join(SAT_BACKENDS)}.")
+        self.backend = backend
+        self.native_card = backend in NATIVE_CARD_BACKENDS  # Ràng buộc bản số được đưa thẳng vào bộ giải
+        check_amo_encoding(amo_encoding)
+        # Mã hóa at-most-one cho ràng buộc mỗi học sinh một bàn ('native' với Minicard/Gluecard)
+        self.amo_encoding = 'native' if self.native_card else amo_encoding
+        self.weights = None
+        self.formula = CNFPlus()  # Mệnh đề và các ràng buộc AtMost gốc (formula.atmosts)
+        self.formula.clauses = ClauseBuffer()  # Mệnh đề trong mảng int32 liền nhau thay vì list của list
+        self.index = None  # Ánh xạ bàn (i, j) / (i, j, k) và y_i sang ID biến
+        self.vpool = None  # ID Pool cho các biến phụ của mã hóa AMO
         self.clauses_count = 0  # Biến đếm số mệnh đề
+        self.atmost_count = 0  # Biến đếm số ràng buộc AtMost gốc
         self.solve_time = 0  # Biến lưu thời gian giải
         self.solution_found = False  # Biến lưu trạng thái của bài toán
         self.assigned_tables = []  # Biến lưu các bàn đã được sắp xếp
-        self._initialize_variables()
+        self.timer = PhaseTimer(trace_memory)  # Thời gian và bộ nhớ của từng pha
+        self.preprocess = preprocess  # Rút gọn công thức trước khi đưa vào bộ giải (xem preprocess.py)
+        self.preprocessor = None
+        # Khung mệnh đề cứng chỉ phụ thuộc vào sĩ số nên được dùng lại giữa các lần giải
+        self.use_skeleton_cache = use_skeleton_cache and not prune
+        self.skeleton_dir = skeleton_dir
+        self.skeleton = None
+        with self.timer.phase('init'):
+            if self.use_skeleton_cache:
+                self.skeleton = get_skeleton('cnf', num_students, self.amo_encoding, skeleton_dir)
+            self._initialize_variables()
 
     def _initialize_variables(self):
         """ Initialize Boolean variables for the formula. """
-        for i in range(1, self.num_students + 1):
-            for j in range(i + 1, self.num_students + 1):
-                self.xij_vars[(i, j)] = self.vpool.id()
-            for j in range(i + 1, self.num_students + 1):
-                for k in range(j + 1, self.num_students + 1):
-                    self.xijk_vars[(i, j, k)] = self.vpool.id()
-            self.y_vars[i] = self.vpool.id()
+        if self.prune:
+            self._initialize_candidate_variables()
+        elif self.skeleton is not None:
+            self.index = self.skeleton.index
+        else:
+            self.index = VariableIndex(self.num_students)
+        top = self.skeleton.top if self.skeleton is not None else self.index.top
+        self.vpool = IDPool(start_from=top + 1)
+
+    def _initialize_candidate_variables(self):
+        """ Initialize variables only for mutual pairs (wij == 2) and mutual triangles (wijk == 3). """
+        self.weights = self.calculate_weights()
+        pair_ranks, triple_ranks = candidate_ranks(self.weights, perfect_only=True)
+        self.index = VariableIndex(self.num_students, pair_ranks, triple_ranks)
 
     def add_hard_clauses(self):
         """ Add hard constraints to the formula. """
+        if self.skeleton is not None:
+            self._load_skeleton_clauses()
+            return
         self._add_single_assignment_clauses()
         self._add_valid_table_clauses()
+        num_clauses = len(self.formula.clauses)
         self._add_cardinality_constraint()
+        self.formula.nv = max(self.formula.nv, self.formula.clauses.nv)
+        if self.use_skeleton_cache:
+            self.skeleton = HardSkeleton('cnf', self.num_students, self.amo_encoding, self.index,
+                                         self.formula.clauses.copy(), self.vpool.top,
+                                         len(self.formula.clauses) - num_clauses, self.formula.atmosts)
+            store_skeleton(self.skeleton, self.skeleton_dir)
+
+    def _load_skeleton_clauses(self):
+        """ Reuse the cached hard clauses of this class size instead of encoding them again. """
+        self.formula.clauses = ClauseBuffer.of(self.skeleton.formula).copy()  # Các mệnh đề đơn vị được thêm sau
+        self.formula.atmosts = list(self.skeleton.atmosts)
+        self.formula.nv = max(self.formula.nv, self.skeleton.top)
+        self.clauses_count += self.num_students + self.skeleton.num_valid_table_clauses + self.skeleton.num_cardinality_clauses
+        self.atmost_count += len(self.skeleton.atmosts)
 
     def _add_single_assignment_clauses(self):
         """ Add constraints ensuring each student is assigned to exactly one table. """
         for i in range(1, self.num_students + 1):
             clause = self._get_single_assignment_clause(i)
-            card_enc_atmost = CardEnc.atmost(lits=clause, bound=1, vpool=self.vpool, encoding=EncType.seqcounter)
-            for c in card_enc_atmost.clauses:
-                self.formula.append(c)
-            self.formula.append(clause)
+            if self.native_card:
+                self.formula.append([clause, 1], is_atmost=True)
+                self.atmost_count += 1
+            else:
+                self.formula.clauses.extend(atmost_one_array(clause, self.vpool, self.amo_encoding))
+            self.formula.clauses.append(clause)
             self.clauses_count += 1  # Tăng số lượng mệnh đề
 
     def _get_single_assignment_clause(self, i):
         """ Generate clause for single assignment of student i. """
-        clause = []
-        if i == 1:
-            clause = [self.xij_vars[(i, j)] for j in range(2, self.num_students + 1)]
-            clause += [self.xijk_vars[(i, j, k)] for j in range(2, self.num_students) for k in range(j + 1, self.num_students + 1)]
-        elif 2 <= i <= self.num_students - 1:
-            clause = [self.xij_vars[(j, i)] for j in range(1, i)] + [self.xij_vars[(i, j)] for j in range(i + 1, self.num_students + 1)]
-            clause += [self.xijk_vars[(j, k, i)] for k in range(2, i) for j in range(1, k)]
-            clause += [self.xijk_vars[(j, i, k)] for j in range(1, i) for k in range(i + 1, self.num_students + 1)]
-            clause += [self.xijk_vars[(i, j, k)] for j in range(i + 1, self.num_students) for k in range(j + 1, self.num_students + 1)]
-        else:  # i == num_students
-            clause = [self.xij_vars[(j, i)] for j in range(1, self.num_students)]
-            clause += [self.xijk_vars[(j, k, i)] for j in range(1, self.num_students - 1) for k in range(j + 1, self.num_students)]
-        return clause
+        return self.index.student_vars(i).tolist()
 
     def _add_valid_table_clauses(self):
         """ Add constraints ensuring valid table assignments. """
-        for (i, j) in self.xij_vars:
-            self.formula.append([-self.xij_vars[(i, j)], self.y_vars[i]])
-            self.formula.append([-self.xij_vars[(i, j)], self.y_vars[j]])
-            self.clauses_count += 2  # Tăng số lượng mệnh đề
-
-        for (i, j, k) in self.xijk_vars:
-            self.formula.append([-self.xijk_vars[(i, j, k)], -self.y_vars[i]])
-            self.formula.append([-self.xijk_vars[(i, j, k)], -self.y_vars[j]])
-            self.formula.append([-self.xijk_vars[(i, j, k)], -self.y_vars[k]])
-            self.clauses_count += 3  # Tăng số lượng mệnh đề
+        pair_vars, pairs = self.index.pair_vars(), self.index.pair_tables()
+        y = self.index.y_start - 1 + pairs  # y_i, y_j của từng cặp
+        clauses = np.stack([-pair_vars, y[:, 0], -pair_vars, y[:, 1]], axis=1).reshape(-1, 2)
+        self.formula.clauses.extend(clauses)
+        self.clauses_count += len(clauses)  # Tăng số lượng mệnh đề
+
+        triple_vars, triples = self.index.triple_vars(), self.index.triple_tables()
+        y = self.index.y_start - 1 + triples
+        clauses = np.stack([-triple_vars, -y[:, 0], -triple_vars, -y[:, 1], -triple_vars, -y[:, 2]],
+                           axis=1).reshape(-1, 2)
+        self.formula.clauses.extend(clauses)
+        self.clauses_count += len(clauses)  # Tăng số lượng mệnh đề
 
     def _add_cardinality_constraint(self):
         """ Add cardinality constraints for the number of tables. """
-        num_tables_2 = int(self.num_students * 4 / 7)
-        card_constraint = CardEnc.equals(lits=list(self.y_vars.values()), bound=num_tables_2, vpool=self.vpool, encoding=EncType.seqcounter)
-        for clause in card_constraint.clauses:
-            self.formula.append(clause)
-            self.clauses_count += 1  # Tăng số lượng mệnh đề
+        num_tables_2 = num_two_seat_students(self.num_students)
+        y_vars = self.index.y_vars().tolist()
+        if self.native_card:
+            # sum(y) <= N2 và sum(-y) <= n - N2, tức là sum(y) == N2
+            self.formula.append([y_vars, num_tables_2], is_atmost=True)
+            self.formula.append([[-y for y in y_vars], self.num_students - num_tables_2], is_atmost=True)
+            self.atmost_count += 2
+            return
+        card_constraint = CardEnc.equals(lits=y_vars, bound=num_tables_2, vpool=self.vpool, encoding=EncType.seqcounter)
+        self.formula.clauses.extend(card_constraint.clauses)
+        self.clauses_count += len(card_constraint.clauses)  # Tăng số lượng mệnh đề
 
     def calculate_weights(self):
         """ Calculate weights based on the chosen encoding type. """
-        out_degrees = {i: 0 for i in range(1, self.num_students + 1)}
-        for i, friends in self.preferences.items():
-            out_degrees[i] = len(friends)
+        return calculate_weights(self.num_students, self.preferences)
 
-        wij = {}
-        wijk = {}
-
-        for i in range(1, self.num_students + 1):
-            for j in range(i + 1, self.num_students + 1):
-                subgraph_out_degrees = {
-                    v: sum(1 for neighbor in self.preferences.get(v, []) if neighbor in {i, j})
-                    for v in [i, j]
-                }
-                wi = subgraph_out_degrees[i]
-                wj = subgraph_out_degrees[j]
-                wij[(i, j)] = 2 * wi * wj
-            for j in range(i + 1, self.num_students + 1):
-                for k in range(j + 1, self.num_students + 1):
-                    subgraph_out_degrees = {
-                        v: sum(1 for neighbor in self.preferences.get(v, []) if neighbor in {i, j, k})
-                        for v in [i, j, k]
-                    }
-                    wi = subgraph_out_degrees[i]
-                    wj = subgraph_out_degrees[j]
-                    wk = subgraph_out_degrees[k]
-                    wijk[(i, j, k)] = 3 * wi * wj * wk / 8
-        return wij, wijk
-
-    def add_constraint_through_preferences(self, wij, wijk):
-        for (i, j), weight in wij.items():
-            if weight != 2:
-                self.formula.append([-self.xij_vars[(i, j)]])
-                self.clauses_count += 1  # Tăng số lượng mệnh đề
-
-        for (i, j, k), weight in wijk.items():
-            if weight != 3:
-                self.formula.append([-self.xijk_vars[(i, j, k)]])
-                self.clauses_count += 1  # Tăng số lượng mệnh đề
+    def add_constraint_through_preferences(self, weights):
+        if self.prune:
+            return  # Chỉ có biến cho các bàn thỏa mãn hoàn toàn, không cần mệnh đề đơn vị
+        pair_weights, triple_weights = weights.weights_by_var(self.index)
+        units = np.concatenate([self.index.pair_vars()[pair_weights != 2],
+                                self.index.triple_vars()[triple_weights != 3]])
+        self.formula.clauses.extend((-units)[:, None])
+        self.clauses_count += len(units)  # Tăng số lượng mệnh đề
 
     def solve(self):
         """ Giải bài toán và trả về kết quả """
-        self.add_hard_clauses()
-        wij, wijk = self.calculate_weights()
-        self.add_constraint_through_preferences(wij, wijk)
-        solver = Minisat22(bootstrap_with=self.formula.clauses)
-        start_time = time.time()
-        self.solution_found = solver.solve()
-        self.solve_time = time.time() - start_time
+        with self.timer.phase('hard_clauses'):
+            self.add_hard_clauses()
+        with self.timer.phase('weights'):
+            weights = self.weights if self.weights is not None else self.calculate_weights()
+        with self.timer.phase('soft_clauses'):  # Mệnh đề đơn vị loại các bàn không thỏa mãn hoàn toàn
+            self.add_constraint_through_preferences(weights)
+        clauses = self.formula.clauses
+        if self.preprocess:
+            with self.timer.phase('preprocess'):
+                # Biến của các ràng buộc AtMost gốc không được khử vì bộ tiền xử lý không thấy chúng
+                frozen = [lit for lits, _ in self.formula.atmosts for lit in lits]
+                self.preprocessor = Preprocessor(clauses, self.formula.nv, frozen)
+                clauses = self.preprocessor.run()
+        with self.timer.phase('solver_build'):
+            solver = SAT_BACKENDS[self.backend]()
+            clauses.feed(solver)  # Nạp theo từng khối mệnh đề
+            for lits, bound in self.formula.atmosts:
+                solver.add_atmost(lits, bound)
+        with self.timer.phase('solve'):
+            start_time = time.time()
+            self.solution_found = solver.solve()
+            self.solve_time = time.time() - start_time
 
         # Trích xuất mô hình (model) nếu bài toán SAT thỏa mãn
-        model = solver.get_model() if self.solution_found else None
-        if model:
-            self.assigned_tables = self.extract_solution(model)
+        with self.timer.phase('extract'):
+            # Mô hình có thể rỗng khi tiền xử lý đã gán hết các biến, nên không kiểm tra theo giá trị đúng/sai
+            if self.solution_found:
+                model = solver.get_model()
+                if self.preprocessor is not None:
+                    model = self.preprocessor.reconstruct(model)  # Gán lại các biến đã bị gán/khử khi tiền xử lý
+                self.assigned_tables = self.extract_solution(model)
 
     def extract_solution(self, model):
         """ Extract the assigned tables from the solution """
-        assigned_tables = {}
-
-        # Tạo từ điển để tra cứu nhanh biến
-        var_to_students_pair = {v: (i, j) for (i, j), v in self.xij_vars.items()}
-        var_to_students_triple = {v: (i, j, k) for (i, j, k), v in self.xijk_vars.items()}
-
-        for var in model:
-            if var > 0:  # Chỉ xem xét những biến dương (được chọn trong solution)
-                if var in var_to_students_pair:
-                    i, j = var_to_students_pair[var]
-                    assigned_tables.setdefault(var, []).extend([i, j])
-                elif var in var_to_students_triple:
-                    i, j, k = var_to_students_triple[var]
-                    assigned_tables.setdefault(var, []).extend([i, j, k])
-
-        # Loại bỏ trùng lặp trong các bảng
-        final_assigned_tables = [list(set(students)) for students in assigned_tables.values()]
-
-        return final_assigned_tables
+        # Chỉ xem xét những biến dương (được chọn trong solution); với mô hình rút gọn thêm các bàn phụ
+        return decode_model(self.index, model)
 
     def get_stats(self):
-        """ Trả về số lượng biến, số lượng mệnh đề, và trạng thái bài toán """
-        num_variables = len(self.xij_vars) + len(self.xijk_vars) + len(self.y_vars)
+        """ Trả về số lượng biến, số lượng mệnh đề, trạng thái bài toán và thời gian/bộ nhớ từng pha """
         return {
-            'variables': num_variables,  # Tổng số biến
+            'variables': self.index.num_variables,  # Tổng số biến
             'clauses': self.clauses_count,  # Số lượng mệnh đề đã thêm
+            'atmost_constraints': self.atmost_count,  # Số ràng buộc AtMost gốc (Minicard/Gluecard)
             'solve_time': self.solve_time,  # Thời gian giải bài toán
-            'solution_found': self.solution_found  # Bài toán có giải được không?
+            'solution_found': self.solution_found,  # Bài toán có giải được không?
+            **preprocess_columns(self.preprocessor),  # Kích thước trước/sau khi tiền xử lý (nếu có)
+            **self.timer.stats(),  # time_<pha>, peak_rss_<pha> và total_time
         }
 
     def print_assigned_tables(self):
@@ -180,70 +218,42 @@ class TeamCompositionSATSolver:
             print(table)
 
 
-def read_data(filename):
-    """ Đọc dữ liệu từ file .txt """
-    with open(filename, 'r') as file:
-        lines = file.readlines()
-
-    num_students = int(lines[0].strip())
-    preferences = {}
-    for line in lines[1:]:
-        parts = list(map(int, line.strip().split()))
-        preferences[parts[0]] = parts[1:]
-
-    return num_students, preferences
-
-
-def export_to_excel(results, output_file):
-    """
-    Exports results to an Excel file. If the file already exists, it appends the new data.
-
-    Args:
-        results (list): A list of dictionaries containing solver results.
-        output_file (str): Path to the output Excel file.
-    """
-    df = pd.DataFrame(results)
-
-    if os.path.exists(output_file):
-        # Append data to an existing file
-        with pd.ExcelWriter(output_file, mode='a', engine='openpyxl', if_sheet_exists='overlay') as writer:
-            book = load_workbook(output_file)
-            sheet = book.active
-            start_row = sheet.max_row  # Append data at the first available empty row
-            df.to_excel(writer, index=False, startrow=start_row, header=False)
-    else:
-        # Create a new Excel file
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False)
-
-    print(f"Results have been appended to {output_file}")
-
-
-def run_and_export(data_directory, output_file="results.xlsx", num_runs=1):
+def run_and_export(data_directory, output_file="results.xlsx", num_runs=1, backend='minisat', store_file=DEFAULT_STORE):
     """
     Runs the solver on all .txt files in the specified directory multiple times and averages the results.
 
+    Every result is appended to the result store as soon as it is ready; the Excel file is written
+    once at the end from the rows of this directory.
+
     Args:
         data_directory (str): Path to the directory containing the input files.
         output_file (str): Path to the output Excel file.
         num_runs (int): Number of times to run the solver to average the time and total weight.
+        backend (str): SAT solver to use, one of SAT_BACKENDS.
+        store_file (str): Path to the SQLite result store.
     """
+    store = ResultStore(store_file)
+    params = {'num_runs': num_runs, 'backend': backend}
+    hashes = []
     for filename in os.listdir(data_directory):
         if filename.endswith(".txt"):
             filepath = os.path.join(data_directory, filename)
             print(f"Running on {filename}")
-            result = run_on_file(filepath, num_runs)
+            result = run_on_file(filepath, num_runs, backend)
             print(f"Done results for {filename}")
-            export_to_excel([result], output_file)
+            store.append(result, 'sat', params=params, filepath=filepath)
+            hashes.append(instance_hash(filepath))
+    store.export_excel(output_file, solver='sat', params=params, instance_hashes=hashes, latest=True)
 
 
-def run_on_file(filepath, num_runs=1):
+def run_on_file(filepath, num_runs=1, backend='minisat'):
     """
     Processes a single file and runs TeamCompositionSolver multiple times to average the time.
 
     Args:
         filepath (str): Path to the input file.
         num_runs (int): Number of times to run the solver to average the time.
+        backend (str): SAT solver to use, one of SAT_BACKENDS.
 
     Returns:
         dict: A dictionary containing averaged results from the solver, including the filename.
@@ -254,12 +264,14 @@ def run_on_file(filepath, num_runs=1):
     # Initialize variables to store cumulative results
     total_time = 0
     solver_stats = None
+    runs = []  # Thống kê của từng lần chạy (thời gian/bộ nhớ từng pha)
 
     # Run the solver multiple times and accumulate the results
     for _ in range(num_runs):
-        solver = TeamCompositionSATSolver(num_students, preferences)
+        solver = TeamCompositionSATSolver(num_students, preferences, backend=backend)
         solver.solve()
         stats = solver.get_stats()
+        runs.append(stats)
 
         total_time += stats['solve_time']
         solver_stats = stats  # Keep updating to store the final stats (they should be the same across runs)
@@ -274,8 +286,10 @@ def run_on_file(filepath, num_runs=1):
         'num_students': num_students,
         'variables': solver_stats['variables'],
         'clauses': solver_stats['clauses'],
+        'atmost_constraints': solver_stats['atmost_constraints'],
         'avg_time': avg_time,
-        'solution_found': 'SAT' if solver_stats['solution_found'] else 'UNSAT'
+        'solution_found': 'SAT' if solver_stats['solution_found'] else 'UNSAT',
+        **phase_columns(runs),  # Thời gian và bộ nhớ từng pha
     }
 
     return result
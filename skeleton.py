@@ -0,0 +1,108 @@
+import os
+import pickle
+from collections import OrderedDict
+
+# Số khung được giữ trong bộ nhớ (đủ cho các bộ giải CNF và CP-SAT của một sĩ số); khung dùng lâu nhất bị bỏ trước
+MAX_SKELETONS = 2
+_SKELETONS = OrderedDict()  # Bộ nhớ đệm LRU trong tiến trình: (backend, num_students, encoding) -> HardSkeleton
+
+
+class HardSkeleton:
+    """
+    Preference-independent hard part of the TCPC encoding for one class size.
+
+    The exactly-one, valid-table and table-count constraints only depend on the number of
+    students, so they are encoded once per (backend, num_students, encoding) and shared by every
+    solver instance of that size. For the CNF backends `formula` is a ClauseBuffer of the hard clauses and
+    `atmosts` the native (lits, bound) constraints of cardinality-aware solvers; for CP-SAT it is a
+    CpModel whose proto index of a variable is its id in `index` minus one.
+    """
+
+    def __init__(self, backend, num_students, encoding, index, formula, top, num_cardinality_clauses, atmosts=()):
+        self.backend = backend  # 'cnf' hoặc 'cpsat'
+        self.num_students = num_students
+        self.encoding = encoding
+        self.index = index  # VariableIndex của các biến bàn và y
+        self.formula = formula
+        self.top = top  # ID (hoặc chỉ số) lớn nhất đã dùng
+        self.num_cardinality_clauses = num_cardinality_clauses
+        self.atmosts = list(atmosts)
+
+    @property
+    def key(self):
+        return skeleton_key(self.backend, self.num_students, self.encoding)
+
+    @property
+    def num_valid_table_clauses(self):
+        return 2 * self.index.num_pair_vars + 3 * self.index.num_triple_vars
+
+
+def skeleton_key(backend, num_students, encoding):
+    return backend, num_students, encoding
+
+
+def _skeleton_path(key, cache_dir):
+    backend, num_students, encoding = key
+    return os.path.join(cache_dir, f"skeleton_{backend}_{num_students}_{encoding}.pkl")
+
+
+def get_skeleton(backend, num_students, encoding, cache_dir=None):
+    """
+    Looks up a cached skeleton, first in memory and then in `cache_dir` if given.
+
+    Returns:
+        HardSkeleton or None: The cached skeleton, or None if it has not been built yet.
+    """
+    key = skeleton_key(backend, num_students, encoding)
+    if key in _SKELETONS:
+        _SKELETONS.move_to_end(key)
+        return _SKELETONS[key]
+    if cache_dir is not None and backend == 'cnf':
+        path = _skeleton_path(key, cache_dir)
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                skeleton = pickle.load(file)
+            _remember(skeleton)
+            return skeleton
+    return None
+
+
+def _remember(skeleton):
+    """ Giữ khung trong bộ nhớ đệm và bỏ các khung dùng lâu nhất khi vượt quá MAX_SKELETONS. """
+    _SKELETONS[skeleton.key] = skeleton
+    _SKELETONS.move_to_end(skeleton.key)
+    while len(_SKELETONS) > MAX_SKELETONS:
+        _SKELETONS.popitem(last=False)
+
+
+def store_skeleton(skeleton, cache_dir=None):
+    """
+    Stores a skeleton in memory (at most MAX_SKELETONS, least recently used first out) and, for
+    the CNF backends, on disk if `cache_dir` is given.
+
+    CP-SAT models are only kept in memory since their proto serialization differs between
+    OR-Tools versions.
+    """
+    _remember(skeleton)
+    if cache_dir is not None and skeleton.backend == 'cnf':
+        os.makedirs(cache_dir, exist_ok=True)
+        path = _skeleton_path(skeleton.key, cache_dir)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(skeleton, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+
+def clear_skeleton_cache():
+    """ Drops every skeleton kept in memory. """
+    _SKELETONS.clear()
+
+
+def set_skeleton_cache_size(size):
+    """ Sets MAX_SKELETONS, e.g. 0 to keep no skeleton in memory, and evicts the extra ones. """
+    global MAX_SKELETONS
+    if size < 0:
+        raise ValueError("The skeleton cache size must be at least 0.")
+    MAX_SKELETONS = size
+    while len(_SKELETONS) > MAX_SKELETONS:
+        _SKELETONS.popitem(last=False)
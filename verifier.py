@@ -0,0 +1,86 @@
+import numpy as np
+from candidates import num_two_seat_students
+from weights import build_adjacency
+
+# Định nghĩa trọng số của hàm mục tiêu
+OBJECTIVES = ('total', 'perfect')  # tổng wij/wijk, hoặc tổng sĩ số các bàn thỏa mãn hoàn toàn (RC2 'max')
+
+
+def table_weights(adj, tables):
+    """
+    Weights of a list of tables read from the preference matrix with array indexing.
+
+    Returns:
+        tuple: (pair_weights, triple_weights) of the two-seat and three-seat tables, in table order.
+    """
+    pairs = np.array([table for table in tables if len(table) == 2], dtype=np.int64).reshape(-1, 2)
+    triples = np.array([table for table in tables if len(table) == 3], dtype=np.int64).reshape(-1, 3)
+    a = adj.astype(np.int64)
+
+    i, j = pairs[:, 0], pairs[:, 1]
+    wij = 2 * (a[i, i] + a[i, j]) * (a[j, j] + a[j, i])
+
+    i, j, k = triples[:, 0], triples[:, 1], triples[:, 2]
+    w_i = a[i, i] + a[i, j] + a[i, k]
+    w_j = a[j, j] + a[j, i] + a[j, k]
+    w_k = a[k, k] + a[k, i] + a[k, j]
+    wijk = 3 * w_i * w_j * w_k / 8
+    return wij, wijk
+
+
+def verify_seating(num_students, preferences, tables, reported_weight=None, objective='total'):
+    """
+    Checks a seating independently of the solver that produced it and recomputes its weight.
+
+    Args:
+        num_students (int): Number of students, numbered from 1.
+        preferences (dict): Maps each student to the list of classmates they prefer.
+        tables (list): The seating, as lists of student ids.
+        reported_weight (float): Weight reported by the solver, compared with the recomputed one.
+        objective (str): 'total' if the solver maximises the sum of wij/wijk (CP-SAT, RC2 'min'),
+            'perfect' if it only counts perfect tables (RC2 'max').
+
+    Returns:
+        dict: 'valid' and the list of 'errors', the recomputed 'total_weight' (sum of wij and wijk)
+            and 'perfect_weight' (students at tables with wij == 2 or wijk == 3), and 'weight_matches'
+            if a reported weight was given.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Invalid objective '{objective}'. Use one of: {', '.join(OBJECTIVES)}.")
+    errors = []
+    tables = [list(table) for table in tables]
+    sizes = np.array([len(table) for table in tables], dtype=np.int64)
+    if not len(tables):
+        errors.append("empty seating")
+    if (~np.isin(sizes, (2, 3))).any():
+        errors.append(f"{int((~np.isin(sizes, (2, 3))).sum())} tables do not have 2 or 3 students")
+        tables = [table for table in tables if len(table) in (2, 3)]
+
+    students = np.array([student for table in tables for student in table], dtype=np.int64)
+    out_of_range = (students < 1) | (students > num_students)
+    if out_of_range.any():
+        errors.append(f"unknown students {sorted(set(students[out_of_range].tolist()))}")
+        tables = [table for table in tables if all(1 <= student <= num_students for student in table)]
+        students = students[~out_of_range]
+
+    counts = np.bincount(students, minlength=num_students + 1)[1:]
+    missing, repeated = np.flatnonzero(counts == 0) + 1, np.flatnonzero(counts > 1) + 1
+    if len(missing):
+        errors.append(f"students without a seat {missing.tolist()}")
+    if len(repeated):
+        errors.append(f"students seated more than once {repeated.tolist()}")
+    two_seat_students = 2 * int((sizes == 2).sum())
+    if two_seat_students != num_two_seat_students(num_students):
+        errors.append(f"{two_seat_students} students at two-seat tables, expected {num_two_seat_students(num_students)}")
+
+    wij, wijk = table_weights(build_adjacency(num_students, preferences), tables)
+    result = {
+        'valid': not errors,
+        'errors': errors,
+        'total_weight': float(wij.sum() + wijk.sum()),
+        'perfect_weight': int(2 * (wij == 2).sum() + 3 * (wijk == 3).sum()),
+    }
+    if reported_weight is not None:
+        expected = result['total_weight'] if objective == 'total' else result['perfect_weight']
+        result['weight_matches'] = bool(abs(reported_weight - expected) < 1e-6)
+    return result
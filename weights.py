@@ -0,0 +1,165 @@
+import numpy as np
+from indexing import pair_rank, triple_rank
+
+
+class TableWeights:
+    """ Sparse listing of the non-zero pair and triple weights of one class. """
+
+    def __init__(self, num_students, pairs, wij, triples, wijk):
+        self.num_students = num_students
+        self.pairs = pairs  # (m, 2) int32, mỗi hàng là (i, j) với i < j
+        self.wij = wij  # (m,) trọng số của từng cặp
+        self.triples = triples  # (t, 3) int32, mỗi hàng là (i, j, k) với i < j < k
+        self.wijk = wijk  # (t,) trọng số của từng bộ ba
+
+    def pair_items(self):
+        """ Yield ((i, j), weight) for every pair with a non-zero weight. """
+        return zip(map(tuple, self.pairs.tolist()), self.wij.tolist())
+
+    def triple_items(self):
+        """ Yield ((i, j, k), weight) for every triple with a non-zero weight. """
+        return zip(map(tuple, self.triples.tolist()), self.wijk.tolist())
+
+    def pair_ranks(self):
+        """ Combinatorial ranks of the listed pairs (see indexing.pair_rank). """
+        return pair_rank(self.pairs[:, 0].astype(np.int64), self.pairs[:, 1].astype(np.int64))
+
+    def triple_ranks(self):
+        """ Combinatorial ranks of the listed triples (see indexing.triple_rank). """
+        t = self.triples.astype(np.int64)
+        return triple_rank(t[:, 0], t[:, 1], t[:, 2])
+
+    def weights_by_var(self, index):
+        """
+        Spreads the weights over the variables of a VariableIndex.
+
+        Returns:
+            tuple: (pair_weights, triple_weights) aligned with index.pair_vars() and index.triple_vars().
+        """
+        pair_weights = np.zeros(index.num_pair_vars, dtype=self.wij.dtype)
+        var_ids = index.pair_vars_of_ranks(self.pair_ranks())
+        pair_weights[var_ids[var_ids >= 0] - index.pair_start] = self.wij[var_ids >= 0]
+
+        triple_weights = np.zeros(index.num_triple_vars, dtype=np.float64)
+        var_ids = index.triple_vars_of_ranks(self.triple_ranks())
+        triple_weights[var_ids[var_ids >= 0] - index.triple_start] = self.wijk[var_ids >= 0]
+        return pair_weights, triple_weights
+
+    def total_weight(self, tables):
+        """ Sum the weights of the given seating (tables of 2 or 3 students). """
+        pair_weights = dict(self.pair_items())
+        triple_weights = dict(self.triple_items())
+        total = 0
+        for table in tables:
+            key = tuple(sorted(table))
+            total += pair_weights.get(key, 0) if len(key) == 2 else triple_weights.get(key, 0)
+        return total
+
+
+def build_adjacency(num_students, preferences):
+    """
+    Builds the boolean preference matrix of a class.
+
+    Args:
+        num_students (int): Number of students, numbered from 1.
+        preferences (dict): Maps each student to the list of classmates they prefer.
+
+    Returns:
+        np.ndarray: (num_students + 1, num_students + 1) bool matrix where adj[i, j] is True if i prefers j.
+            Row and column 0 are unused so student ids index the matrix directly.
+    """
+    adj = np.zeros((num_students + 1, num_students + 1), dtype=bool)
+    rows = [i for i, friends in preferences.items() for _ in friends]
+    cols = [j for friends in preferences.values() for j in friends]
+    adj[rows, cols] = True
+    return adj
+
+
+def pair_weights(adj):
+    """
+    Computes wij = 2 * wi * wj for every pair, where wi is the out-degree of i inside {i, j}.
+
+    Returns:
+        tuple: (pairs, wij) listing only the pairs with a non-zero weight.
+    """
+    # out-degree of i inside {i, j}: adj[i, i] + adj[i, j]
+    deg = adj.astype(np.int64) + np.diag(adj).astype(np.int64)[:, None]
+    w = 2 * deg * deg.T
+    w[0, :] = 0
+    w[:, 0] = 0
+    i, j = np.nonzero(np.triu(w, k=1))
+    pairs = np.stack([i, j], axis=1).astype(np.int32)
+    return pairs, w[i, j]
+
+
+def triple_weights(adj):
+    """
+    Computes wijk = 3 * wi * wj * wk / 8 for every triple, where wi is the out-degree of i inside {i, j, k}.
+
+    A triple can only score when each of its students prefers someone else in it, which makes
+    the triple connected in the undirected preference graph. For each smallest student i only
+    the students within distance two of i are therefore examined (all of them if some student
+    lists themselves, since such a student scores on their own).
+
+    Returns:
+        tuple: (triples, wijk) listing only the triples with a non-zero weight.
+    """
+    n = adj.shape[0] - 1
+    a = adj.astype(np.int64)
+    self_loop = np.diag(a)
+    und = adj | adj.T
+    np.fill_diagonal(und, False)
+    has_self_loops = bool(self_loop.any())
+
+    triples, weights = [], []
+    for i in range(1, n - 1):
+        if not (adj[i, i + 1:].any() or adj[i, i]):
+            continue
+        if has_self_loops:
+            near = np.ones(n + 1, dtype=bool)
+        else:
+            near = und[i] | und[und[i]].any(axis=0)
+        near[:i + 1] = False
+        cand = np.flatnonzero(near)
+        if len(cand) < 2:
+            continue
+
+        sub = a[np.ix_(cand, cand)]
+        base = self_loop[cand] + a[cand, i]  # phần bậc ra của j (hoặc k) không phụ thuộc vào bạn còn lại
+        d_i = self_loop[i] + a[i, cand][:, None] + a[i, cand][None, :]
+        d_j = base[:, None] + sub
+        d_k = base[None, :] + sub.T
+        w = np.triu(d_i * d_j * d_k, k=1)
+
+        j, k = np.nonzero(w)
+        if len(j):
+            triples.append(np.stack([np.full(len(j), i), cand[j], cand[k]], axis=1))
+            weights.append(3 * w[j, k] / 8)
+
+    if not triples:
+        return np.empty((0, 3), dtype=np.int32), np.empty(0, dtype=np.float64)
+    return np.concatenate(triples).astype(np.int32), np.concatenate(weights)
+
+
+def calculate_weights(num_students, preferences):
+    """
+    Computes the pair and triple weights of a class with vectorized matrix operations.
+
+    Args:
+        num_students (int): Number of students.
+        preferences (dict): Maps each student to the list of classmates they prefer.
+
+    Returns:
+        TableWeights: The non-zero pair and triple weights. Every table not listed has weight 0.
+    """
+    return weights_of_adjacency(build_adjacency(num_students, preferences))
+
+
+def weights_of_adjacency(adj):
+    """
+    Same as calculate_weights, straight from a preference matrix, e.g. one loaded with
+    instance_io.load_adjacency.
+    """
+    pairs, wij = pair_weights(adj)
+    triples, wijk = triple_weights(adj)
+    return TableWeights(adj.shape[0] - 1, pairs, wij, triples, wijk)